@@ -5,6 +5,7 @@ from datetime import datetime
 import folium
 from streamlit_folium import st_folium
 import pandas as pd
+from utils.data_manager import get_issue_statistics, get_issues_view, query_issues
 
 # Configure page
 st.set_page_config(
@@ -15,8 +16,6 @@ st.set_page_config(
 )
 
 # Initialize session state
-if 'issues' not in st.session_state:
-    st.session_state.issues = []
 if 'user_role' not in st.session_state:
     st.session_state.user_role = None
 if 'logged_in' not in st.session_state:
@@ -24,23 +23,10 @@ if 'logged_in' not in st.session_state:
 
 # Load existing data
 def load_data():
-    try:
-        if os.path.exists('data/issues.json'):
-            with open('data/issues.json', 'r') as f:
-                st.session_state.issues = json.load(f)
-    except Exception as e:
-        st.session_state.issues = []
+    # Shared, read-only view of the process-wide issue store
+    st.session_state.issues = get_issues_view()
 
-# Save data
-def save_data():
-    try:
-        os.makedirs('data', exist_ok=True)
-        with open('data/issues.json', 'w') as f:
-            json.dump(st.session_state.issues, f, indent=2)
-    except Exception as e:
-        st.error(f"Error saving data: {e}")
-
-# Load data on app start
+# Load data on every rerun (cheap: no copy unless the data changed on disk)
 load_data()
 
 # Header with Indian flag colors
@@ -177,9 +163,11 @@ with col2:
 st.markdown("---")
 st.markdown("### 📊 Platform Statistics")
 
-if st.session_state.issues:
-    total_issues = len(st.session_state.issues)
-    resolved_issues = len([issue for issue in st.session_state.issues if issue.get('status') == 'Resolved'])
+stats = get_issue_statistics()
+
+if stats.get('total_issues'):
+    total_issues = stats['total_issues']
+    resolved_issues = stats['resolved']
     pending_issues = total_issues - resolved_issues
     
     col1, col2, col3, col4 = st.columns(4)
@@ -209,20 +197,16 @@ if st.session_state.issues:
         """, unsafe_allow_html=True)
     
     with col4:
-        resolution_rate = (resolved_issues / total_issues * 100) if total_issues > 0 else 0
         st.markdown(f"""
         <div class="stats-container">
-            <h3 style="color: #0066CC; margin: 0;">📈 {resolution_rate:.1f}%</h3>
+            <h3 style="color: #0066CC; margin: 0;">📈 {stats['resolution_rate']:.1f}%</h3>
             <p style="margin: 0;">Success Rate</p>
         </div>
         """, unsafe_allow_html=True)
 
     # Department breakdown
     st.markdown("### 🏢 Department-wise Distribution")
-    dept_counts = {}
-    for issue in st.session_state.issues:
-        dept = issue.get('department', 'Unassigned')
-        dept_counts[dept] = dept_counts.get(dept, 0) + 1
+    dept_counts = {dept: dept_stats['total'] for dept, dept_stats in stats['departments'].items()}
     
     if dept_counts:
         dept_df = pd.DataFrame(list(dept_counts.items()), columns=['Department', 'Issues'])
@@ -230,7 +214,7 @@ if st.session_state.issues:
 
     # Recent issues
     st.markdown("### 🔄 Recent Reports")
-    recent_issues = sorted(st.session_state.issues, key=lambda x: x.get('timestamp', ''), reverse=True)[:5]
+    recent_issues, _ = query_issues(None, 'newest', 5)
     
     for issue in recent_issues:
         with st.expander(f"{issue.get('title', 'Untitled Issue')} - {issue.get('department', 'General')}"):
@@ -267,6 +251,3 @@ if st.checkbox("🔄 Auto-refresh (30s)", key="auto_refresh"):
     import time
     time.sleep(30)
     st.rerun()
-
-# Save data before page reload
-save_data()
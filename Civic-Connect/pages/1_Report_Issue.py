@@ -6,8 +6,12 @@ import uuid
 import base64
 from PIL import Image
 import io
-from utils.ai_categorizer import categorize_issue_with_ai
-from utils.data_manager import save_issue
+from utils.ai_categorizer import get_estimated_resolution_time
+from utils.blob_store import has_image
+from utils.categorization_queue import provisional_routing, submit_categorization
+from utils.data_manager import get_issues_by_phone, get_issues_view, get_resolution_estimate, save_issue
+from utils.image_cache import get_issue_image
+from utils.image_pipeline import submit_image_ingest
 
 # Configure page
 st.set_page_config(
@@ -24,9 +28,8 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'issues' not in st.session_state:
-    st.session_state.issues = []
+# Shared, read-only view of all issues
+st.session_state.issues = get_issues_view()
 
 # Main form
 st.markdown("### 📋 Issue Details")
@@ -108,14 +111,9 @@ with st.form("issue_report_form", clear_on_submit=True):
             st.error("❌ Please enter a valid 10-digit phone number")
         else:
             try:
-                # Process uploaded image
-                image_data = None
-                if uploaded_file is not None:
-                    # Convert image to base64 for storage
-                    img_byte_arr = io.BytesIO()
-                    image.save(img_byte_arr, format='JPEG')
-                    img_byte_arr = img_byte_arr.getvalue()
-                    image_data = base64.b64encode(img_byte_arr).decode()
+                # Uploaded image bytes; resizing, storage and AI analysis run in the
+                # background after the issue is saved
+                image_bytes = uploaded_file.getvalue() if uploaded_file is not None else None
 
                 # Create issue data
                 issue_data = {
@@ -132,67 +130,62 @@ with st.form("issue_report_form", clear_on_submit=True):
                     'priority': priority,
                     'status': 'Pending',
                     'timestamp': datetime.now().isoformat(),
-                    'image_data': image_data,
+                    'image_status': 'processing' if image_bytes else None,
                     'manual_department': manual_department if manual_department != "Auto-Detect" else None
                 }
 
-                # AI-powered department categorization
-                with st.spinner('🤖 Processing with AI for smart routing...'):
-                    try:
-                        if manual_department == "Auto-Detect":
-                            # Prepare context for AI
-                            ai_context = {
-                                'title': title,
-                                'description': description,
-                                'location': location,
-                                'image_provided': uploaded_file is not None
-                            }
-                            
-                            department, confidence = categorize_issue_with_ai(ai_context, image_data)
-                            issue_data['department'] = department
-                            issue_data['ai_confidence'] = confidence
-                            issue_data['routing_method'] = 'AI'
-                        else:
-                            issue_data['department'] = manual_department
-                            issue_data['ai_confidence'] = 1.0
-                            issue_data['routing_method'] = 'Manual'
-                        
-                        # Save the issue
-                        st.session_state.issues.append(issue_data)
-                        save_issue(issue_data)
-                        
-                        # Success message
-                        st.success("✅ Issue reported successfully!")
-                        
-                        # Display routing information
-                        st.info(f"""
-                        **🎯 Smart Routing Complete**
-                        - **Department:** {issue_data['department']}
-                        - **Method:** {issue_data['routing_method']}
-                        - **Confidence:** {issue_data['ai_confidence']:.2f}
-                        - **Issue ID:** {issue_data['id'][:8]}...
-                        """)
-                        
-                        # Show next steps
-                        st.markdown("""
-                        ### 📬 What happens next?
-                        1. **✅ Confirmation**: You'll receive an SMS/Email confirmation
-                        2. **🔍 Review**: The assigned department will review your report
-                        3. **📋 Assignment**: Issue will be assigned to field staff
-                        4. **🔄 Updates**: You'll receive progress notifications
-                        5. **✅ Resolution**: Final confirmation once resolved
-                        """)
-                        
-                    except Exception as ai_error:
-                        # Fallback to manual categorization
-                        st.warning(f"⚠️ AI categorization failed: {ai_error}")
-                        issue_data['department'] = "General"
-                        issue_data['ai_confidence'] = 0.0
-                        issue_data['routing_method'] = 'Fallback'
-                        
-                        st.session_state.issues.append(issue_data)
-                        save_issue(issue_data)
-                        st.success("✅ Issue reported successfully with manual routing!")
+                # Remembered for "Your Recent Reports" below
+                st.session_state.user_phone = phone
+
+                # Department routing: the issue is saved at once with a keyword-based
+                # department, and AI routing updates it in the background
+                ai_context = {
+                    'title': title,
+                    'description': description,
+                    'location': location,
+                    'image_provided': uploaded_file is not None
+                }
+                if manual_department == "Auto-Detect":
+                    issue_data.update(provisional_routing(ai_context))
+                else:
+                    issue_data['department'] = manual_department
+                    issue_data['ai_confidence'] = 1.0
+                    issue_data['routing_method'] = 'Manual'
+
+                # Save the issue
+                save_issue(issue_data)
+                if image_bytes:
+                    submit_image_ingest(issue_data['id'], image_bytes)
+                if issue_data.get('routing_status') == 'processing':
+                    submit_categorization(issue_data['id'], ai_context, issue_data['department'], image_bytes)
+
+                # Success message
+                st.success("✅ Issue reported successfully!")
+
+                # Display routing information
+                eta = get_estimated_resolution_time(
+                    issue_data['department'], priority,
+                    get_resolution_estimate(issue_data['department'], priority))
+                st.info(f"""
+                **🎯 Smart Routing Complete**
+                - **Department:** {issue_data['department']}
+                - **Method:** {issue_data['routing_method']}
+                - **Confidence:** {issue_data['ai_confidence']:.2f}
+                - **Issue ID:** {issue_data['id'][:8]}...
+                - **Estimated Resolution:** {eta}
+                """)
+                if issue_data.get('routing_status') == 'processing':
+                    st.caption("🤖 AI routing is in progress; the department may be updated shortly.")
+
+                # Show next steps
+                st.markdown("""
+                ### 📬 What happens next?
+                1. **✅ Confirmation**: You'll receive an SMS/Email confirmation
+                2. **🔍 Review**: The assigned department will review your report
+                3. **📋 Assignment**: Issue will be assigned to field staff
+                4. **🔄 Updates**: You'll receive progress notifications
+                5. **✅ Resolution**: Final confirmation once resolved
+                """)
 
             except Exception as e:
                 st.error(f"❌ Error submitting report: {e}")
@@ -201,11 +194,11 @@ with st.form("issue_report_form", clear_on_submit=True):
 st.markdown("---")
 st.markdown("### 📋 Your Recent Reports")
 
-user_issues = [issue for issue in st.session_state.issues 
-               if issue.get('phone') == st.session_state.get('user_phone', '')]
+# Newest first, from the reporter's issue list
+user_issues = get_issues_by_phone(st.session_state.get('user_phone', ''))
 
 if user_issues:
-    for issue in user_issues[-3:]:  # Show last 3 issues
+    for issue in user_issues[:3]:  # Show last 3 issues
         with st.expander(f"{issue['title']} - {issue.get('department', 'Unassigned')}"):
             col1, col2 = st.columns([2, 1])
             with col1:
@@ -213,11 +206,9 @@ if user_issues:
                 st.write(f"**Submitted:** {issue['timestamp'][:19].replace('T', ' ')}")
                 st.write(f"**Location:** {issue['location']}")
             with col2:
-                if issue.get('image_data'):
+                if has_image(issue):
                     try:
-                        img_bytes = base64.b64decode(issue['image_data'])
-                        img = Image.open(io.BytesIO(img_bytes))
-                        st.image(img, width=150)
+                        st.image(get_issue_image(issue), width=150)
                     except:
                         st.write("📸 Image attached")
 else:
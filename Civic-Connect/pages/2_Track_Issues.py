@@ -4,6 +4,11 @@ import pandas as pd
 from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
+from utils.ai_categorizer import get_estimated_resolution_time
+from utils.blob_store import has_image
+from utils.data_manager import (count_issues, find_issue, get_facet_counts, get_issue_statistics,
+                                get_issues_by_phone, get_issues_view, get_resolution_estimate, query_issues)
+from utils.image_cache import get_issue_image
 
 # Configure page
 st.set_page_config(
@@ -20,148 +25,8 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'issues' not in st.session_state:
-    st.session_state.issues = []
-
-# Tracking options
-st.markdown("### 🔎 Find Your Issues")
-
-tab1, tab2, tab3 = st.tabs(["📱 By Phone Number", "🆔 By Issue ID", "📊 All Issues Overview"])
-
-with tab1:
-    st.markdown("#### Track by Phone Number")
-    phone_input = st.text_input("📱 Enter your phone number", placeholder="10-digit mobile number", key="phone_track")
-    
-    if phone_input and len(phone_input) == 10 and phone_input.isdigit():
-        user_issues = [issue for issue in st.session_state.issues 
-                      if issue.get('phone') == phone_input]
-        
-        if user_issues:
-            st.success(f"📋 Found {len(user_issues)} issue(s) for {phone_input}")
-            
-            # Display user issues
-            for issue in sorted(user_issues, key=lambda x: x.get('timestamp', ''), reverse=True):
-                display_issue_card_temp(issue)
-        else:
-            if phone_input:
-                st.info("📝 No issues found for this phone number. Have you submitted any reports?")
-    elif phone_input and (len(phone_input) != 10 or not phone_input.isdigit()):
-        st.error("❌ Please enter a valid 10-digit phone number")
-
-with tab2:
-    st.markdown("#### Track by Issue ID")
-    issue_id_input = st.text_input("🆔 Enter Issue ID", placeholder="Issue ID from confirmation message")
-    
-    if issue_id_input:
-        matching_issue = None
-        for issue in st.session_state.issues:
-            if issue.get('id', '').startswith(issue_id_input):
-                matching_issue = issue
-                break
-        
-        if matching_issue:
-            st.success("✅ Issue found!")
-            display_issue_card_temp(matching_issue, detailed=True)
-        else:
-            st.error("❌ No issue found with this ID. Please check and try again.")
-
-with tab3:
-    st.markdown("#### All Issues Overview")
-    
-    if st.session_state.issues:
-        # Summary statistics
-        total_issues = len(st.session_state.issues)
-        resolved_count = len([i for i in st.session_state.issues if i.get('status') == 'Resolved'])
-        in_progress_count = len([i for i in st.session_state.issues if i.get('status') == 'In Progress'])
-        pending_count = total_issues - resolved_count - in_progress_count
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric("📝 Total Issues", total_issues)
-        with col2:
-            st.metric("✅ Resolved", resolved_count, 
-                     delta=f"{(resolved_count/total_issues*100):.1f}%" if total_issues > 0 else "0%")
-        with col3:
-            st.metric("🔄 In Progress", in_progress_count)
-        with col4:
-            st.metric("⏳ Pending", pending_count)
-        
-        # Filters
-        st.markdown("#### 🔧 Filter Issues")
-        filter_col1, filter_col2, filter_col3 = st.columns(3)
-        
-        with filter_col1:
-            status_filter = st.multiselect(
-                "📊 Status",
-                ["Pending", "In Progress", "Resolved", "Closed"],
-                default=["Pending", "In Progress", "Resolved"]
-            )
-        
-        with filter_col2:
-            department_options = list(set([issue.get('department', 'Unknown') for issue in st.session_state.issues]))
-            department_filter = st.multiselect(
-                "🏢 Department",
-                department_options,
-                default=department_options
-            )
-        
-        with filter_col3:
-            priority_filter = st.multiselect(
-                "🚨 Priority",
-                ["Low", "Medium", "High"],
-                default=["Low", "Medium", "High"]
-            )
-        
-        # Apply filters
-        filtered_issues = [
-            issue for issue in st.session_state.issues
-            if (issue.get('status', 'Pending') in status_filter and
-                issue.get('department', 'Unknown') in department_filter and
-                issue.get('priority', 'Medium') in priority_filter)
-        ]
-        
-        # Display filtered results
-        st.markdown(f"#### 📋 Filtered Results ({len(filtered_issues)} issues)")
-        
-        if filtered_issues:
-            # Sort options
-            sort_by = st.selectbox(
-                "📈 Sort by",
-                ["Latest First", "Oldest First", "Priority High to Low", "Department"]
-            )
-            
-            if sort_by == "Latest First":
-                filtered_issues.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            elif sort_by == "Oldest First":
-                filtered_issues.sort(key=lambda x: x.get('timestamp', ''))
-            elif sort_by == "Priority High to Low":
-                priority_order = {"High": 3, "Medium": 2, "Low": 1}
-                filtered_issues.sort(key=lambda x: priority_order.get(x.get('priority', 'Medium'), 2), reverse=True)
-            elif sort_by == "Department":
-                filtered_issues.sort(key=lambda x: x.get('department', 'Unknown'))
-            
-            # Pagination
-            issues_per_page = 5
-            total_pages = (len(filtered_issues) + issues_per_page - 1) // issues_per_page
-            
-            if total_pages > 1:
-                page = st.number_input("Page", min_value=1, max_value=total_pages, value=1)
-                start_idx = (page - 1) * issues_per_page
-                end_idx = start_idx + issues_per_page
-                page_issues = filtered_issues[start_idx:end_idx]
-                st.caption(f"Showing {start_idx + 1}-{min(end_idx, len(filtered_issues))} of {len(filtered_issues)} issues")
-            else:
-                page_issues = filtered_issues
-            
-            # Display issues
-            for issue in page_issues:
-                display_issue_card_temp(issue)
-        else:
-            st.info("🔍 No issues match the selected filters.")
-    else:
-        st.info("📝 No issues have been reported yet. Submit your first report!")
+# Shared, read-only view of all issues
+st.session_state.issues = get_issues_view()
 
 def display_issue_card_temp(issue, detailed=False):
     """Display an issue in a card format"""
@@ -197,6 +62,13 @@ def display_issue_card_temp(issue, detailed=False):
             st.markdown(f"**👤 Reporter:** {issue.get('reporter_name', 'Anonymous')}")
             st.markdown(f"**📞 Contact:** {issue.get('phone', 'Not provided')}")
             
+            # Estimated from the resolution times of similar past issues
+            if status not in ['Resolved', 'Closed']:
+                department = issue.get('department', 'General')
+                estimate = get_resolution_estimate(department, priority)
+                st.markdown(f"**⏳ Estimated Resolution:** "
+                            f"{get_estimated_resolution_time(department, priority, estimate)}")
+            
             if detailed:
                 st.markdown(f"**📧 Email:** {issue.get('email', 'Not provided')}")
                 st.markdown(f"**🆔 Issue ID:** {issue.get('id', 'N/A')}")
@@ -238,16 +110,14 @@ def display_issue_card_temp(issue, detailed=False):
             </div>
             """, unsafe_allow_html=True)
             
-            # Image if available
-            if issue.get('image_data'):
-                try:
-                    import base64
-                    from PIL import Image
-                    import io
-                    img_bytes = base64.b64decode(issue['image_data'])
-                    img = Image.open(io.BytesIO(img_bytes))
-                    st.image(img, width=150, caption="Issue Photo")
-                except:
+            # Image if available, decoded only when the citizen asks for it
+            if has_image(issue):
+                if detailed or st.checkbox("📸 Show photo", key=f"photo_{issue.get('id', '')}"):
+                    try:
+                        st.image(get_issue_image(issue), width=150, caption="Issue Photo")
+                    except:
+                        st.write("📸 Image attached")
+                else:
                     st.write("📸 Image attached")
         
         # Progress timeline (mock data for demo)
@@ -258,7 +128,8 @@ def display_progress_timeline(issue):
     """Display progress timeline for an issue"""
     st.markdown("#### 📈 Progress Timeline")
     
-    # Mock timeline data based on issue status
+    # Timeline from the recorded status changes; older issues without them
+    # get typical offsets from submission
     timeline_events = []
     
     # Always have submission event
@@ -277,7 +148,7 @@ def display_progress_timeline(issue):
         submit_date = datetime.fromisoformat(issue.get('timestamp', datetime.now().isoformat()))
         ack_date = submit_date + timedelta(hours=2)
         timeline_events.append({
-            'date': ack_date.isoformat(),
+            'date': issue.get('acknowledged_at') or ack_date.isoformat(),
             'event': 'Issue Acknowledged',
             'description': f'Assigned to {issue.get("department", "relevant department")}',
             'status': 'completed'
@@ -288,7 +159,7 @@ def display_progress_timeline(issue):
         submit_date = datetime.fromisoformat(issue.get('timestamp', datetime.now().isoformat()))
         resolve_date = submit_date + timedelta(days=3)
         timeline_events.append({
-            'date': resolve_date.isoformat(),
+            'date': issue.get('resolved_at') or resolve_date.isoformat(),
             'event': 'Issue Resolved',
             'description': 'Issue has been successfully resolved',
             'status': 'completed'
@@ -323,6 +194,152 @@ def display_progress_timeline(issue):
         </div>
         """, unsafe_allow_html=True)
 
+# Tracking options
+st.markdown("### 🔎 Find Your Issues")
+
+tab1, tab2, tab3 = st.tabs(["📱 By Phone Number", "🆔 By Issue ID", "📊 All Issues Overview"])
+
+with tab1:
+    st.markdown("#### Track by Phone Number")
+    phone_input = st.text_input("📱 Enter your phone number", placeholder="10-digit mobile number", key="phone_track")
+    
+    if phone_input and len(phone_input) == 10 and phone_input.isdigit():
+        # Newest first, from the reporter's issue list
+        user_issues = get_issues_by_phone(phone_input)
+        
+        if user_issues:
+            st.success(f"📋 Found {len(user_issues)} issue(s) for {phone_input}")
+            
+            # Display user issues
+            for issue in user_issues:
+                display_issue_card_temp(issue)
+        else:
+            if phone_input:
+                st.info("📝 No issues found for this phone number. Have you submitted any reports?")
+    elif phone_input and (len(phone_input) != 10 or not phone_input.isdigit()):
+        st.error("❌ Please enter a valid 10-digit phone number")
+
+with tab2:
+    st.markdown("#### Track by Issue ID")
+    issue_id_input = st.text_input("🆔 Enter Issue ID", placeholder="Issue ID from confirmation message")
+    
+    if issue_id_input:
+        # Full ID or the first characters shown in the confirmation message
+        matching_issue = find_issue(issue_id_input.strip())
+        
+        if matching_issue:
+            st.success("✅ Issue found!")
+            display_issue_card_temp(matching_issue, detailed=True)
+        else:
+            st.error("❌ No issue found with this ID. Please check and try again.")
+
+with tab3:
+    st.markdown("#### All Issues Overview")
+    
+    if st.session_state.issues:
+        # Summary statistics from the facet index
+        facet_counts = get_facet_counts()
+        status_counts = facet_counts.get('status', {})
+        total_issues = len(st.session_state.issues)
+        resolved_count = status_counts.get('Resolved', 0)
+        in_progress_count = status_counts.get('In Progress', 0)
+        pending_count = total_issues - resolved_count - in_progress_count
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("📝 Total Issues", total_issues)
+        with col2:
+            st.metric("✅ Resolved", resolved_count, 
+                     delta=f"{(resolved_count/total_issues*100):.1f}%" if total_issues > 0 else "0%")
+        with col3:
+            st.metric("🔄 In Progress", in_progress_count)
+        with col4:
+            st.metric("⏳ Pending", pending_count)
+        
+        # Filters
+        st.markdown("#### 🔧 Filter Issues")
+        filter_col1, filter_col2, filter_col3 = st.columns(3)
+        
+        with filter_col1:
+            status_filter = st.multiselect(
+                "📊 Status",
+                ["Pending", "In Progress", "Resolved", "Closed"],
+                default=["Pending", "In Progress", "Resolved"],
+                format_func=lambda s: f"{s} ({status_counts.get(s, 0)})"
+            )
+        
+        with filter_col2:
+            department_counts = facet_counts.get('department', {})
+            department_options = sorted(department_counts)
+            department_filter = st.multiselect(
+                "🏢 Department",
+                department_options,
+                default=department_options,
+                format_func=lambda d: f"{d} ({department_counts.get(d, 0)})"
+            )
+        
+        with filter_col3:
+            priority_counts = facet_counts.get('priority', {})
+            priority_filter = st.multiselect(
+                "🚨 Priority",
+                ["Low", "Medium", "High"],
+                default=["Low", "Medium", "High"],
+                format_func=lambda p: f"{p} ({priority_counts.get(p, 0)})"
+            )
+        
+        # Apply filters
+        issue_filters = {
+            'status': status_filter,
+            'department': department_filter,
+            'priority': priority_filter
+        }
+        filtered_count = count_issues(issue_filters)
+        
+        # Display filtered results
+        st.markdown(f"#### 📋 Filtered Results ({filtered_count} issues)")
+        
+        if filtered_count:
+            # Sort options
+            sort_options = {
+                "Latest First": 'newest',
+                "Oldest First": 'oldest',
+                "Priority High to Low": 'priority',
+                "Department": 'department'
+            }
+            sort_by = st.selectbox("📈 Sort by", list(sort_options))
+            
+            # Cursor pagination, restarting at page 1 when filters or sort change
+            issues_per_page = 5
+            page_key = json.dumps([issue_filters, sort_by])
+            if st.session_state.get('track_page_key') != page_key:
+                st.session_state.track_page_key = page_key
+                st.session_state.track_cursors = [None]
+            cursors = st.session_state.track_cursors
+            
+            page_issues, next_cursor = query_issues(issue_filters, sort_options[sort_by],
+                                                    issues_per_page, cursors[-1])
+            start_idx = (len(cursors) - 1) * issues_per_page
+            st.caption(f"Showing {start_idx + 1}-{start_idx + len(page_issues)} of {filtered_count} issues")
+            
+            prev_col, next_col = st.columns(2)
+            with prev_col:
+                if len(cursors) > 1 and st.button("⬅️ Previous", key="track_prev_page"):
+                    cursors.pop()
+                    st.rerun()
+            with next_col:
+                if next_cursor and st.button("Next ➡️", key="track_next_page"):
+                    cursors.append(next_cursor)
+                    st.rerun()
+            
+            # Display issues
+            for issue in page_issues:
+                display_issue_card_temp(issue)
+        else:
+            st.info("🔍 No issues match the selected filters.")
+    else:
+        st.info("📝 No issues have been reported yet. Submit your first report!")
+
 # Analytics section
 st.markdown("---")
 st.markdown("### 📊 Quick Analytics")
@@ -331,12 +348,12 @@ if st.session_state.issues:
     # Create visualizations
     col1, col2 = st.columns(2)
     
+    # Counts maintained alongside the issue store
+    stats = get_issue_statistics()
+    
     with col1:
         # Status distribution pie chart
-        status_counts = {}
-        for issue in st.session_state.issues:
-            status = issue.get('status', 'Pending')
-            status_counts[status] = status_counts.get(status, 0) + 1
+        status_counts = stats.get('statuses', {})
         
         if status_counts:
             fig_status = px.pie(
@@ -354,10 +371,7 @@ if st.session_state.issues:
     
     with col2:
         # Department distribution bar chart
-        dept_counts = {}
-        for issue in st.session_state.issues:
-            dept = issue.get('department', 'Unknown')
-            dept_counts[dept] = dept_counts.get(dept, 0) + 1
+        dept_counts = {dept: dept_stats['total'] for dept, dept_stats in stats.get('departments', {}).items()}
         
         if dept_counts:
             fig_dept = px.bar(
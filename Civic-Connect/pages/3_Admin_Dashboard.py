@@ -6,12 +6,59 @@ import pandas as pd
 from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
+from utils.analytics import daily_counts, totals
 from utils.auth import admin_login_required
+from utils.batch_categorizer import find_unrouted_issues
+from utils.blob_store import has_image
+from utils.categorization_cache import get_cache_stats
+from utils.categorization_queue import get_batch_routing, submit_batch_routing
+from utils.csv_export import ADMIN_EXPORT_COLUMNS, spool_csv
+from utils.data_manager import (cleanup_old_data, count_issues, get_daily_rollup, get_facet_values,
+                                get_issue_statistics, get_issues_view, get_reporter_counts,
+                                get_reporter_profiles, get_reporter_statistics, get_response_times,
+                                patch_issue, patch_issues, query_issues, reassign_issue_department,
+                                stream_issues_csv, update_issue_status)
+from utils.facet_index import FACET_FIELDS
+from utils.image_cache import get_issue_image
+from utils.issue_stats import STATS_FIELDS
+from utils.keyword_rules import get_keywords, get_rules, set_keywords
+from utils.response_times import format_hours
 import base64
 from PIL import Image
 import io
-if "issues" not in st.session_state:
-    st.session_state["issues"] =[]
+# Shared, read-only view of all issues
+st.session_state.issues = get_issues_view()
+def show_batch_routing(job):
+    """Show the progress of an Auto-Assign run, then its outcome once."""
+    if job.running():
+        st.session_state.polling_batch_routing = job
+        st.progress(job.done / job.total if job.total else 0.0,
+                    text=f"Routed {job.done} of {job.total} issues")
+        return
+    if st.session_state.get('polling_batch_routing') is job:
+        # Finished while polling; reload the whole page with the routed issues
+        st.session_state.polling_batch_routing = None
+        st.rerun()
+    if st.session_state.get('shown_batch_routing') is job:
+        return
+    st.session_state.shown_batch_routing = job
+    if job.future.exception() is not None:
+        st.error(f"❌ Auto-assignment failed: {job.future.exception()}")
+        return
+    result = job.future.result()
+    st.success(f"✅ Assigned {result['routed'] + result['local']} issues "
+               f"({result['local']} by the local router, {result['routed']} by AI)")
+    if result['fallback']:
+        st.warning(f"⚠️ {result['fallback']} issues were routed by keywords because the AI was unavailable")
+
+def department_filter(department):
+    """Facet filter for a department as labelled by get_issue_statistics()."""
+    # The statistics count issues without a department as 'Unassigned',
+    # the facet index as 'Unknown'
+    if department == STATS_FIELDS['department']:
+        return {'department': [department, FACET_FIELDS['department']]}
+    return {'department': [department]}
+
 def display_admin_issue_card_temp(issue, index):
     """Display a single issue in a card format for admin dashboard."""
     with st.container():
@@ -101,16 +148,12 @@ with col_map:
 with col_stats:
     st.markdown("### 📊 Quick Statistics")
     
-    # Initialize session state
-    if 'issues' not in st.session_state:
-        st.session_state.issues = []
-    
     # Quick stats
-    if st.session_state.issues:
-        total_issues = len(st.session_state.issues)
-        pending_issues = len([i for i in st.session_state.issues if i.get('status') == 'Pending'])
-        in_progress_issues = len([i for i in st.session_state.issues if i.get('status') == 'In Progress'])
-        resolved_issues = len([i for i in st.session_state.issues if i.get('status') == 'Resolved'])
+    stats = get_issue_statistics()
+    if stats.get('total_issues'):
+        total_issues = stats['total_issues']
+        pending_issues = stats['pending']
+        in_progress_issues = stats['in_progress']
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -122,8 +165,7 @@ with col_stats:
         with col3:
             st.metric("🔄 In Progress", in_progress_issues)
         with col4:
-            resolution_rate = (resolved_issues / total_issues * 100) if total_issues > 0 else 0
-            st.metric("✅ Resolution Rate", f"{resolution_rate:.1f}%")
+            st.metric("✅ Resolution Rate", f"{stats['resolution_rate']:.1f}%")
     else:
         st.info("📊 No issues available to display statistics")
 
@@ -151,7 +193,7 @@ with tab1:
     
     with filter_col2:
         if st.session_state.issues:
-            departments = list(set([issue.get('department', 'Unknown') for issue in st.session_state.issues]))
+            departments = get_facet_values('department')
             dept_filter = st.selectbox("Filter by Department", ["All"] + departments, key="admin_dept_filter")
         else:
             dept_filter = "All"
@@ -164,38 +206,53 @@ with tab1:
         )
     
     with filter_col4:
+        # Empty by default, so older open issues are not hidden
         date_range = st.date_input(
             "Date Range",
-            value=(datetime.now() - timedelta(days=7), datetime.now()),
+            value=[],
             key="admin_date_filter"
         )
     
     # Apply filters
-    filtered_issues = st.session_state.issues.copy()
-    
-    if status_filter != "All":
-        filtered_issues = [i for i in filtered_issues if i.get('status') == status_filter]
-    
-    if dept_filter != "All":
-        filtered_issues = [i for i in filtered_issues if i.get('department') == dept_filter]
-    
-    if priority_filter != "All":
-        filtered_issues = [i for i in filtered_issues if i.get('priority') == priority_filter]
-    
-    # Sort by urgency (High priority and Pending status first)
-    def sort_priority(issue):
-        priority_weight = {"High": 3, "Medium": 2, "Low": 1}
-        status_weight = {"Pending": 3, "In Progress": 2, "Resolved": 1, "Closed": 0}
-        return (priority_weight.get(issue.get('priority', 'Medium'), 2) + 
-                status_weight.get(issue.get('status', 'Pending'), 3))
-    
-    filtered_issues.sort(key=sort_priority, reverse=True)
-    
-    st.markdown(f"**📊 Showing {len(filtered_issues)} of {len(st.session_state.issues)} issues**")
+    issue_filters = {
+        'status': None if status_filter == "All" else [status_filter],
+        'department': None if dept_filter == "All" else [dept_filter],
+        'priority': None if priority_filter == "All" else [priority_filter]
+    }
+    # The range picker yields no date until one is picked, and a single date
+    # while the end is being chosen
+    date_bounds = tuple(date_range) if isinstance(date_range, (list, tuple)) else (date_range,)
+    date_start = date_bounds[0] if date_bounds else None
+    date_end = date_bounds[1] if len(date_bounds) > 1 else date_start
+    filtered_count = count_issues(issue_filters, date_start, date_end)
+    
+    st.markdown(f"**📊 Showing {filtered_count} of {len(st.session_state.issues)} issues**")
+    
+    # Sorted by urgency (High priority and Pending status first), one page at a time
+    issues_per_page = 20
+    page_key = json.dumps([issue_filters, str(date_start), str(date_end)])
+    if st.session_state.get('admin_page_key') != page_key:
+        st.session_state.admin_page_key = page_key
+        st.session_state.admin_cursors = [None]
+    cursors = st.session_state.admin_cursors
+    
+    page_issues, next_cursor = query_issues(issue_filters, 'urgency', issues_per_page, cursors[-1],
+                                            date_start, date_end)
+    start_idx = (len(cursors) - 1) * issues_per_page
     
     # Display issues in admin format
-    for i, issue in enumerate(filtered_issues):
-        display_admin_issue_card_temp(issue, i)
+    for i, issue in enumerate(page_issues):
+        display_admin_issue_card_temp(issue, start_idx + i)
+    
+    prev_col, next_col = st.columns(2)
+    with prev_col:
+        if len(cursors) > 1 and st.button("⬅️ Previous", key="admin_prev_page"):
+            cursors.pop()
+            st.rerun()
+    with next_col:
+        if next_cursor and st.button("Next ➡️", key="admin_next_page"):
+            cursors.append(next_cursor)
+            st.rerun()
        
         
 
@@ -203,17 +260,8 @@ with tab2:
     st.markdown("### 🏢 Department-wise View")
     
     if st.session_state.issues:
-        # Department statistics
-        dept_stats = {}
-        for issue in st.session_state.issues:
-            dept = issue.get('department', 'Unassigned')
-            if dept not in dept_stats:
-                dept_stats[dept] = {'total': 0, 'pending': 0, 'in_progress': 0, 'resolved': 0}
-            
-            dept_stats[dept]['total'] += 1
-            status = issue.get('status', 'Pending').lower().replace(' ', '_')
-            if status in dept_stats[dept]:
-                dept_stats[dept][status] += 1
+        # Department statistics, from the running counters
+        dept_stats = get_issue_statistics()['departments']
         
         # Display department cards
         for dept, stats in dept_stats.items():
@@ -230,12 +278,10 @@ with tab2:
                     resolution_rate = (stats.get('resolved', 0) / stats['total'] * 100) if stats['total'] > 0 else 0
                     st.metric("Resolution Rate", f"{resolution_rate:.1f}%")
                 
-                # Department-specific issues
-                dept_issues = [i for i in st.session_state.issues if i.get('department') == dept]
-                
                 # Show recent issues for this department
                 st.markdown("**📋 Recent Issues:**")
-                for issue in dept_issues[:3]:  # Show top 3
+                dept_issues, _ = query_issues(department_filter(dept), 'newest', 3)
+                for issue in dept_issues:
                     st.markdown(f"• **{issue.get('title', 'Untitled')}** - {issue.get('status', 'Pending')} "
                               f"({issue.get('priority', 'Medium')} priority)")
     else:
@@ -245,21 +291,15 @@ with tab3:
     st.markdown("### 📊 System Analytics")
     
     if st.session_state.issues:
-        # Time-based analytics
+        # Time-based analytics from the daily rollup
+        rollup = get_daily_rollup()
         col1, col2 = st.columns(2)
         
         with col1:
             # Issues over time
-            issue_dates = []
-            for issue in st.session_state.issues:
-                try:
-                    date = datetime.fromisoformat(issue.get('timestamp', '')).date()
-                    issue_dates.append(date)
-                except:
-                    continue
+            date_counts = daily_counts(rollup)
             
-            if issue_dates:
-                date_counts = pd.Series(issue_dates).value_counts().sort_index()
+            if not date_counts.empty:
                 fig_timeline = px.line(
                     x=date_counts.index,
                     y=date_counts.values,
@@ -271,10 +311,7 @@ with tab3:
         
         with col2:
             # Priority distribution
-            priority_counts = {}
-            for issue in st.session_state.issues:
-                priority = issue.get('priority', 'Medium')
-                priority_counts[priority] = priority_counts.get(priority, 0) + 1
+            priority_counts = totals(rollup, 'priority').to_dict()
             
             if priority_counts:
                 fig_priority = px.bar(
@@ -286,17 +323,24 @@ with tab3:
                 )
                 st.plotly_chart(fig_priority, use_container_width=True)
         
-        # Response time analysis (mock data)
+        # Response time analysis from the response time sketches
         st.markdown("#### ⏱️ Response Time Analysis")
-        avg_response_times = {
-            'Sanitation': '2.3 hours',
-            'Public Works': '4.1 hours', 
-            'Traffic Police': '1.8 hours',
-            'Water Department': '3.2 hours',
-            'Electricity Board': '2.7 hours'
-        }
+        acknowledge_times = get_response_times('acknowledge')['departments']
+        resolve_times = get_response_times('resolve')['departments']
+        
+        def _duration(summaries, department, statistic):
+            summary = summaries.get(department)
+            return format_hours(summary[statistic]) if summary and summary['count'] else 'N/A'
         
-        response_df = pd.DataFrame(list(avg_response_times.items()), columns=['Department', 'Avg Response Time'])
+        response_df = pd.DataFrame([
+            {
+                'Department': department,
+                'Avg Response Time': _duration(acknowledge_times, department, 'mean'),
+                'Median Resolution Time': _duration(resolve_times, department, 'median'),
+                '90% Resolved Within': _duration(resolve_times, department, 'p90')
+            }
+            for department in sorted(set(acknowledge_times) | set(resolve_times))
+        ], columns=['Department', 'Avg Response Time', 'Median Resolution Time', '90% Resolved Within'])
         st.table(response_df)
         
     else:
@@ -313,9 +357,12 @@ with tab4:
         st.markdown("**🚨 Priority Thresholds**")
         high_priority_keywords = st.text_area(
             "High Priority Keywords (comma-separated)",
-            value="emergency, urgent, danger, accident, fire, flood",
+            value=", ".join(get_keywords('priority', 'High')),
             help="Issues containing these keywords will be marked as high priority"
         )
+        if st.button("💾 Save Keywords", help="Use these keywords for new reports and bulk escalation"):
+            saved = set_keywords('priority', 'High', high_priority_keywords.split(','))
+            st.success(f"✅ Saved {len(saved)} high priority keywords")
         
         auto_assign = st.checkbox("🤖 Enable Auto-Assignment", value=True,
                                 help="Automatically assign issues to departments using AI")
@@ -345,29 +392,23 @@ with tab4:
     with col1:
         if st.button("🧹 Clean Old Data", help="Remove resolved issues older than 30 days"):
             # Clean old resolved issues
-            cutoff_date = datetime.now() - timedelta(days=30)
-            initial_count = len(st.session_state.issues)
-            st.session_state.issues = [
-                issue for issue in st.session_state.issues 
-                if not (issue.get('status') == 'Resolved' and 
-                       datetime.fromisoformat(issue.get('timestamp', datetime.now().isoformat())) < cutoff_date)
-            ]
-            cleaned_count = initial_count - len(st.session_state.issues)
+            cleaned_count = cleanup_old_data(days_threshold=30)
+            st.session_state.issues = get_issues_view()
             st.success(f"✅ Cleaned {cleaned_count} old records")
     
     with col2:
-        if st.button("📊 Export Data", help="Download all issues as CSV"):
-            if st.session_state.issues:
-                df = pd.DataFrame(st.session_state.issues)
-                csv = df.to_csv(index=False)
+        if st.session_state.issues:
+            # The CSV is streamed to a temporary file only when an export is requested
+            if st.button("📊 Export Data", help="Prepare all issues as CSV"):
                 st.download_button(
                     label="📥 Download CSV",
-                    data=csv,
+                    data=spool_csv(stream_issues_csv(columns=ADMIN_EXPORT_COLUMNS)),
                     file_name=f"civic_issues_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
+                    mime="text/csv",
+                    help="Download all issues as CSV"
                 )
-            else:
-                st.warning("No data to export")
+        else:
+            st.warning("No data to export")
     
     with col3:
         if st.button("🔄 Refresh System", help="Reload all data"):
@@ -378,234 +419,259 @@ with tab5:
     
     st.markdown("#### 📊 User Statistics")
     
-    if st.session_state.issues:
-        # Extract unique users from issues
-        users = {}
-        for issue in st.session_state.issues:
-            phone = issue.get('phone', '')
-            if phone:
-                if phone not in users:
-                    users[phone] = {
-                        'name': issue.get('reporter_name', 'Unknown'),
-                        'email': issue.get('email', 'Not provided'),
-                        'total_issues': 0,
-                        'resolved_issues': 0,
-                        'last_report': issue.get('timestamp', '')
-                    }
-                users[phone]['total_issues'] += 1
-                if issue.get('status') == 'Resolved':
-                    users[phone]['resolved_issues'] += 1
-                
-                # Update last report if this is more recent
-                if issue.get('timestamp', '') > users[phone]['last_report']:
-                    users[phone]['last_report'] = issue.get('timestamp', '')
-        
-        st.markdown(f"**👥 Total Users: {len(users)}**")
-        
-        # Display user table
-        if users:
-            user_data = []
-            for phone, data in users.items():
-                user_data.append({
-                    'Phone': phone,
-                    'Name': data['name'],
-                    'Total Issues': data['total_issues'],
-                    'Resolved': data['resolved_issues'],
-                    'Success Rate': f"{(data['resolved_issues']/data['total_issues']*100):.1f}%" if data['total_issues'] > 0 else "0%",
-                    'Last Report': data['last_report'][:10] if data['last_report'] else 'Never'
-                })
-            
-            user_df = pd.DataFrame(user_data)
-            st.dataframe(user_df, use_container_width=True)
-            
-            # User engagement metrics
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                avg_issues_per_user = sum([data['total_issues'] for data in users.values()]) / len(users)
-                st.metric("📊 Avg Issues/User", f"{avg_issues_per_user:.1f}")
-            
-            with col2:
-                active_users = len([u for u in users.values() if 
-                                  datetime.fromisoformat(u['last_report']).date() > (datetime.now() - timedelta(days=30)).date()])
-                st.metric("🔥 Active Users (30d)", active_users)
-            
-            with col3:
-                repeat_users = len([u for u in users.values() if u['total_issues'] > 1])
-                st.metric("🔄 Repeat Users", repeat_users)
+    # Exact counts and the user table come from the reporter profiles, the
+    # charts from the reporter sketches; both are maintained on every write
+    reporter_counts = get_reporter_counts(active_days=30)
+    reporter_stats = get_reporter_statistics(active_days=30)
+    
+    if reporter_counts['reporters']:
+        total_users = reporter_counts['reporters']
+        st.markdown(f"**👥 Total Users: {total_users:,}**")
+        
+        # Display user table, one sorted page at a time
+        user_sort_labels = {'Most issues': 'issues', 'Latest report': 'recent', 'Name': 'name'}
+        user_sort = user_sort_labels[st.selectbox("Sort users by", list(user_sort_labels), key="user_sort")]
+        users_per_page = 20
+        if st.session_state.get('user_page_key') != user_sort:
+            st.session_state.user_page_key = user_sort
+            st.session_state.user_cursors = [None]
+        user_cursors = st.session_state.user_cursors
+        
+        profiles, next_user_cursor = get_reporter_profiles(user_sort, users_per_page, user_cursors[-1])
+        user_df = pd.DataFrame([
+            {
+                'Phone': profile['phone'],
+                'Name': profile['name'] or 'Unknown',
+                'Total Issues': profile['total_issues'],
+                'Resolved': profile['resolved_issues'],
+                'Success Rate': f"{(profile['resolved_issues']/profile['total_issues']*100):.1f}%",
+                'Last Report': profile['last_report'][:10] if profile['last_report'] else 'Never'
+            }
+            for profile in profiles
+        ], columns=['Phone', 'Name', 'Total Issues', 'Resolved', 'Success Rate', 'Last Report'])
+        st.dataframe(user_df, use_container_width=True, hide_index=True)
+        
+        prev_col, next_col = st.columns(2)
+        with prev_col:
+            if len(user_cursors) > 1 and st.button("⬅️ Previous", key="user_prev_page"):
+                user_cursors.pop()
+                st.rerun()
+        with next_col:
+            if next_user_cursor and st.button("Next ➡️", key="user_next_page"):
+                user_cursors.append(next_user_cursor)
+                st.rerun()
+        
+        # User engagement metrics
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            avg_issues_per_user = get_issue_statistics().get('total_issues', 0) / total_users
+            st.metric("📊 Avg Issues/User", f"{avg_issues_per_user:.1f}")
+        
+        with col2:
+            st.metric("🔥 Active Users (30d)", reporter_counts['active_reporters'])
+        
+        with col3:
+            st.metric("🔄 Repeat Users", reporter_counts['repeat_reporters'])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            daily_reporters = reporter_stats['daily_reporters']
+            fig_reporters = px.line(
+                x=list(daily_reporters.keys()),
+                y=list(daily_reporters.values()),
+                title="👥 Unique Reporters per Day (30d)",
+                labels={'x': 'Date', 'y': 'Unique Reporters'},
+                markers=True
+            )
+            st.plotly_chart(fig_reporters, use_container_width=True)
+        
+        with col2:
+            department_reporters = reporter_stats['departments']
+            fig_dept_reporters = px.bar(
+                x=list(department_reporters.values()),
+                y=list(department_reporters.keys()),
+                orientation='h',
+                title="🏢 Unique Reporters by Department",
+                labels={'x': 'Unique Reporters', 'y': 'Department'}
+            )
+            st.plotly_chart(fig_dept_reporters, use_container_width=True)
+        
+        area_reporters = sorted(reporter_stats['areas'].items(), key=lambda item: item[1], reverse=True)[:10]
+        st.markdown("#### 🗺️ Unique Reporters by Ward (top 10)")
+        st.table(pd.DataFrame(area_reporters, columns=['Ward', 'Unique Reporters']))
     else:
         st.info("👥 No user data available.")
 
-    import streamlit as st
-    from collections import defaultdict
-
-    # --- Function to display a single issue card ---
-    
-
     # --- Admin Dashboard Display ---
     if st.session_state.issues:
         st.subheader("📊 Issues by Department")
 
-        # Group issues department-wise
-        dept_stats = defaultdict(list)
-        for issue in st.session_state.issues:
-            dept = issue.get('department', 'Unassigned')
-            dept_stats[dept].append(issue)
-
-        # Display grouped issues
-        for dept, dept_issues in dept_stats.items():
-            st.markdown(f"### 🏢 {dept} ({len(dept_issues)} issues)")
-            for i, issue in enumerate(dept_issues):
-                display_admin_issue_card_temp(issue, i)
+        # Newest issues of each department, one more page per "Load more"
+        dept_cards_per_page = 10
+        if 'dept_card_cursors' not in st.session_state:
+            st.session_state.dept_card_cursors = {}
+        for dept, dept_stats in get_issue_statistics()['departments'].items():
+            st.markdown(f"### 🏢 {dept} ({dept_stats['total']} issues)")
+            dept_cursors = st.session_state.dept_card_cursors.setdefault(dept, [None])
+            shown = 0
+            for cursor in dept_cursors:
+                dept_issues, next_dept_cursor = query_issues(department_filter(dept), 'newest',
+                                                             dept_cards_per_page, cursor)
+                for issue in dept_issues:
+                    display_admin_issue_card_temp(issue, shown)
+                    shown += 1
+            if next_dept_cursor and st.button("Load more", key=f"dept_more_{dept}"):
+                dept_cursors.append(next_dept_cursor)
+                st.rerun()
     else:
         st.info("No issues have been reported yet.")
     
     # Color coding
-    #status_colors = {
-     #   'Pending': '#FF6B6B',
-      #  'In Progress': '#4ECDC4',
-       # 'Resolved': '#45B7D1',
-        #'Closed': '#96CEB4'
-    #}
     status_colors = {
-        "active": "green",
-        "inactive": "red",
-        "pending": "orange"
+        'Pending': '#FF6B6B',
+        'In Progress': '#4ECDC4',
+        'Resolved': '#45B7D1',
+        'Closed': '#96CEB4'
     }
 
-    status = "active"  # example
-
-    html = f'<div style="border: 2px solid {status_colors.get(status, "gray")};">Content</div>'
-
     priority_colors = {
         'High': '#FF4757',
         'Medium': '#FFA502',
         'Low': '#2ED573'
     }
     
-    #status = issue.get('status', 'Pending')
-    for i, issue in enumerate(st.session_state.issues):
+    # Manage the newest issues one page at a time
+    cards_per_page = 10
+    if 'admin_card_cursors' not in st.session_state:
+        st.session_state.admin_card_cursors = [None]
+    card_cursors = st.session_state.admin_card_cursors
+    card_issues, next_card_cursor = query_issues(None, 'newest', cards_per_page, card_cursors[-1])
+    
+    for issue in card_issues:
+        issue_id = issue.get('id', '')
         status = issue.get('status', 'Pending')
         priority = issue.get('priority', 'Medium')
     
-    # Issue card
-    with st.container():
-        st.markdown(f"""
-        <div style="border: 2px solid {status_colors.get(status, 'gray')}; 
-                   border-radius: 10px; padding: 15px; margin: 10px 0;
-                   background-color: {'#fff5f5' if priority == 'High' else '#ffffff'};">
-        """, unsafe_allow_html=True)
+        # Issue card
+        with st.container():
+            st.markdown(f"""
+            <div style="border: 2px solid {status_colors.get(status, 'gray')}; 
+                       border-radius: 10px; padding: 15px; margin: 10px 0;
+                       background-color: {'#fff5f5' if priority == 'High' else '#ffffff'};">
+            """, unsafe_allow_html=True)
         
-        # Header row
-        col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+            # Header row
+            col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
         
-        with col1:
-            st.markdown(f"### 🎫 {[issue].get('title', 'Untitled Issue')}")
-            st.markdown(f"**📝 Description:** {issue.get('description', 'No description')}")
-            st.markdown(f"**📍 Location:** {issue.get('location', 'Not specified')}")
-            st.markdown(f"**👤 Reporter:** {issue.get('reporter_name', 'Unknown')} ({issue.get('phone', 'No phone')})")
+            with col1:
+                st.markdown(f"### 🎫 {issue.get('title', 'Untitled Issue')}")
+                st.markdown(f"**📝 Description:** {issue.get('description', 'No description')}")
+                st.markdown(f"**📍 Location:** {issue.get('location', 'Not specified')}")
+                st.markdown(f"**👤 Reporter:** {issue.get('reporter_name', 'Unknown')} ({issue.get('phone', 'No phone')})")
         
-        with col2:
-            # Status management
-            new_status = st.selectbox(
-                "Status",
-                ["Pending", "In Progress", "Resolved", "Closed"],
-                index=["Pending", "In Progress", "Resolved", "Closed"].index(status),
-                key=f"status_{issue_id}"
-            )
+            with col2:
+                # Status management
+                new_status = st.selectbox(
+                    "Status",
+                    ["Pending", "In Progress", "Resolved", "Closed"],
+                    index=["Pending", "In Progress", "Resolved", "Closed"].index(status),
+                    key=f"status_{issue_id}"
+                )
             
-            if new_status != status:
-                # Update status
-                for i, stored_issue in enumerate(st.session_state.issues):
-                    if stored_issue.get('id') == issue.get('id'):
-                        st.session_state.issues[i]['status'] = new_status
-                        st.session_state.issues[i]['last_updated'] = datetime.now().isoformat()
+                if new_status != status:
+                    # Update status
+                    if update_issue_status(issue_id, new_status):
                         st.success(f"✅ Status updated to {new_status}")
                         st.rerun()
         
-        with col3:
-            # Priority and department info
-            st.markdown(f"""
-            <span style="background-color: {priority_colors.get(priority, '#gray')}; 
-                       color: white; padding: 4px 8px; border-radius: 15px; 
-                       font-size: 0.8rem; font-weight: bold;">
-                {priority}
-            </span>
-            """, unsafe_allow_html=True)
+            with col3:
+                # Priority and department info
+                st.markdown(f"""
+                <span style="background-color: {priority_colors.get(priority, '#gray')}; 
+                           color: white; padding: 4px 8px; border-radius: 15px; 
+                           font-size: 0.8rem; font-weight: bold;">
+                    {priority}
+                </span>
+                """, unsafe_allow_html=True)
             
-            st.markdown(f"**🏢 Dept:** {issue.get('department', 'Unassigned')}")
-            st.markdown(f"**📅 Submitted:** {issue.get('timestamp', '')[:10]}")
+                st.markdown(f"**🏢 Dept:** {issue.get('department', 'Unassigned')}")
+                st.markdown(f"**📅 Submitted:** {issue.get('timestamp', '')[:10]}")
         
-        with col4:
-            # Actions
-            if st.button(f"👁️ View Details", key=f"view_{issue_id}"):
-                st.session_state[f'show_details_{issue_id}'] = not st.session_state.get(f'show_details_{issue_id}', False)
+            with col4:
+                # Actions
+                if st.button(f"👁️ View Details", key=f"view_{issue_id}"):
+                    st.session_state[f'show_details_{issue_id}'] = not st.session_state.get(f'show_details_{issue_id}', False)
             
-            # Reassign department
-            departments = ["Sanitation", "Public Works", "Traffic Police", 
-                          "Water Department", "Electricity Board", "Parks & Recreation", "Other"]
-            current_dept = issue.get('department', 'Other')
+                # Reassign department
+                departments = ["Sanitation", "Public Works", "Traffic Police", 
+                              "Water Department", "Electricity Board", "Parks & Recreation", "Other"]
+                current_dept = issue.get('department', 'Other')
             
-            new_dept = st.selectbox(
-                "Reassign",
-                departments,
-                index=departments.index(current_dept) if current_dept in departments else 0,
-                key=f"dept_{issue_id}"
-            )
+                new_dept = st.selectbox(
+                    "Reassign",
+                    departments,
+                    index=departments.index(current_dept) if current_dept in departments else 0,
+                    key=f"dept_{issue_id}"
+                )
             
-            if new_dept != current_dept:
-                # Update department
-                for i, stored_issue in enumerate(st.session_state.issues):
-                    if stored_issue.get('id') == issue.get('id'):
-                        st.session_state.issues[i]['department'] = new_dept
-                        st.session_state.issues[i]['last_updated'] = datetime.now().isoformat()
+                if new_dept != current_dept:
+                    # Update department
+                    if reassign_issue_department(issue_id, new_dept):
                         st.info(f"🔄 Reassigned to {new_dept}")
                         st.rerun()
         
-        # Detailed view (expandable)
-        if st.session_state.get(f'show_details_{issue_id}', False):
-            st.markdown("---")
+            # Detailed view (expandable)
+            if st.session_state.get(f'show_details_{issue_id}', False):
+                st.markdown("---")
             
-            detail_col1, detail_col2 = st.columns([2, 1])
+                detail_col1, detail_col2 = st.columns([2, 1])
             
-            with detail_col1:
-                st.markdown("#### 📋 Additional Details")
-                st.markdown(f"**🆔 Issue ID:** {issue.get('id', 'N/A')}")
-                st.markdown(f"**📧 Email:** {issue.get('email', 'Not provided')}")
-                st.markdown(f"**📞 Preferred Contact:** {issue.get('preferred_contact', 'SMS')}")
-                st.markdown(f"**🤖 AI Routing:** {issue.get('routing_method', 'Unknown')} "
-                          f"(Confidence: {issue.get('ai_confidence', 0):.2f})")
+                with detail_col1:
+                    st.markdown("#### 📋 Additional Details")
+                    st.markdown(f"**🆔 Issue ID:** {issue.get('id', 'N/A')}")
+                    st.markdown(f"**📧 Email:** {issue.get('email', 'Not provided')}")
+                    st.markdown(f"**📞 Preferred Contact:** {issue.get('preferred_contact', 'SMS')}")
+                    st.markdown(f"**🤖 AI Routing:** {issue.get('routing_method', 'Unknown')} "
+                              f"(Confidence: {issue.get('ai_confidence', 0):.2f})")
                 
-                if issue.get('latitude') and issue.get('longitude'):
-                    st.markdown(f"**🗺️ GPS:** {issue['latitude']:.4f}, {issue['longitude']:.4f}")
+                    if issue.get('latitude') and issue.get('longitude'):
+                        st.markdown(f"**🗺️ GPS:** {issue['latitude']:.4f}, {issue['longitude']:.4f}")
                 
-                # Admin notes
-                admin_notes = st.text_area(
-                    "Admin Notes",
-                    value=issue.get('admin_notes', ''),
-                    key=f"notes_{issue_id}",
-                    help="Internal notes for staff use"
-                )
+                    # Admin notes
+                    admin_notes = st.text_area(
+                        "Admin Notes",
+                        value=issue.get('admin_notes', ''),
+                        key=f"notes_{issue_id}",
+                        help="Internal notes for staff use"
+                    )
                 
-                if st.button(f"💾 Save Notes", key=f"save_notes_{issue_id}"):
-                    for i, stored_issue in enumerate(st.session_state.issues):
-                        if stored_issue.get('id') == issue.get('id'):
-                            st.session_state.issues[i]['admin_notes'] = admin_notes
+                    if st.button(f"💾 Save Notes", key=f"save_notes_{issue_id}"):
+                        if patch_issue(issue_id, {'admin_notes': admin_notes}):
                             st.success("✅ Notes saved")
             
-            with detail_col2:
-                if issue.get('image_data'):
-                    st.markdown("#### 📸 Attached Image")
-                    try:
-                        img_bytes = base64.b64decode(issue['image_data'])
-                        img = Image.open(io.BytesIO(img_bytes))
-                        st.image(img, caption="Issue Photo", use_column_width=True)
-                    except Exception as e:
-                        st.error(f"Error loading image: {e}")
-                else:
-                    st.markdown("#### 📸 No Image")
-                    st.info("No image was attached to this report")
-        
-        st.markdown("</div>", unsafe_allow_html=True)
+                with detail_col2:
+                    if has_image(issue):
+                        st.markdown("#### 📸 Attached Image")
+                        try:
+                            st.image(get_issue_image(issue, thumbnail=False), caption="Issue Photo",
+                                     use_column_width=True)
+                        except Exception as e:
+                            st.error(f"Error loading image: {e}")
+                    else:
+                        st.markdown("#### 📸 No Image")
+                        st.info("No image was attached to this report")
+        
+            st.markdown("</div>", unsafe_allow_html=True)
+    
+    card_prev_col, card_next_col = st.columns(2)
+    with card_prev_col:
+        if len(card_cursors) > 1 and st.button("⬅️ Previous", key="admin_cards_prev_page"):
+            card_cursors.pop()
+            st.rerun()
+    with card_next_col:
+        if next_card_cursor and st.button("Next ➡️", key="admin_cards_next_page"):
+            card_cursors.append(next_card_cursor)
+            st.rerun()
 
 # Bulk actions
 st.markdown("---")
@@ -616,18 +682,19 @@ if st.session_state.issues:
     
     with col1:
         if st.button("📨 Send Status Updates", help="Send notifications to all pending issues"):
-            pending_count = len([i for i in st.session_state.issues if i.get('status') == 'Pending'])
+            pending_count = get_issue_statistics().get('pending', 0)
             st.success(f"✅ Status updates sent to {pending_count} citizens")
     
     with col2:
         if st.button("🚨 Mark High Priority", help="Escalate all emergency-related issues"):
-            emergency_keywords = ['emergency', 'urgent', 'danger', 'accident', 'fire', 'flood']
-            escalated = 0
-            for issue in st.session_state.issues:
-                title_desc = f"{issue.get('title', '')} {issue.get('description', '')}".lower()
-                if any(keyword in title_desc for keyword in emergency_keywords):
-                    issue['priority'] = 'High'
-                    escalated += 1
+            # One pass over all issues with the compiled high priority keywords
+            issues = st.session_state.issues
+            matched = get_rules().match_many(
+                (f"{issue.get('title', '')} {issue.get('description', '')}" for issue in issues),
+                'priority', 'High'
+            )
+            escalated = patch_issues({issues[position]['id']: {'priority': 'High'}
+                                      for position in matched if issues[position].get('priority') != 'High'})
             
             if escalated > 0:
                 st.success(f"✅ Escalated {escalated} issues to high priority")
@@ -636,11 +703,21 @@ if st.session_state.issues:
     
     with col3:
         if st.button("🔄 Auto-Assign Pending", help="Run AI assignment on unassigned issues"):
-            unassigned = [i for i in st.session_state.issues if i.get('department') == 'General']
+            unassigned = find_unrouted_issues()
             if unassigned:
-                st.success(f"✅ AI assignment initiated for {len(unassigned)} issues")
+                # Routed by the background workers; the page stays usable meanwhile
+                submit_batch_routing(unassigned)
             else:
                 st.info("ℹ️ All issues are already assigned")
+        
+        job = get_batch_routing()
+        if job is not None:
+            # Polls only while the batch runs
+            st.fragment(show_batch_routing, run_every=1.0 if job.running() else None)(job)
+        
+        cache_stats = get_cache_stats()
+        st.caption(f"AI cache: {cache_stats['disk_entries']} results stored, "
+                   f"{cache_stats['hit_rate']:.0%} hit rate ({cache_stats['hits']} hits, {cache_stats['misses']} misses)")
 
 # Footer
 st.markdown("""
@@ -0,0 +1,14 @@
+import pytest
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run against an empty data directory with a fresh in-memory store"""
+    from utils import categorization_cache, data_manager
+
+    monkeypatch.chdir(tmp_path)
+    for name in ('_store', '_store_version', '_log_record_count', '_last_seq'):
+        monkeypatch.setattr(data_manager, name, None)
+    monkeypatch.setattr(categorization_cache, '_connection', None)
+    monkeypatch.setattr(categorization_cache, '_connection_version', None)
+    categorization_cache._memory.clear()
+    return tmp_path
@@ -0,0 +1,75 @@
+import random
+
+import pandas as pd
+
+from utils.analytics import AnalyticsIndex, department_summary, location_area, totals
+from utils.data_manager import get_analytics_frame, patch_issue, save_issue
+from utils.issue_store import IssueStore
+
+STATUSES = ['Pending', 'In Progress', 'Resolved', None]
+DEPARTMENTS = ['Sanitation', 'Water Supply', None]
+LOCATIONS = ['Ward 1, Main Road', 'Ward 2, Market', 'Ward 2', None]
+TIMESTAMPS = ['2026-03-01T09:00:00', '2026-03-02T18:30:00', '2026-04-11T00:00:00', 'yesterday', None]
+
+def _random_issue(rng, number):
+    return {'id': f'CIV-{number}', 'status': rng.choice(STATUSES), 'department': rng.choice(DEPARTMENTS),
+            'location': rng.choice(LOCATIONS), 'timestamp': rng.choice(TIMESTAMPS),
+            'ai_confidence': rng.choice([0.9, 0.35, 'high', None])}
+
+def _expected_rows(issues):
+    rows = []
+    for issue in issues:
+        timestamp = pd.to_datetime(issue.get('timestamp'), errors='coerce')
+        confidence = issue.get('ai_confidence', 0)
+        rows.append((issue.get('status') or 'Pending', issue.get('department') or 'Unassigned',
+                     location_area(issue['location']) if issue.get('location') else 'Unknown',
+                     None if pd.isna(timestamp) else timestamp.normalize(),
+                     confidence if isinstance(confidence, float) else None))
+    return rows
+
+def _frame_rows(frame):
+    return [(status, department, area, None if pd.isna(date) else date, None if pd.isna(confidence) else confidence)
+            for status, department, area, date, confidence
+            in frame[['status', 'department', 'area', 'date', 'ai_confidence']].itertuples(index=False)]
+
+def test_frame_matches_a_recount_under_patches_and_removals():
+    rng = random.Random(16)
+    store = IssueStore()
+    # A small capacity so the arrays grow several times
+    analytics = store.attach_index('analytics', AnalyticsIndex(capacity=4))
+    next_number = 0
+    for step in range(400):
+        action = rng.random()
+        if action < 0.45 or len(store) < 5:
+            store.add(_random_issue(rng, next_number))
+            next_number += 1
+        elif action < 0.8:
+            issue_id = store.issues[rng.randrange(len(store))]['id']
+            store.patch(issue_id, {'status': rng.choice(STATUSES), 'location': rng.choice(LOCATIONS)})
+        else:
+            store.remove(store.issues[rng.randrange(len(store))]['id'])
+
+        if step % 40 == 0:
+            issues = [issue.to_dict() for issue in store.issues]
+            frame = analytics.frame()
+            assert _frame_rows(frame) == _expected_rows(issues)
+
+            summary = department_summary(frame, ['Pending', 'Resolved'])
+            for department in summary.index:
+                matching = [issue for issue in issues if (issue.get('department') or 'Unassigned') == department]
+                assert summary.loc[department, 'Total'] == len(matching)
+                assert summary.loc[department, 'Resolved'] == sum(issue.get('status') == 'Resolved'
+                                                                  for issue in matching)
+            assert totals(frame, 'area').sum() == len(issues)
+
+def test_shared_frame_is_rebuilt_only_after_a_write(data_dir):
+    save_issue({'id': 'CIV-1', 'status': 'Pending', 'location': 'Ward 3, Bus Stand',
+                'timestamp': '2026-03-01T09:00:00'})
+
+    frame = get_analytics_frame()
+    assert get_analytics_frame() is frame
+    patch_issue('CIV-1', {'status': 'Resolved'})
+    updated = get_analytics_frame()
+
+    assert updated is not frame
+    assert list(updated['status']) == ['Resolved'] and list(updated['area']) == ['Ward 3']
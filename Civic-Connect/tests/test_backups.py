@@ -0,0 +1,89 @@
+import os
+import time
+from datetime import datetime
+
+from utils import backup_store
+from utils.data_manager import (backup_data, cleanup_old_data, compact_issues, list_backups, load_issues,
+                                reassign_issue_department, restore_data, save_issue, update_issue_status)
+
+def _issue(number, status='Pending'):
+    return {'id': f'CIV-{number}', 'status': status, 'department': 'Sanitation',
+            'timestamp': f'2026-03-{number + 1:02d}T09:00:00'}
+
+def _state():
+    return sorted((issue.to_dict() for issue in load_issues()), key=lambda issue: issue['id'])
+
+def _moment():
+    # A timestamp strictly between the changes before and after it
+    time.sleep(0.01)
+    moment = datetime.now().isoformat()
+    time.sleep(0.01)
+    return moment
+
+def test_deltas_hold_only_the_changes_since_the_previous_backup(data_dir):
+    for number in range(3):
+        save_issue(_issue(number))
+    base = backup_data()
+    first_state = _state()
+    update_issue_status('CIV-0', 'Resolved')
+    # Compaction folds the log; the folded records wait in the journal
+    compact_issues()
+    assert backup_store.journal_segments()
+    save_issue(_issue(3))
+    delta = backup_data()
+    second_state = _state()
+    reassign_issue_department('CIV-1', 'Public Works')
+
+    assert backup_data() != delta
+    assert [(entry['kind'], entry['records']) for entry in list_backups()] == [('base', 3), ('delta', 2),
+                                                                               ('delta', 1)]
+    assert not backup_store.journal_segments()
+    assert backup_data() == list_backups()[-1]['file']
+
+    latest = _state()
+    assert restore_data(delta)
+    assert _state() == second_state
+    assert restore_data(base)
+    assert _state() == first_state
+    assert restore_data()
+    assert _state() == latest
+
+def test_restore_until_replays_changes_up_to_that_time(data_dir):
+    save_issue(_issue(0))
+    backup_data()
+    before_changes = _moment()
+    save_issue(_issue(1))
+    update_issue_status('CIV-0', 'In Progress')
+    between = _moment()
+    middle_state = _state()
+    update_issue_status('CIV-0', 'Resolved')
+    backup_data()
+
+    assert restore_data(until=between)
+    assert _state() == middle_state
+    assert restore_data(until=datetime.fromisoformat(before_changes))
+    assert [issue['id'] for issue in _state()] == ['CIV-0']
+    assert not restore_data(until='2000-01-01T00:00:00')
+
+def test_bulk_changes_and_the_base_interval_start_a_new_base(data_dir, monkeypatch):
+    monkeypatch.setattr(backup_store, 'BASE_INTERVAL', 2)
+    save_issue(_issue(0, status='Resolved'))
+    backup_data()
+    for number in (1, 2):
+        save_issue(_issue(number))
+        backup_data()
+    save_issue(_issue(3))
+    backup_data()
+    assert [entry['kind'] for entry in list_backups()] == ['base', 'delta', 'delta', 'base']
+
+    update_issue_status('CIV-3', 'Resolved')
+    compact_issues()
+    # Retention bypasses the change log, so a delta could not replay it
+    assert cleanup_old_data(days_threshold=0) == 2
+    assert not backup_store.journal_segments()
+    backup_data()
+
+    assert list_backups()[-1]['kind'] == 'base'
+    assert restore_data()
+    assert [issue['id'] for issue in _state()] == ['CIV-1', 'CIV-2']
+    assert all(os.path.exists(entry['file']) for entry in list_backups())
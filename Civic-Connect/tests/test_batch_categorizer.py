@@ -0,0 +1,146 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+from openai import AsyncOpenAI
+from PIL import Image
+
+from utils import ai_categorizer, batch_categorizer, categorization_queue
+from utils.ai_categorizer import DEPARTMENT_MAPPING
+from utils.batch_categorizer import (benchmark, categorize_batch, find_unrouted_issues, route_issues,
+                                     serve_fake_openai)
+from utils.categorization_cache import categorization_key, get_cached_categorization
+from utils.data_manager import get_issue, patch_issues, save_issue
+from utils.image_pipeline import process_image
+
+CONTEXTS = [{'title': f'Issue {i}', 'description': 'Overflowing garbage bin near the market',
+             'location': f'Ward {i}'} for i in range(8)]
+
+@pytest.fixture
+def fake_server():
+    servers = []
+
+    def start(**kwargs):
+        server, base_url = serve_fake_openai(**kwargs)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+def _categorize(base_url, contexts, **kwargs):
+    async def run():
+        client = AsyncOpenAI(api_key='test', base_url=base_url, max_retries=0)
+        try:
+            return await batch_categorizer.categorize_batch_async(contexts, client=client, **kwargs)
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
+
+def test_fake_server_answers_every_request(fake_server):
+    server, base_url = fake_server(latency=0, rate_limit_rate=0, error_rate=0)
+
+    results = _categorize(base_url, CONTEXTS, use_cache=False, use_local=False)
+
+    assert [method for _, _, method in results] == ['AI'] * len(CONTEXTS)
+    assert all(department in DEPARTMENT_MAPPING for department, _, _ in results)
+    assert server.counts == {'requests': len(CONTEXTS), 'rate_limited': 0, 'errors': 0}
+
+def test_rate_limits_are_retried_then_fall_back(fake_server):
+    server, base_url = fake_server(latency=0, rate_limit_rate=1.0, error_rate=0)
+
+    results = _categorize(base_url, CONTEXTS[:2], max_retries=1, use_cache=False, use_local=False)
+
+    assert results == [('Sanitation', results[0][1], 'Fallback')] * 2
+    assert server.counts['rate_limited'] == server.counts['requests'] == 4
+
+def test_server_errors_fall_back(fake_server):
+    server, base_url = fake_server(latency=0, rate_limit_rate=0, error_rate=1.0)
+
+    results = _categorize(base_url, CONTEXTS[:3], max_retries=0, use_cache=False, use_local=False)
+
+    assert [method for _, _, method in results] == ['Fallback'] * 3
+    assert server.counts['errors'] == 3
+
+def test_benchmark_reports_throughput(capsys):
+    benchmark(20, concurrency=10, latency=0)
+
+    output = capsys.readouterr().out
+    assert '20 issues, concurrency 10' in output
+    assert 'AI routed' in output
+
+def test_find_unrouted_issues_uses_department_and_routing_status(data_dir):
+    save_issue({'id': 'CIV-1', 'department': 'General', 'routing_status': 'ready'})
+    save_issue({'id': 'CIV-2', 'department': 'Sanitation', 'routing_status': 'failed'})
+    save_issue({'id': 'CIV-3', 'department': 'Sanitation', 'routing_status': 'processing'})
+    save_issue({'id': 'CIV-4', 'department': 'Sanitation', 'routing_status': 'ready'})
+    save_issue({'id': 'CIV-5', 'department': 'Sanitation'})
+
+    # CIV-3 is still queued for its single-issue routing
+    assert find_unrouted_issues() == ['CIV-1', 'CIV-2']
+
+def _upload():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2000, 1200), (90, 140, 60)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def test_route_issues_caches_photos_under_the_single_issue_key(data_dir, fake_server, monkeypatch):
+    server, base_url = fake_server(latency=0, rate_limit_rate=0, error_rate=0)
+    monkeypatch.setattr(batch_categorizer, 'OPENAI_BASE_URL', base_url)
+    upload = _upload()
+    context = {'title': 'Fallen tree', 'description': 'A tree is blocking the park path', 'location': 'Ward 2'}
+    image_fields = process_image(upload)
+    save_issue({'id': 'CIV-1', **context, 'department': 'General', **image_fields})
+
+    result = route_issues(['CIV-1'])
+
+    assert result['routed'] == 1
+    assert get_issue('CIV-1')['routing_status'] == 'ready'
+    # One image analysis and one categorization request
+    assert server.counts['requests'] == 2
+    key = categorization_key({**context, 'image_provided': True}, image_fields['image_ref'])
+    assert get_cached_categorization(key) is not None
+
+    # Single-issue routing of the same upload is answered from the cache
+    monkeypatch.setattr(ai_categorizer, 'client', None)
+    save_issue({'id': 'CIV-2', **context, 'department': 'Parks & Recreation', 'routing_status': 'processing'})
+    fields = categorization_queue._categorize('CIV-2', {**context, 'image_provided': True}, 'Parks & Recreation',
+                                              upload)
+    assert fields['routing_method'] == 'AI'
+    assert server.counts['requests'] == 2
+
+def test_photos_are_encoded_only_within_the_concurrency_limit(fake_server):
+    server, base_url = fake_server(latency=0, rate_limit_rate=0, error_rate=0)
+    lock = threading.Lock()
+    encoding = {'now': 0, 'most': 0}
+
+    def encode():
+        with lock:
+            encoding['now'] += 1
+            encoding['most'] = max(encoding['most'], encoding['now'])
+        time.sleep(0.02)
+        with lock:
+            encoding['now'] -= 1
+        return 'ref', 'aW1hZ2U='
+
+    results = _categorize(base_url, CONTEXTS, concurrency=2, use_cache=False, use_local=False,
+                          images=[('ref', encode)] * len(CONTEXTS))
+
+    assert [method for _, _, method in results] == ['AI'] * len(CONTEXTS)
+    assert encoding['most'] <= 2
+    assert server.counts['requests'] == 2 * len(CONTEXTS)
+
+def test_patch_issues_skips_issues_changed_since(data_dir):
+    save_issue({'id': 'CIV-1', 'department': 'Sanitation'})
+    save_issue({'id': 'CIV-2', 'department': 'Water Supply'})
+
+    updated = patch_issues({'CIV-1': {'routing_status': 'ready'}, 'CIV-2': {'routing_status': 'ready'}},
+                           expected={'CIV-1': {'department': 'Sanitation'}, 'CIV-2': {'department': 'Sanitation'}})
+
+    assert updated == 1
+    assert get_issue('CIV-1')['routing_status'] == 'ready'
+    assert 'routing_status' not in get_issue('CIV-2')
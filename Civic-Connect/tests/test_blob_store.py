@@ -0,0 +1,30 @@
+import base64
+
+from utils import data_manager
+from utils.blob_store import get_blob, get_issue_image_bytes, migrate_inline_images
+from utils.data_manager import get_issue, save_issue
+
+def test_migration_moves_images_in_chunked_writes(data_dir, monkeypatch):
+    images = {f'CIV-{number}': f'photo {number}'.encode() for number in range(5)}
+    for issue_id, image in images.items():
+        save_issue({'id': issue_id, 'status': 'Pending', 'image_data': base64.b64encode(image).decode()})
+    save_issue({'id': 'CIV-5', 'status': 'Pending', 'image_data': 'not base64!'})
+    save_issue({'id': 'CIV-6', 'status': 'Pending'})
+    writes = []
+    append_log = data_manager._append_log
+
+    def record(records):
+        writes.append(len(records))
+        append_log(records)
+
+    monkeypatch.setattr(data_manager, '_append_log', record)
+
+    assert migrate_inline_images(chunk_size=2) == 5
+
+    assert writes == [2, 2, 1]
+    for issue_id, image in images.items():
+        issue = get_issue(issue_id)
+        assert issue['image_data'] is None
+        assert get_blob(issue['image_ref']) == image == get_issue_image_bytes(issue)
+    assert get_issue('CIV-5')['image_data'] == 'not base64!'
+    assert migrate_inline_images() == 0
@@ -0,0 +1,59 @@
+from openai import OpenAI
+
+from utils import ai_categorizer, categorization_queue
+from utils.categorization_queue import _categorize, provisional_routing
+from utils.data_manager import get_issue, patch_issue, reassign_issue_department, save_issue
+
+def _unreachable_client():
+    # Nothing listens on the discard port, so every request fails to connect
+    return OpenAI(api_key='test', base_url='http://127.0.0.1:9/v1', max_retries=0, timeout=2)
+
+def test_categorize_marks_fallback_when_ai_fails(data_dir, monkeypatch):
+    monkeypatch.setattr(ai_categorizer, 'client', _unreachable_client())
+    context = {'title': 'Garbage bin overflowing', 'description': 'Trash everywhere near the market',
+               'location': 'Ward 5'}
+    routing = provisional_routing(context)
+    save_issue({'id': 'CIV-1', 'title': context['title'], 'description': context['description'],
+                'status': 'Submitted', **routing})
+
+    fields = _categorize('CIV-1', context, routing['department'])
+
+    assert fields['routing_method'] == 'Fallback'
+    assert fields['routing_status'] == 'failed'
+    issue = get_issue('CIV-1')
+    assert issue['routing_method'] == 'Fallback'
+    assert issue['routing_status'] == 'failed'
+    assert issue['department'] == 'Sanitation'
+
+def test_categorize_issue_with_ai_reports_fallback(data_dir, monkeypatch):
+    monkeypatch.setattr(ai_categorizer, 'client', _unreachable_client())
+
+    department, confidence, routing_method = ai_categorizer.categorize_issue_with_ai(
+        {'title': 'Streetlight not working', 'description': 'Power outage on the street'})
+
+    assert routing_method == 'Fallback'
+    assert department == 'Electricity Board'
+
+def test_patch_issue_checks_expected_fields(data_dir):
+    save_issue({'id': 'CIV-1', 'department': 'Sanitation', 'status': 'Pending'})
+
+    assert not patch_issue('CIV-1', {'status': 'Resolved'}, expected={'department': 'Water Supply'})
+    assert get_issue('CIV-1')['status'] == 'Pending'
+    assert patch_issue('CIV-1', {'status': 'Resolved'}, expected={'department': 'Sanitation'})
+    assert get_issue('CIV-1')['status'] == 'Resolved'
+
+def test_categorize_keeps_a_reassignment_made_while_routing(data_dir, monkeypatch):
+    context = {'title': 'Garbage bin overflowing', 'description': 'Trash everywhere near the market'}
+    routing = provisional_routing(context)
+    save_issue({'id': 'CIV-1', **context, 'status': 'Submitted', **routing})
+
+    def reassigned_meanwhile(issue_context, image_data=None, image_ref=None):
+        reassign_issue_department('CIV-1', 'Public Works')
+        return 'Water Supply', 0.9, 'AI'
+
+    monkeypatch.setattr(categorization_queue, 'categorize_issue_with_ai', reassigned_meanwhile)
+
+    assert _categorize('CIV-1', context, routing['department']) == {'routing_status': 'ready'}
+    issue = get_issue('CIV-1')
+    assert issue['department'] == 'Public Works'
+    assert issue['routing_status'] == 'ready'
@@ -0,0 +1,103 @@
+import os
+
+from utils import data_manager, partitions, snapshot_cache
+from utils.data_manager import compact_issues, get_issue_statistics, load_issues, save_issue, update_issue_status
+from utils.issue_table import IssueTable
+
+def _issue(number, month, status='Pending'):
+    return {'id': f'CIV-{number}', 'title': f'Issue {number}', 'status': status,
+            'department': 'Sanitation', 'timestamp': f'2026-{month:02d}-10T09:00:00'}
+
+def _state():
+    return sorted((issue.to_dict() for issue in load_issues()), key=lambda issue: issue['id'])
+
+def _reload():
+    # What another process (or a restart) reads from disk
+    data_manager._store = None
+    data_manager._store_version = None
+
+def _written_segments(monkeypatch):
+    written = []
+    write_json = partitions._write_json
+
+    def record(path, data, **kwargs):
+        written.append(os.path.basename(path))
+        write_json(path, data, **kwargs)
+
+    monkeypatch.setattr(partitions, '_write_json', record)
+    return written
+
+def test_compaction_rewrites_only_touched_segments(data_dir, monkeypatch):
+    for number in range(6):
+        save_issue(_issue(number, month=number % 3 + 1))
+    assert compact_issues() == 6
+
+    written = _written_segments(monkeypatch)
+    update_issue_status('CIV-0', 'Resolved')
+    save_issue({**_issue(1, month=5), 'title': 'Moved to May'})
+    save_issue(_issue(6, month=1))
+    live, stats = _state(), get_issue_statistics()
+
+    assert compact_issues() == 3
+    assert sorted(name for name in written if name != 'manifest.json') == [
+        '2026-01.open.json', '2026-01.resolved.json', '2026-02.open.json', '2026-05.open.json']
+
+    _reload()
+    assert _state() == live
+    assert get_issue_statistics() == stats
+    os.remove(snapshot_cache.CACHE_FILE)
+    _reload()
+    assert _state() == live
+    manifest = partitions.read_manifest()
+    assert manifest['segments'] == {'2026-01': {'open': 2, 'resolved': 1}, '2026-02': {'open': 1},
+                                    '2026-03': {'open': 2}, '2026-05': {'open': 1}}
+
+def test_failed_compaction_leaves_segments_to_the_next(data_dir, monkeypatch):
+    for number in range(4):
+        save_issue(_issue(number, month=number + 1))
+    compact_issues()
+    update_issue_status('CIV-2', 'Resolved')
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+
+    with monkeypatch.context() as patched:
+        patched.setattr(data_manager, '_write_snapshot', fail)
+        assert compact_issues() == 0
+    save_issue(_issue(4, month=1))
+    live = _state()
+
+    assert compact_issues() == 2
+    _reload()
+    assert _state() == live
+    assert partitions.read_manifest()['segments']['2026-03'] == {'resolved': 1}
+
+def test_compaction_updates_the_cache_without_copying_the_live_table(data_dir, monkeypatch):
+    for number in range(6):
+        save_issue(_issue(number, month=number % 3 + 1))
+    compact_issues()
+    live_table = data_manager._get_store().issues
+    exported = []
+    to_columns = IssueTable.to_columns
+
+    def record(table):
+        exported.append(table is live_table)
+        return to_columns(table)
+
+    monkeypatch.setattr(IssueTable, 'to_columns', record)
+    update_issue_status('CIV-4', 'Resolved')
+    save_issue(_issue(6, month=7))
+
+    assert compact_issues() == 2
+    assert exported and not any(exported)
+    cached = snapshot_cache.load(data_manager._snapshot_stamp())
+    assert sorted((issue.to_dict() for issue in cached), key=lambda issue: issue['id']) == _state()
+
+def test_partition_positions_finds_undated_issues_between_months():
+    keys = [('', 'CIV-0'), ('2026-01-05', 'CIV-1'), ('2026-01-09', 'CIV-2'), ('2026/02/01', 'CIV-3'),
+            ('2026-03-01', 'CIV-4'), ('soon', 'CIV-5')]
+    positions = [10, 11, 12, 13, 14, 15]
+
+    assert data_manager._partition_positions(keys, positions, {'2026-01'}) == [11, 12]
+    assert data_manager._partition_positions(keys, positions, {partitions.UNDATED}) == [10, 13, 15]
+    assert data_manager._partition_positions(keys, positions, {'2026-02'}) == []
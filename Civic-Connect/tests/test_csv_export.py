@@ -0,0 +1,52 @@
+import csv
+import io
+
+from utils.csv_export import csv_chunks, spool_csv
+from utils.data_manager import export_issues_to_csv, iter_issues, save_issue, stream_issues_csv
+
+def _rows(text):
+    return list(csv.reader(io.StringIO(text)))
+
+def test_chunks_hold_at_most_chunk_size_rows():
+    issues = ({'id': f'CIV-{number}', 'status': 'Pending'} for number in range(5))
+
+    chunks = list(csv_chunks(issues, columns=['id', 'status'], chunk_size=2))
+
+    assert [len(_rows(chunk)) for chunk in chunks] == [3, 2, 1]
+    assert _rows(''.join(chunks))[:2] == [['id', 'status'], ['CIV-0', 'Pending']]
+    assert list(csv_chunks([], columns=['id'])) == ['id\r\n']
+
+def test_cells_format_missing_and_nested_values():
+    issue = {'id': 'CIV-1', 'title': 'Pothole, "deep"', 'reassignment_history': [{'to': 'Public Works'}],
+             'image_data': 'aW1hZ2U=', 'admin_notes': 'internal'}
+
+    header, row = _rows(''.join(csv_chunks([issue])))
+    exported = dict(zip(header, row))
+
+    assert exported['title'] == 'Pothole, "deep"'
+    assert exported['reassignment_history'] == '[{"to": "Public Works"}]'
+    assert exported['location'] == ''
+    assert 'image_data' not in exported and 'admin_notes' not in exported
+
+def test_exports_stream_the_filtered_issues(data_dir):
+    for number in range(7):
+        save_issue({'id': f'CIV-{number}', 'status': 'Resolved' if number % 2 else 'Pending',
+                    'department': 'Sanitation' if number < 5 else 'Water Supply'})
+
+    # Chunks smaller than the match count cross the facet mask in several steps
+    assert [issue['id'] for issue in iter_issues({'status': 'Pending'}, chunk_size=2)] == \
+        ['CIV-0', 'CIV-2', 'CIV-4', 'CIV-6']
+    rows = _rows(''.join(stream_issues_csv({'status': ['Resolved'], 'department': 'Sanitation'},
+                                           columns=['id'], chunk_size=1)))
+    assert rows == [['id'], ['CIV-1'], ['CIV-3']]
+
+    filename = export_issues_to_csv(str(data_dir / 'issues.csv'), columns=['id'])
+    with open(filename, newline='') as f:
+        assert len(list(csv.reader(f))) == 8
+    assert export_issues_to_csv(columns=['id']) == ''.join(stream_issues_csv(columns=['id']))
+
+def test_spool_keeps_the_csv_bytes():
+    chunks = list(csv_chunks([{'id': 'CIV-1', 'title': 'Café'}], columns=['id', 'title']))
+
+    with spool_csv(chunks) as spool:
+        assert spool.read().decode('utf-8') == ''.join(chunks)
@@ -0,0 +1,58 @@
+import json
+
+from utils import data_manager
+from utils.data_manager import (find_issue, get_issue, patch_issue, reassign_issue_department, save_issue,
+                                update_issue_status)
+
+def _reload():
+    # What another process (or a restart) reads from disk
+    data_manager._store = None
+    data_manager._store_version = None
+
+def _log_records():
+    with open(data_manager.ISSUES_LOG) as f:
+        return [json.loads(line) for line in f]
+
+def test_patch_logs_only_the_changed_fields(data_dir):
+    save_issue({'id': 'CIV-1', 'title': 'Pothole', 'description': 'x' * 1000, 'status': 'Pending'})
+
+    assert patch_issue('CIV-1', {'status': 'In Progress'})
+    assert not patch_issue('CIV-9', {'status': 'In Progress'})
+
+    record = _log_records()[-1]
+    assert (record['op'], record['id'], record['fields']) == ('patch', 'CIV-1', {'status': 'In Progress'})
+    _reload()
+    assert get_issue('CIV-1') == {'id': 'CIV-1', 'title': 'Pothole', 'description': 'x' * 1000,
+                                  'status': 'In Progress'}
+
+def test_status_updates_stamp_acknowledgement_and_resolution_once(data_dir):
+    save_issue({'id': 'CIV-1', 'status': 'Pending'})
+
+    update_issue_status('CIV-1', 'In Progress', admin_notes='Crew sent')
+    acknowledged = get_issue('CIV-1')['acknowledged_at']
+    update_issue_status('CIV-1', 'Resolved')
+    update_issue_status('CIV-1', 'Resolved')
+    issue = get_issue('CIV-1')
+
+    assert issue['acknowledged_at'] == acknowledged
+    assert issue['admin_notes'] == 'Crew sent'
+    assert issue['resolved_at'] >= acknowledged
+    assert not update_issue_status('CIV-9', 'Resolved')
+
+def test_reassignment_appends_to_the_history(data_dir):
+    save_issue({'id': 'CIV-1', 'department': 'Sanitation'})
+
+    reassign_issue_department('CIV-1', 'Water Supply')
+    reassign_issue_department('CIV-1', 'Public Works')
+
+    history = get_issue('CIV-1')['reassignment_history']
+    assert [(entry['from'], entry['to']) for entry in history] == [('Sanitation', 'Water Supply'),
+                                                                   ('Water Supply', 'Public Works')]
+
+def test_find_issue_accepts_an_id_prefix(data_dir):
+    save_issue({'id': 'b7e1c2d4-0000', 'title': 'Second'})
+    save_issue({'id': 'a3f9c2d4-0000', 'title': 'First'})
+
+    assert find_issue('a3f9c2d4-0000')['title'] == 'First'
+    assert find_issue('b7e1')['title'] == 'Second'
+    assert find_issue('c') is None
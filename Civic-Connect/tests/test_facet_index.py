@@ -0,0 +1,69 @@
+import random
+
+from utils.facet_index import FACET_FIELDS, FacetIndex
+from utils.issue_store import IssueStore
+
+STATUSES = ['Pending', 'In Progress', 'Resolved', None]
+DEPARTMENTS = ['Sanitation', 'Water Supply', 'Public Works']
+PRIORITIES = ['High', 'Medium', 'Low']
+
+def _random_issue(rng, number):
+    issue = {'id': f'CIV-{number}', 'status': rng.choice(STATUSES), 'department': rng.choice(DEPARTMENTS)}
+    if rng.random() < 0.7:
+        issue['priority'] = rng.choice(PRIORITIES)
+    return issue
+
+def _matches(issue, filters):
+    return all(allowed is None or (issue.get(field) or FACET_FIELDS[field]) in allowed
+               for field, allowed in filters.items())
+
+def _expected_counts(issues, filters):
+    counts = {field: {} for field in FACET_FIELDS}
+    for field in FACET_FIELDS:
+        others = {other: allowed for other, allowed in filters.items() if other != field}
+        for issue in issues:
+            if _matches(issue, others):
+                value = issue.get(field) or FACET_FIELDS[field]
+                counts[field][value] = counts[field].get(value, 0) + 1
+    return counts
+
+def test_bitmaps_match_a_full_scan_under_patches_and_removals():
+    rng = random.Random(5)
+    store = IssueStore()
+    # A small capacity so the bitmaps grow several times
+    facets = store.attach_index('facets', FacetIndex(capacity=4))
+    next_number = 0
+    for step in range(600):
+        action = rng.random()
+        if action < 0.45 or len(store) < 5:
+            store.add(_random_issue(rng, next_number))
+            next_number += 1
+        elif action < 0.75:
+            issue_id = store.issues[rng.randrange(len(store))]['id']
+            store.patch(issue_id, {'status': rng.choice(STATUSES), 'priority': rng.choice(PRIORITIES)})
+        elif action < 0.85:
+            # Replacing a record with a new version of it
+            issue_id = store.issues[rng.randrange(len(store))]['id']
+            store.add({**_random_issue(rng, 0), 'id': issue_id})
+        else:
+            store.remove(store.issues[rng.randrange(len(store))]['id'])
+
+        if step % 50 == 0:
+            issues = [issue.to_dict() for issue in store.issues]
+            for filters in ({}, {'status': ['Pending']}, {'status': ['Resolved', 'In Progress'],
+                                                         'department': ['Sanitation'], 'priority': None},
+                            {'priority': ['Medium'], 'department': ['Water Supply', 'Public Works']}):
+                expected = [position for position, issue in enumerate(issues) if _matches(issue, filters)]
+                assert facets.positions(filters).tolist() == expected
+                assert facets.facet_counts(filters) == _expected_counts(issues, filters)
+
+def test_values_drop_once_no_issue_has_them():
+    store = IssueStore([{'id': 'CIV-1', 'department': 'Sanitation'}, {'id': 'CIV-2', 'department': 'Parks'}])
+    facets = store.attach_index('facets', FacetIndex())
+
+    store.patch('CIV-2', {'department': 'Sanitation'})
+
+    assert facets.values('department') == ['Sanitation']
+    # Issues without a status count under the default shown by the pages
+    assert facets.values('status') == ['Pending']
+    assert facets.positions({'department': ['Parks']}).tolist() == []
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+from PIL import Image
+
+from utils import image_cache
+from utils.blob_store import put_blob
+from utils.image_cache import clear_image_cache, get_issue_image
+
+def _blob(size, color=(0, 120, 200)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return put_blob(buffer.getvalue())
+
+@pytest.fixture
+def decodes(data_dir, monkeypatch):
+    """Count image reads, starting from an empty cache"""
+    clear_image_cache()
+    reads = []
+    read = image_cache.get_issue_image_bytes
+
+    def record(issue, thumbnail=False):
+        reads.append((issue['id'], thumbnail))
+        return read(issue, thumbnail=thumbnail)
+
+    monkeypatch.setattr(image_cache, 'get_issue_image_bytes', record)
+    yield reads
+    clear_image_cache()
+
+def test_each_image_is_decoded_once(decodes):
+    issue = {'id': 'CIV-1', 'image_ref': _blob((64, 48)), 'thumbnail_ref': _blob((32, 24))}
+
+    thumbnail = get_issue_image(issue)
+    assert get_issue_image(issue) is thumbnail
+    full = get_issue_image(issue, thumbnail=False)
+
+    assert (thumbnail.size, full.size) == ((32, 24), (64, 48))
+    assert decodes == [('CIV-1', True), ('CIV-1', False)]
+    assert get_issue_image({'id': 'CIV-2'}) is None
+
+def test_a_replaced_image_is_decoded_again(decodes):
+    issue = {'id': 'CIV-1', 'image_ref': _blob((10, 10))}
+    get_issue_image(issue)
+
+    replaced = get_issue_image({**issue, 'image_ref': _blob((20, 20))})
+
+    assert replaced.size == (20, 20)
+    assert len(decodes) == 2
+
+def test_least_recently_used_images_are_evicted_past_the_byte_limit(decodes, monkeypatch):
+    # Room for two 10x10 RGB images
+    monkeypatch.setattr(image_cache, 'MAX_CACHE_BYTES', 2 * 10 * 10 * 3)
+    issues = [{'id': f'CIV-{number}', 'image_ref': _blob((10, 10), (number, 0, 0))} for number in range(3)]
+    too_large = {'id': 'CIV-9', 'image_ref': _blob((20, 20))}
+
+    for issue in (issues[0], issues[1], issues[0], issues[2], too_large):
+        get_issue_image(issue)
+    decodes.clear()
+    for issue in (issues[0], issues[2], issues[1]):
+        get_issue_image(issue)
+
+    # CIV-1 was the least recently used when CIV-2 came in
+    assert decodes == [('CIV-1', True)]
+    assert image_cache._cache_bytes <= image_cache.MAX_CACHE_BYTES
@@ -0,0 +1,60 @@
+import base64
+import io
+
+from PIL import Image
+
+from utils.blob_store import get_blob
+from utils.data_manager import get_issue, save_issue
+from utils.image_pipeline import (MAX_IMAGE_SIZE, THUMBNAIL_SIZE, encode_for_analysis, process_image,
+                                  submit_image_ingest)
+
+def _photo(size=(3000, 2000), orientation=None):
+    image = Image.new('RGB', size, (200, 80, 40))
+    exif = Image.Exif()
+    exif[0x0110] = 'Test camera'
+    if orientation is not None:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+def _open(data):
+    return Image.open(io.BytesIO(data))
+
+def test_upload_is_downscaled_rotated_and_stripped(data_dir):
+    # Orientation 6: the camera was turned, the picture is shown rotated
+    fields = process_image(_photo(orientation=6))
+
+    full = _open(get_blob(fields['image_ref']))
+    thumbnail = _open(get_blob(fields['thumbnail_ref']))
+    assert full.format == 'JPEG' and full.size == (1067, MAX_IMAGE_SIZE)
+    assert (fields['image_width'], fields['image_height']) == full.size
+    assert max(thumbnail.size) == THUMBNAIL_SIZE
+    assert not full.getexif() and not thumbnail.getexif()
+
+def test_small_uploads_keep_their_size(data_dir):
+    fields = process_image(_photo(size=(640, 480)))
+
+    assert (fields['image_width'], fields['image_height']) == (640, 480)
+    assert _open(get_blob(fields['image_ref'])).size == (640, 480)
+
+def test_analysis_copy_is_the_same_from_the_upload_and_the_stored_image(data_dir):
+    upload = _photo()
+    stored = get_blob(process_image(upload)['image_ref'])
+
+    analysis = encode_for_analysis(upload)
+
+    assert analysis == encode_for_analysis(stored, stored=True)
+    assert max(_open(base64.b64decode(analysis)).size) == 512
+
+def test_background_ingest_patches_the_issue(data_dir):
+    save_issue({'id': 'CIV-1', 'image_status': 'processing'})
+    save_issue({'id': 'CIV-2', 'image_status': 'processing'})
+
+    submit_image_ingest('CIV-1', _photo()).result()
+    submit_image_ingest('CIV-2', b'not an image').result()
+
+    issue = get_issue('CIV-1')
+    assert issue['image_status'] == 'ready'
+    assert get_blob(issue['thumbnail_ref']) is not None
+    assert get_issue('CIV-2')['image_status'] == 'failed'
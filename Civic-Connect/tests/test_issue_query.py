@@ -0,0 +1,50 @@
+from utils.data_manager import patch_issue, query_issues, save_issue
+
+def _save(number, **fields):
+    save_issue({'id': f'CIV-{number}', 'title': f'Issue {number}', 'status': 'Pending', 'priority': 'Medium',
+                'department': 'Sanitation', 'timestamp': f'2026-03-{number + 1:02d}T09:00:00', **fields})
+
+def _ids(issues):
+    return [issue['id'] for issue in issues]
+
+def test_pages_follow_the_sort_order(data_dir):
+    for number in range(5):
+        _save(number, priority='High' if number % 2 else 'Low')
+
+    first, cursor = query_issues(None, 'priority', 2)
+    second, cursor = query_issues(None, 'priority', 2, cursor)
+    third, cursor = query_issues(None, 'priority', 2, cursor)
+
+    assert _ids(first + second + third) == ['CIV-3', 'CIV-1', 'CIV-4', 'CIV-2', 'CIV-0']
+    assert cursor is None
+
+def test_cursor_resumes_after_its_group_empties(data_dir):
+    for number in range(2):
+        _save(number, priority='High')
+    for number in range(2, 5):
+        _save(number, priority='Low')
+
+    first, cursor = query_issues(None, 'priority', 1)
+    assert _ids(first) == ['CIV-1']
+    # No issue is High priority any more when the next page is loaded
+    for number in (0, 1):
+        patch_issue(f'CIV-{number}', {'priority': 'Medium'})
+
+    rest, cursor = query_issues(None, 'priority', 10, cursor)
+
+    assert _ids(rest) == ['CIV-1', 'CIV-0', 'CIV-4', 'CIV-3', 'CIV-2']
+    assert cursor is None
+
+def test_department_cursor_skips_to_next_department(data_dir):
+    _save(0, department='Parks & Recreation')
+    _save(1, department='Parks & Recreation')
+    _save(2, department='Water Department')
+
+    first, cursor = query_issues({'department': ['Parks & Recreation', 'Water Department']}, 'department', 1)
+    assert _ids(first) == ['CIV-1']
+    for number in (0, 1):
+        patch_issue(f'CIV-{number}', {'department': 'Sanitation'})
+
+    second, cursor = query_issues({'department': ['Parks & Recreation', 'Water Department']}, 'department', 1,
+                                  cursor)
+    assert _ids(second) == ['CIV-2']
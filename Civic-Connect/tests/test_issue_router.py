@@ -0,0 +1,80 @@
+import os
+import random
+
+import numpy as np
+
+from utils import issue_router
+from utils.issue_router import (MIN_TRAINING_ISSUES, IssueRouter, classify_locally, get_router, train_router,
+                                training_data)
+
+VOCABULARY = {
+    'Sanitation': ['garbage', 'trash', 'overflowing bin', 'litter', 'waste pile'],
+    'Water Department': ['pipe leak', 'no water', 'dirty water', 'burst pipeline', 'sewage'],
+    'Electricity Board': ['streetlight', 'power cut', 'transformer', 'sparking wire', 'outage'],
+}
+FILLER = ['near the market', 'since monday', 'please help', 'on main road', 'for two days', 'again']
+
+def _issues(count, seed=24):
+    rng = random.Random(seed)
+    issues = []
+    for number in range(count):
+        department = rng.choice(sorted(VOCABULARY))
+        issues.append({'id': f'CIV-{number}', 'department': department, 'routing_method': 'AI',
+                       'title': rng.choice(VOCABULARY[department]),
+                       'description': f"{rng.choice(VOCABULARY[department])} {rng.choice(FILLER)}"})
+    return issues
+
+def test_training_data_keeps_trusted_labels_only():
+    issues = [
+        {'id': 'CIV-1', 'department': 'Sanitation', 'routing_method': 'AI'},
+        {'id': 'CIV-2', 'department': 'Sanitation', 'routing_method': 'Fallback'},
+        {'id': 'CIV-3', 'department': 'Sanitation', 'routing_method': 'Fallback', 'status': 'Resolved'},
+        {'id': 'CIV-4', 'department': 'Sanitation', 'routing_method': 'Local', 'reassignment_history': [{}]},
+        {'id': 'CIV-5', 'department': 'General', 'routing_method': 'Manual'},
+        {'id': 'CIV-6', 'department': 'Public Works', 'routing_method': 'Manual'},
+    ]
+
+    train, holdout = training_data(issues)
+
+    assert sorted(weight for context, department, weight in train + holdout) == [1.0, 1.0, 2.0, 3.0]
+    # The holdout split depends on the issue ID alone, not on the order
+    many = _issues(100)
+    holdout = training_data(many)[1]
+    assert 0 < len(holdout) < 50
+    assert sorted(map(str, training_data(many[::-1])[1])) == sorted(map(str, holdout))
+
+def test_too_few_labelled_issues_train_nothing(data_dir):
+    assert train_router(_issues(MIN_TRAINING_ISSUES - 1)) is None
+    assert get_router() is None
+    assert classify_locally({'title': 'garbage', 'description': 'trash'}) is None
+
+def test_retrained_router_routes_confident_issues_only(data_dir, monkeypatch):
+    monkeypatch.setattr(issue_router, '_loaded', None)
+    monkeypatch.setattr(issue_router, '_loaded_mtime', None)
+    router = train_router(_issues(400))
+
+    assert router.threshold < 1.0
+    holdout = router.info['holdout']
+    chosen = next(row for row in holdout['thresholds'] if row['threshold'] == router.threshold)
+    assert chosen['accuracy'] >= issue_router.TARGET_ACCURACY
+    assert classify_locally({'title': 'overflowing bin', 'description': 'garbage near the market'})[0] == \
+        'Sanitation'
+    assert classify_locally({'title': 'sparking wire', 'description': 'power cut on main road'})[0] == \
+        'Electricity Board'
+    # Nothing the router has seen, so it hands the issue to the AI
+    assert classify_locally({'title': 'stray dogs', 'description': 'barking all night'}) is None
+
+    # A retrained model file is picked up without a restart
+    router.threshold = 1.0
+    router.save()
+    os.utime(issue_router.MODEL_FILE, (1, 1))
+    assert get_router().threshold == 1.0
+    assert classify_locally({'title': 'overflowing bin', 'description': 'garbage'}) is None
+
+def test_calibration_picks_the_lowest_threshold_reaching_the_target():
+    router = IssueRouter(['Sanitation'], np.zeros((1, 1)), np.zeros(1), np.zeros(1))
+    rows = [{'threshold': 0.5, 'accuracy': 0.9}, {'threshold': 0.7, 'accuracy': None},
+            {'threshold': 0.8, 'accuracy': 0.96}, {'threshold': 0.9, 'accuracy': 0.99}]
+
+    assert router.calibrate({'thresholds': rows}) == 0.8
+    assert router.calibrate({'thresholds': rows[:2]}) == 1.0 == router.threshold
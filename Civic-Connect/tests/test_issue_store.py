@@ -0,0 +1,74 @@
+import pytest
+
+from utils.issue_store import IssueStore
+
+def _store(count):
+    return IssueStore([{'id': f'CIV-{i}', 'status': 'Pending', 'title': f'Issue {i}'} for i in range(count)])
+
+def test_view_follows_issue_moved_by_remove():
+    store = _store(3)
+    last = store.get('CIV-2')
+
+    store.remove('CIV-0')
+
+    # The last row was moved into the removed slot; the view still reads CIV-2
+    assert store.positions['CIV-2'] == 0
+    assert last['id'] == 'CIV-2'
+    assert last.to_dict() == {'id': 'CIV-2', 'status': 'Pending', 'title': 'Issue 2'}
+
+def test_view_of_removed_issue_raises():
+    store = _store(3)
+    removed = store.get('CIV-1')
+
+    store.remove('CIV-1')
+
+    assert store.get('CIV-1') is None
+    with pytest.raises(LookupError):
+        removed.get('status')
+
+def test_id_index_tracks_adds_and_removes():
+    store = _store(50)
+    for i in range(0, 50, 3):
+        store.remove(f'CIV-{i}')
+    for i in range(50, 120):
+        store.add({'id': f'CIV-{i}', 'status': 'Pending'})
+    # Replacing an issue keeps its row
+    store.add({'id': 'CIV-1', 'status': 'Resolved'})
+
+    expected = {record['id']: position for position, record in enumerate(store.issues)}
+    assert len(store.positions) == len(expected) == 103
+    assert {issue_id: store.positions[issue_id] for issue_id in expected} == expected
+    assert 'CIV-3' not in store and store.positions.get('CIV-3') is None
+    assert store.get('CIV-1')['status'] == 'Resolved'
+
+class _Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def on_add(self, position, issue):
+        self.calls.append(('add', position, issue['id']))
+
+    def on_patch(self, position, issue, old_fields):
+        self.calls.append(('patch', position, issue['id'], old_fields))
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        self.calls.append(('remove', position, removed_issue['id'], moved_issue and moved_issue['id']))
+
+def test_indexes_hear_each_change_with_its_old_values():
+    store = _store(3)
+    recorder = store.attach_index('recorder', _Recorder(), build=False)
+
+    store.patch('CIV-1', {'status': 'Resolved'})
+    store.add({'id': 'CIV-1', 'status': 'Pending', 'priority': 'High'})
+    store.add({'id': 'CIV-3', 'status': 'Pending'})
+    store.remove('CIV-0')
+    assert store.patch('CIV-9', {'status': 'Resolved'}) is None
+
+    assert recorder.calls == [
+        ('patch', 1, 'CIV-1', {'status': 'Pending'}),
+        # Replacing a record reports every field either version has
+        ('patch', 1, 'CIV-1', {'id': 'CIV-1', 'status': 'Resolved', 'title': 'Issue 1', 'priority': None}),
+        ('add', 3, 'CIV-3'),
+        ('remove', 0, 'CIV-0', 'CIV-3')
+    ]
+    assert store.get('CIV-1').to_dict() == {'id': 'CIV-1', 'status': 'Pending', 'priority': 'High'}
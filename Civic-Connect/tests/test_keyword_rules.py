@@ -0,0 +1,62 @@
+import random
+import re
+
+from utils import keyword_rules
+from utils.keyword_rules import KeywordRules, get_keywords, get_rules, set_keywords
+
+def _found(keywords, text):
+    # Per-keyword reference: the keyword at the start of a word
+    return {keyword for keyword in keywords if re.search(r'\b' + re.escape(keyword), text.lower())}
+
+def test_keywords_match_at_word_starts_only():
+    rules = KeywordRules(keyword_rules.DEFAULT_RULES)
+
+    assert rules.keywords_in('The kitchen cabinet is fine') == set()
+    assert rules.keywords_in('Water LEAKING from the pipes') == {'water', 'leak', 'pipe'}
+    # A keyword inside a longer one that matched is counted too
+    assert rules.keywords_in('Gas leak near the school') == {'gas leak', 'leak'}
+    assert rules.department('Streetlight wire sparking, power out') == ('Electricity Board', 3)
+    assert rules.department('nothing to see') == (None, 0)
+    assert rules.priority('Repair needed soon') == 'Medium'
+    assert rules.priority('urgent: the drain is blocked and broken') == 'High'
+    assert rules.priority('a quiet street') == 'Low'
+
+def test_trie_regex_finds_the_same_keywords_as_a_per_keyword_scan():
+    rng = random.Random(25)
+    keywords = ['light', 'lights', 'streetlight', 'lighter', 'li', 'leak', 'gas leak', 'gas', 'water',
+                'water leak', 'wa', 'bin', 'binding', 'c++', 'a.b']
+    rules = KeywordRules({'department': {f'D{number}': [keyword] for number, keyword in enumerate(keywords)}})
+    pieces = keywords + ['x', 'ca', 'street', 'ter', ' ', ' ', '-', '.', '+', 'Gas', 'LIGHT']
+
+    for _ in range(2000):
+        text = ''.join(rng.choice(pieces) + rng.choice(['', ' ']) for _ in range(rng.randrange(1, 8)))
+        assert rules.keywords_in(text) == _found(keywords, text), text
+
+def test_match_many_is_exact_across_chunk_boundaries(monkeypatch):
+    monkeypatch.setattr(keyword_rules, 'MATCH_CHUNK', 3)
+    rng = random.Random(3)
+    keywords = keyword_rules.DEFAULT_RULES['priority']['High']
+    rules = KeywordRules(keyword_rules.DEFAULT_RULES)
+    words = ['road', 'ur', 'gent', 'urgent', 'fire', 'fireman', 'wildfire', 'gas', 'leak', 'gas leak', 'blocked',
+             'un', 'blocked.', 'Flood', '']
+    texts = [' '.join(rng.choice(words) for _ in range(rng.randrange(0, 4))) for _ in range(500)]
+    # A keyword split across two neighbouring texts never matches
+    texts[2:4] = ['wait ur', 'gent']
+
+    expected = [index for index, text in enumerate(texts) if _found(keywords, text)]
+    assert rules.match_many(iter(texts), 'priority', 'High') == expected
+    assert 2 not in expected and 3 not in expected
+    assert rules.match_many(texts, 'priority', 'Unknown') == []
+    assert rules.match_many([], 'priority', 'High') == []
+
+def test_admin_edits_recompile_the_shared_rules(data_dir, monkeypatch):
+    monkeypatch.setattr(keyword_rules, '_rules', None)
+    rules = get_rules()
+    assert get_rules() is rules
+
+    assert set_keywords('department', 'Sanitation', [' Stench ', 'garbage', '', 'stench']) == ['stench', 'garbage']
+
+    assert get_keywords('department', 'Sanitation') == ['stench', 'garbage']
+    assert get_rules().department('A stench from the lane') == ('Sanitation', 1)
+    assert get_rules().keywords_in('trash everywhere') == set()
+    assert get_keywords('department', 'Public Works') == keyword_rules.DEFAULT_RULES['department']['Public Works']
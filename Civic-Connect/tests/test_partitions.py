@@ -0,0 +1,99 @@
+import json
+import os
+from datetime import datetime
+
+from utils import data_manager, partitions
+from utils.data_manager import cleanup_old_data, compact_issues, get_issue_statistics, load_issues, save_issue
+
+def _issue(number, timestamp, status='Resolved'):
+    return {'id': f'CIV-{number}', 'status': status, 'department': 'Sanitation', 'timestamp': timestamp}
+
+def _reload():
+    # What another process (or a restart) reads from disk
+    data_manager._store = None
+    data_manager._store_version = None
+
+def _ids(path):
+    with open(path) as f:
+        return sorted(issue['id'] for issue in json.load(f))
+
+class _June15(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 6, 15, 12, 0)
+
+def test_archiving_moves_whole_segments_and_splits_the_cutoff_month(data_dir):
+    manifest = partitions.write_segments([
+        _issue(0, '2026-01-05T09:00:00'), _issue(1, '2026-01-20T09:00:00'),
+        _issue(2, '2026-01-07T09:00:00', status='Pending'),
+        _issue(3, '2026-02-03T09:00:00'), _issue(4, '2026-02-25T09:00:00')])
+
+    assert partitions.archive_segment(manifest, '2026-01', 'resolved') == 2
+    assert partitions.archive_segment(manifest, '2026-02', 'resolved',
+                                      keep=lambda issue: issue['timestamp'] > '2026-02-10') == 1
+    assert partitions.archive_segment(manifest, '2026-02', 'resolved', keep=lambda issue: True) == 0
+    partitions.save_manifest(manifest)
+
+    assert partitions.read_manifest() == {'segments': {'2026-01': {'open': 1}, '2026-02': {'resolved': 1}}}
+    assert _ids(partitions.segment_path('2026-01', 'resolved', partitions.ARCHIVE_DIR)) == ['CIV-0', 'CIV-1']
+    assert _ids(partitions.segment_path('2026-02', 'resolved', partitions.ARCHIVE_DIR)) == ['CIV-3']
+    assert _ids(partitions.segment_path('2026-02', 'resolved')) == ['CIV-4']
+    assert not os.path.exists(partitions.segment_path('2026-01', 'resolved'))
+    assert [issue['id'] for issue in partitions.read_segments(partitions.read_manifest())] == \
+        ['CIV-2', 'CIV-4']
+
+def test_pending_archiving_is_finished_by_the_next_reader(data_dir):
+    manifest = partitions.write_segments([
+        _issue(0, '2026-01-05T09:00:00'), _issue(1, '2026-02-03T09:00:00'),
+        _issue(2, '2026-02-25T09:00:00'), _issue(3, '2026-03-01T09:00:00')])
+    partitions.archive_segment(manifest, '2026-01', 'resolved')
+    partitions.archive_segment(manifest, '2026-02', 'resolved', keep=lambda issue: issue['id'] == 'CIV-2')
+    partitions.archive_segment(manifest, '2026-03', 'resolved', keep=lambda issue: False)
+    # The process stops after the manifest is replaced, before the files are
+    partitions._write_json(partitions.MANIFEST_FILE, manifest)
+
+    manifest = partitions.read_manifest()
+
+    assert manifest == {'segments': {'2026-02': {'resolved': 1}}}
+    with open(partitions.MANIFEST_FILE) as f:
+        assert 'pending' not in json.load(f)
+    assert _ids(partitions.segment_path('2026-02', 'resolved')) == ['CIV-2']
+    assert not os.path.exists(partitions.segment_path('2026-02', 'resolved') + '.kept')
+    assert not os.path.exists(partitions.segment_path('2026-01', 'resolved'))
+    assert not os.path.exists(partitions.segment_path('2026-03', 'resolved'))
+    assert _ids(partitions.segment_path('2026-01', 'resolved', partitions.ARCHIVE_DIR)) == ['CIV-0']
+    assert _ids(partitions.segment_path('2026-03', 'resolved', partitions.ARCHIVE_DIR)) == ['CIV-3']
+
+def test_rearchiving_after_an_interrupted_run_does_not_double_records(data_dir):
+    manifest = partitions.write_segments([_issue(0, '2026-01-05T09:00:00'), _issue(1, '2026-01-20T09:00:00')])
+    partitions.archive_segment(manifest, '2026-01', 'resolved', keep=lambda issue: issue['id'] == 'CIV-1')
+    # Stopped before the manifest was saved, so the live segment is unchanged
+    manifest = partitions.read_manifest()
+
+    partitions.archive_segment(manifest, '2026-01', 'resolved', keep=lambda issue: issue['id'] == 'CIV-1')
+    partitions.save_manifest(manifest)
+
+    assert _ids(partitions.segment_path('2026-01', 'resolved', partitions.ARCHIVE_DIR)) == ['CIV-0']
+    assert _ids(partitions.segment_path('2026-01', 'resolved')) == ['CIV-1']
+
+def test_cleanup_archives_expired_resolved_issues(data_dir, monkeypatch):
+    monkeypatch.setattr(data_manager, 'datetime', _June15)
+    # 90 days before June 15 is March 17
+    for issue in [_issue(0, '2026-01-05T09:00:00'), _issue(1, '2026-01-08T09:00:00', status='Pending'),
+                  _issue(2, '2026-03-10T09:00:00'), _issue(3, '2026-03-20T09:00:00'),
+                  _issue(4, '2026-05-01T09:00:00'), _issue(5, None)]:
+        save_issue(issue)
+    compact_issues()
+    save_issue(_issue(6, '2026-02-11T09:00:00'))
+
+    assert cleanup_old_data(days_threshold=90) == 3
+
+    remaining = ['CIV-1', 'CIV-3', 'CIV-4', 'CIV-5']
+    assert sorted(issue['id'] for issue in load_issues()) == remaining
+    stats = get_issue_statistics()
+    assert stats['total_issues'] == 4
+    _reload()
+    assert sorted(issue['id'] for issue in load_issues()) == remaining
+    assert get_issue_statistics() == stats
+    assert _ids(partitions.segment_path('2026-03', 'resolved', partitions.ARCHIVE_DIR)) == ['CIV-2']
+    assert cleanup_old_data(days_threshold=90) == 0
@@ -0,0 +1,80 @@
+import random
+
+from utils.data_manager import (get_issues_by_phone, get_reporter_counts, get_reporter_profile,
+                                get_reporter_profiles, save_issue, update_issue_status)
+from utils.issue_store import IssueStore
+from utils.reporter_profiles import PROFILE_SORTS, ReporterProfiles
+
+PHONES = [f'98000000{number:02d}' for number in range(8)] + [None]
+
+def _random_issue(rng, number):
+    return {'id': f'CIV-{number}', 'phone': rng.choice(PHONES), 'reporter_name': rng.choice(['Asha', 'ravi', None]),
+            'status': rng.choice(['Pending', 'Resolved']), 'timestamp': f'2026-03-{rng.randrange(1, 29):02d}T09:00:00'}
+
+def _recount(issues):
+    profiles = {}
+    for issue in sorted(issues, key=lambda issue: (issue['timestamp'], issue['id'])):
+        if not issue.get('phone'):
+            continue
+        profile = profiles.setdefault(issue['phone'], {'phone': issue['phone'], 'total_issues': 0,
+                                                       'resolved_issues': 0})
+        profile['total_issues'] += 1
+        profile['resolved_issues'] += issue['status'] == 'Resolved'
+        profile.update(name=issue.get('reporter_name'), email=issue.get('email'), last_report=issue['timestamp'])
+    return profiles
+
+def _all_pages(profiles, sort):
+    pages, cursor = [], None
+    while True:
+        page, cursor = profiles.page(sort, limit=3, cursor=cursor)
+        pages.extend(page)
+        if cursor is None:
+            return pages
+
+def test_profiles_match_a_recount_under_patches_and_removals():
+    rng = random.Random(20)
+    store = IssueStore()
+    profiles = store.attach_index('profiles', ReporterProfiles())
+    next_number = 0
+    for step in range(500):
+        action = rng.random()
+        if action < 0.45 or len(store) < 5:
+            store.add(_random_issue(rng, next_number))
+            next_number += 1
+        elif action < 0.8:
+            issue_id = store.issues[rng.randrange(len(store))]['id']
+            store.patch(issue_id, rng.choice([{'status': 'Resolved'}, {'phone': rng.choice(PHONES)},
+                                              {'timestamp': f'2026-04-{rng.randrange(1, 29):02d}T09:00:00'}]))
+        else:
+            store.remove(store.issues[rng.randrange(len(store))]['id'])
+
+        if step % 50 == 0:
+            issues = [issue.to_dict() for issue in store.issues]
+            expected = _recount(issues)
+            assert profiles.profiles == expected
+            assert ReporterProfiles(issues).profiles == expected
+            assert profiles.repeat_reporters == sum(profile['total_issues'] > 1 for profile in expected.values())
+            for phone in expected:
+                assert profiles.issue_ids(phone) == [issue['id'] for issue in sorted(
+                    issues, key=lambda issue: (issue['timestamp'], issue['id']), reverse=True)
+                    if issue['phone'] == phone]
+            for sort, (key_func, descending) in PROFILE_SORTS.items():
+                assert _all_pages(profiles, sort) == sorted(expected.values(), key=key_func, reverse=descending)
+
+def test_profiles_are_served_by_the_shared_store(data_dir):
+    save_issue({'id': 'CIV-1', 'phone': '9800000001', 'reporter_name': 'Asha', 'status': 'Pending',
+                'timestamp': '2000-01-01T09:00:00'})
+    save_issue({'id': 'CIV-2', 'phone': '9800000001', 'reporter_name': 'Asha K', 'status': 'Pending',
+                'timestamp': '2099-01-01T09:00:00'})
+    save_issue({'id': 'CIV-3', 'phone': '9800000002', 'status': 'Pending', 'timestamp': '2000-01-02T09:00:00'})
+    update_issue_status('CIV-1', 'Resolved')
+
+    assert [issue['id'] for issue in get_issues_by_phone('9800000001')] == ['CIV-2', 'CIV-1']
+    profile = get_reporter_profile('9800000001')
+    assert (profile['name'], profile['total_issues'], profile['resolved_issues']) == ('Asha K', 2, 1)
+    assert get_reporter_profile('9899999999') is None
+    assert get_reporter_counts() == {'reporters': 2, 'repeat_reporters': 1, 'active_reporters': 1}
+    page, cursor = get_reporter_profiles('issues', limit=1)
+    assert [profile['phone'] for profile in page] == ['9800000001']
+    assert [profile['phone'] for profile in get_reporter_profiles('issues', limit=1, cursor=cursor)[0]] == \
+        ['9800000002']
@@ -0,0 +1,95 @@
+import json
+import random
+from collections import Counter
+
+from utils.data_manager import get_hotspots, get_reporter_statistics, save_issue
+from utils.issue_store import IssueStore
+from utils.reporter_sketches import HyperLogLog, ReporterSketches, SpaceSaving, reporter_hash
+
+def _hll(values):
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add_hash(reporter_hash(value))
+    return sketch
+
+def _round_trip(sketch):
+    return type(sketch).from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+def test_distinct_counts_are_within_the_standard_error():
+    assert HyperLogLog().count() == 0
+    # Sparse and dense sketches, before and after saving
+    small = _hll(f'98{number:08d}' for number in range(50))
+    assert small.registers is None and _round_trip(small).count() == small.count()
+    assert abs(small.count() - 50) <= 1
+
+    first = _hll(f'98{number:08d}' for number in range(60000))
+    second = _hll(f'98{number:08d}' for number in range(40000, 100000))
+    assert abs(first.count() - 60000) < 0.05 * 60000
+    merged = _round_trip(first).merge(second).merge(small)
+    assert abs(merged.count() - 100000) < 0.05 * 100000
+
+def test_top_k_counts_bound_the_true_counts():
+    rng = random.Random(19)
+    stream = [f'ward-{int(rng.paretovariate(1.2))}' for _ in range(20000)]
+    sketch = SpaceSaving(capacity=20)
+    for key in stream:
+        sketch.add(key)
+    exact = Counter(stream)
+
+    top = sketch.top(20)
+    assert len(top) == 20
+    for key, count, error, label in top:
+        assert count - error <= exact[key] <= count
+    # Every key above total / capacity is monitored
+    assert {key for key, count in exact.items() if count > len(stream) / 20} <= {key for key, *rest in top}
+    assert _round_trip(sketch).top(5) == sketch.top(5)
+
+def test_top_k_is_exact_under_removals_while_keys_fit():
+    rng = random.Random(7)
+    sketch = SpaceSaving(capacity=50)
+    exact = Counter()
+    for _ in range(3000):
+        key = f'ward-{rng.randrange(30)}'
+        if rng.random() < 0.6 or not exact[key]:
+            sketch.add(key)
+            exact[key] += 1
+        else:
+            sketch.remove(key)
+            exact[key] -= 1
+        assert sketch.min_count == min(sketch.buckets, default=0)
+
+    assert {key: count for key, count, error, label in sketch.top(50)} == +exact
+    assert all(error == 0 for key, count, error, label in sketch.top(50))
+
+def test_hotspots_and_top_reporters_follow_patches_and_removals():
+    store = IssueStore()
+    sketches = store.attach_index('reporters', ReporterSketches())
+    for number in range(12):
+        store.add({'id': f'CIV-{number}', 'phone': f'98000000{number % 3:02d}', 'reporter_name': f'Citizen {number % 3}',
+                   'location': f'Ward {number % 4}, Main Road', 'timestamp': '2026-03-02T09:00:00'})
+
+    store.patch('CIV-0', {'location': 'Ward 9'})
+    store.patch('CIV-1', {'phone': '9800000000'})
+    store.remove('CIV-4')
+
+    issues = [issue.to_dict() for issue in store.issues]
+    areas = Counter(issue['location'].split(',')[0] for issue in issues)
+    assert sorted((area, count) for area, count, error, label in sketches.hotspots.top(10)) == sorted(areas.items())
+    phones = Counter(issue['phone'] for issue in issues)
+    assert {phone: count for phone, count, error, label in sketches.top_reporters.top(10)} == phones
+    assert sketches.reporters.count() == 3
+    assert sketches.repeat_reporters.count() == 3
+    assert sketches.areas['Ward 9'].count() == 1
+
+def test_reporter_statistics_come_from_the_shared_sketches(data_dir):
+    for number in range(6):
+        save_issue({'id': f'CIV-{number}', 'phone': f'98000000{min(number, 3):02d}', 'status': 'Pending',
+                    'department': 'Sanitation', 'location': 'Ward 5' if number % 3 == 0 else 'Ward 2, Market',
+                    'timestamp': '2026-03-02T09:00:00'})
+
+    stats = get_reporter_statistics()
+    assert (stats['unique_reporters'], stats['repeat_reporters']) == (4, 1)
+    assert stats['departments'] == {'Sanitation': 4}
+    assert stats['top_reporters'][0]['phone'] == '9800000003'
+    assert stats['top_reporters'][0]['issues'] == 3
+    assert get_hotspots() == [('Ward 2', 4), ('Ward 5', 2)]
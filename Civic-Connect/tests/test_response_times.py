@@ -0,0 +1,73 @@
+import json
+import random
+
+from utils.data_manager import get_resolution_estimate, get_response_times, save_issue, update_issue_status
+from utils.issue_store import IssueStore
+from utils.response_times import MIN_SAMPLES, RELATIVE_ACCURACY, QuantileSketch, ResponseTimes
+
+QUANTILES = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+
+def _exact(values, q):
+    return sorted(values)[int(q * (len(values) - 1))]
+
+def _close(approximate, exact):
+    return abs(approximate - exact) <= RELATIVE_ACCURACY * exact + 1e-9
+
+def test_quantiles_are_within_the_relative_accuracy():
+    rng = random.Random(18)
+    # Minutes to months, plus durations counted as zero
+    values = [rng.lognormvariate(2, 2) for _ in range(5000)] + [0.0] * 50
+    first, second = QuantileSketch(), QuantileSketch()
+    for number, value in enumerate(values):
+        (first if number % 2 else second).add(value)
+
+    sketch = QuantileSketch.from_dict(json.loads(json.dumps(first.to_dict()))).merge(second)
+
+    assert sketch.count == len(values)
+    assert abs(sketch.mean() - sum(values) / len(values)) < 1e-6
+    for q in QUANTILES:
+        assert _close(sketch.quantile(q), _exact(values, q)), q
+    assert len(sketch.buckets) < 1000
+    assert QuantileSketch().quantile(0.5) is None
+
+def _resolved(number, hours, department='Sanitation', priority='High'):
+    return {'id': f'CIV-{number}', 'status': 'Resolved', 'department': department, 'priority': priority,
+            'timestamp': '2026-03-02T08:00:00', 'resolved_at': f'2026-03-{2 + hours // 24:02d}T{8 + hours % 24:02d}:00:00'}
+
+def test_durations_are_recorded_once_when_a_stage_ends():
+    store = IssueStore([_resolved(0, 5), {'id': 'CIV-1', 'status': 'Pending', 'department': 'Sanitation',
+                                          'timestamp': '2026-03-02T08:00:00'}])
+    times = store.attach_index('response_times', ResponseTimes())
+
+    store.patch('CIV-1', {'status': 'Resolved', 'resolved_at': '2026-03-03T10:00:00'})
+    # Later changes neither record the duration again nor take it out
+    store.patch('CIV-1', {'department': 'Water Supply'})
+    store.patch('CIV-1', {'resolved_at': '2026-03-04T10:00:00'})
+    store.remove('CIV-0')
+
+    resolve = times.sketch('resolve')
+    assert resolve.count == 2 and (resolve.min, resolve.max) == (5, 26)
+    assert times.sketch('resolve', 'Sanitation', 'Medium').count == 1
+    assert times.sketch('acknowledge').count == 0
+    # 2 March 2026 is a Monday
+    assert [sketch.count for sketch in times.by_weekday('resolve')] == [2, 0, 0, 0, 0, 0, 0]
+
+def test_estimates_fall_back_to_the_department(data_dir):
+    for number in range(MIN_SAMPLES):
+        save_issue(_resolved(number, hours=number + 1, priority='Low'))
+    save_issue(_resolved(9, hours=30))
+    save_issue({'id': 'CIV-10', 'status': 'Pending', 'department': 'Parks',
+                'timestamp': '2026-03-02T08:00:00'})
+    update_issue_status('CIV-10', 'In Progress')
+
+    # One High issue is too few, so all six Sanitation durations are used
+    median, p90 = get_resolution_estimate('Sanitation', 'High')
+    assert _close(median, 3) and _close(p90, 5)
+    median, p90 = get_resolution_estimate('Sanitation', 'Low')
+    assert _close(median, 3) and _close(p90, 4)
+    assert get_resolution_estimate('Parks', 'High') is None
+
+    times = get_response_times('resolve')
+    assert times['overall']['count'] == MIN_SAMPLES + 1
+    assert times['departments']['Sanitation']['max'] == 30
+    assert get_response_times('acknowledge')['departments']['Parks']['count'] == 1
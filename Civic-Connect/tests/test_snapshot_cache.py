@@ -0,0 +1,43 @@
+import math
+
+from utils import snapshot_cache
+from utils.issue_store import IssueStore
+from utils.issue_table import IssueTable
+
+ISSUES = [
+    {'id': 'CIV-1', 'title': 'Pothole near the school', 'status': 'Pending', 'department': 'Public Works',
+     'latitude': 28.61, 'ai_confidence': None},
+    # Other key order, JSON and non-ASCII text, an int in a number field
+    {'status': 'Resolved', 'id': 'CIV-2', 'title': 'कचरा', 'latitude': 28,
+     'reassignment_history': [{'from': 'Sanitation', 'to': 'Public Works'}]},
+    # Values kept as Python objects: a lone surrogate and NaN
+    {'id': 'CIV-3', 'title': 'bad \udc80 text', 'score': float('nan')}
+]
+
+def test_cache_round_trips_the_table(tmp_path):
+    path = str(tmp_path / 'issues.snapshot.npz')
+    store = IssueStore(ISSUES)
+    store.patch('CIV-1', {'status': 'In Progress'})
+    snapshot_cache.save(snapshot_cache.encode(store.issues), [1, 2], path)
+
+    table = snapshot_cache.load([1, 2], path)
+
+    assert isinstance(table, IssueTable)
+    rows = [record.to_dict() for record in table]
+    assert [list(row) for row in rows] == [list(issue) for issue in ISSUES]
+    assert rows[0]['status'] == 'In Progress'
+    assert rows[1] == ISSUES[1] and isinstance(rows[1]['latitude'], int)
+    assert rows[2]['title'] == 'bad \udc80 text' and math.isnan(rows[2]['score'])
+
+    # The store adopts the table and keeps working on it
+    loaded = IssueStore(table)
+    assert loaded.get('CIV-2')['title'] == 'कचरा'
+    loaded.add({'id': 'CIV-4', 'status': 'Pending'})
+    loaded.remove('CIV-1')
+    assert [record['id'] for record in loaded.issues] == ['CIV-4', 'CIV-2', 'CIV-3']
+
+def test_stale_cache_is_ignored(tmp_path):
+    path = str(tmp_path / 'issues.snapshot.npz')
+    snapshot_cache.save(snapshot_cache.encode(ISSUES), [1, 2], path)
+
+    assert snapshot_cache.load([1, 3], path) is None
@@ -0,0 +1,89 @@
+import pytest
+
+from utils import data_manager, sql_store
+from utils.data_manager import get_issue, get_issues_view, patch_issue, save_issue
+
+def _issue(number, **fields):
+    return {'id': f'CIV-{number}', 'title': f'Issue {number}', 'phone': '9800000000', 'status': 'Pending',
+            'department': 'Sanitation', 'priority': 'Medium', 'timestamp': f'2026-03-{number + 1:02d}T09:00:00',
+            **fields}
+
+@pytest.fixture
+def database(data_dir, monkeypatch):
+    """Use the SQL backend on an empty SQLite file"""
+    monkeypatch.setattr(data_manager, 'STORAGE_BACKEND', 'sql')
+    monkeypatch.setattr(sql_store, 'DATABASE_URL', f"sqlite:///{data_dir / 'civicconnect.db'}")
+    monkeypatch.setattr(sql_store, '_engine', None)
+    yield
+    sql_store.get_engine().dispose()
+
+def _from_another_process(write, *args):
+    # Its own engine and connections, as another process or replica has
+    engine, sql_store._engine = sql_store._engine, None
+    try:
+        return write(*args)
+    finally:
+        sql_store._engine.dispose()
+        sql_store._engine = engine
+
+def _ids(issues):
+    return [issue['id'] for issue in issues]
+
+def test_queries_select_by_the_indexed_columns(database):
+    for number in range(4):
+        sql_store.save_issue(_issue(number, status='Resolved' if number % 2 else 'Pending'))
+    sql_store.save_issue(_issue(4, phone='9811111111', department='Water Supply'))
+
+    assert _ids(sql_store.get_issues_by_phone('9800000000')) == ['CIV-3', 'CIV-2', 'CIV-1', 'CIV-0']
+    assert _ids(sql_store.get_issues_by_department('Water Supply')) == ['CIV-4']
+    assert _ids(sql_store.iter_issues({'status': ['Resolved']}, chunk_size=1)) == ['CIV-3', 'CIV-1']
+    assert _ids(sql_store.load_issues('2026-03-02', '2026-03-04')) == ['CIV-1', 'CIV-2']
+    assert sql_store.get_issue('CIV-9') is None
+
+def test_patch_keeps_other_fields_and_checks_expected(database):
+    sql_store.save_issue(_issue(0, notes=['first']))
+
+    assert not sql_store.patch_issue('CIV-0', {'status': 'Resolved'}, expected={'department': 'Water Supply'})
+    assert sql_store.patch_issue('CIV-0', {'status': 'Resolved'}, expected={'department': 'Sanitation'})
+    assert sql_store.patch_issues({'CIV-0': {'priority': 'High'}, 'CIV-9': {'priority': 'High'}}) == ['CIV-0']
+
+    assert sql_store.get_issue('CIV-0') == _issue(0, notes=['first'], status='Resolved', priority='High')
+    # The indexed columns follow the JSON body
+    assert _ids(sql_store.iter_issues({'status': ['Resolved'], 'priority': ['High']})) == ['CIV-0']
+
+def test_delete_resolved_before_keeps_newer_and_open_issues(database):
+    sql_store.save_issue(_issue(0, status='Resolved'))
+    sql_store.save_issue(_issue(1))
+    sql_store.save_issue(_issue(5, status='Resolved'))
+    sql_store.save_issue(_issue(6, status='Resolved', timestamp=None))
+
+    assert sql_store.delete_resolved_before('2026-03-03T00:00:00') == 1
+    assert sorted(_ids(sql_store.load_issues())) == ['CIV-1', 'CIV-5', 'CIV-6']
+
+def test_every_write_bumps_the_revision(database):
+    revision = sql_store.get_revision()
+    sql_store.save_issue(_issue(0))
+    sql_store.patch_issue('CIV-0', {'status': 'Resolved'})
+    sql_store.patch_issues({'CIV-0': {'priority': 'High'}})
+    sql_store.delete_resolved_before('2026-01-01')
+    sql_store.replace_all_issues([_issue(1)])
+    # A patch that finds nothing to change writes nothing
+    sql_store.patch_issue('CIV-0', {'status': 'Pending'})
+
+    assert sql_store.get_revision() == revision + 5
+
+def test_store_notices_writes_from_another_process(database):
+    save_issue(_issue(0))
+    assert get_issue('CIV-0')['status'] == 'Pending'
+
+    _from_another_process(sql_store.save_issue, _issue(1))
+    _from_another_process(sql_store.patch_issue, 'CIV-0', {'status': 'Resolved'})
+
+    assert get_issue('CIV-1') is not None
+    assert get_issue('CIV-0')['status'] == 'Resolved'
+    assert sorted(_ids(get_issues_view())) == ['CIV-0', 'CIV-1']
+    # Writes from this process keep the store current without a reload
+    assert patch_issue('CIV-1', {'status': 'In Progress'}, expected={'status': 'Pending'})
+    store = data_manager._get_store()
+    assert store.get('CIV-1')['status'] == 'In Progress'
+    assert data_manager._get_store() is store
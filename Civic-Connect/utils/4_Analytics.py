@@ -5,6 +5,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
+from utils.analytics import daily_breakdown, daily_counts, department_summary, mean_confidence
+from utils.csv_export import spool_csv
+from utils.data_manager import (count_issues, get_analytics_frame, get_daily_rollup, get_hotspots,
+                                get_issue_statistics, get_response_times, stream_issues_csv)
+from utils.response_times import format_hours
 
 # Configure page
 st.set_page_config(
@@ -21,28 +26,30 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'issues' not in st.session_state:
-    st.session_state.issues = []
+# Daily rollup of issue counts for the time series and department charts, and
+# the columnar frame of all issues for AI confidence (both shared, read-only)
+rollup = get_daily_rollup()
+frame = get_analytics_frame()
 
-if not st.session_state.issues:
+if frame.empty:
     st.info("📊 No data available for analytics. Please submit some issues first!")
     st.stop()
 
 # Analytics Dashboard
 st.markdown("### 🎯 Key Performance Indicators")
 
-# Calculate KPIs
-total_issues = len(st.session_state.issues)
-resolved_issues = len([i for i in st.session_state.issues if i.get('status') == 'Resolved'])
-in_progress_issues = len([i for i in st.session_state.issues if i.get('status') == 'In Progress'])
-pending_issues = len([i for i in st.session_state.issues if i.get('status') == 'Pending'])
+# Calculate KPIs from the maintained counters
+stats = get_issue_statistics()
+total_issues = stats['total_issues']
+resolved_issues = stats['resolved']
+in_progress_issues = stats['in_progress']
+pending_issues = stats['pending']
+resolution_rate = stats['resolution_rate']
 
-# Calculate resolution rate
-resolution_rate = (resolved_issues / total_issues * 100) if total_issues > 0 else 0
-
-# Calculate average response time (mock calculation)
-avg_response_time = "2.4 hours"  # This would be calculated from actual timestamps
+# Response times (submission to acknowledgement) from the maintained sketches
+response_times = get_response_times('acknowledge')
+overall_response = response_times['overall']
+avg_response_time = format_hours(overall_response['mean']) if overall_response['count'] else "N/A"
 
 # Display KPIs
 col1, col2, col3, col4, col5 = st.columns(5)
@@ -51,7 +58,7 @@ with col1:
     st.metric(
         label="📋 Total Issues",
         value=total_issues,
-        delta=f"+{len([i for i in st.session_state.issues if (datetime.now() - datetime.fromisoformat(i.get('timestamp', datetime.now().isoformat()))).days <= 7])}" + " this week"
+        delta=f"+{count_issues(start=datetime.now() - timedelta(days=7))}" + " this week"
     )
 
 with col2:
@@ -65,7 +72,8 @@ with col3:
     st.metric(
         label="⏱️ Avg Response Time",
         value=avg_response_time,
-        delta="-0.3h vs last month"
+        delta=f"median {format_hours(overall_response['median'])}" if overall_response['count'] else None,
+        delta_color="off"
     )
 
 with col4:
@@ -94,18 +102,9 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Issues reported over time
-    issue_dates = []
-    for issue in st.session_state.issues:
-        try:
-            date = datetime.fromisoformat(issue.get('timestamp', '')).date()
-            issue_dates.append(date)
-        except:
-            continue
+    date_counts = daily_counts(rollup)
     
-    if issue_dates:
-        # Group by date
-        date_counts = pd.Series(issue_dates).value_counts().sort_index()
-        
+    if not date_counts.empty:
         # Create cumulative data for better visualization
         cumulative_data = date_counts.cumsum()
         
@@ -143,24 +142,9 @@ with col1:
 
 with col2:
     # Resolution timeline
-    status_by_date = {}
-    for issue in st.session_state.issues:
-        try:
-            date = datetime.fromisoformat(issue.get('timestamp', '')).date()
-            status = issue.get('status', 'Pending')
-            
-            if date not in status_by_date:
-                status_by_date[date] = {'Pending': 0, 'In Progress': 0, 'Resolved': 0, 'Closed': 0}
-            
-            status_by_date[date][status] += 1
-        except:
-            continue
+    status_df = daily_breakdown(rollup, 'status', ['Pending', 'In Progress', 'Resolved', 'Closed'])
     
-    if status_by_date:
-        # Convert to DataFrame for plotting
-        dates = sorted(status_by_date.keys())
-        status_df = pd.DataFrame([status_by_date[date] for date in dates], index=dates)
-        
+    if not status_df.empty:
         fig_resolution = go.Figure()
         
         colors = {'Pending': '#FF6B6B', 'In Progress': '#4ECDC4', 'Resolved': '#45B7D1', 'Closed': '#96CEB4'}
@@ -190,27 +174,13 @@ st.markdown("### 🏢 Department Performance")
 
 col1, col2 = st.columns(2)
 
+# Department workload
+dept_stats = department_summary(rollup, ['Pending', 'In Progress', 'Resolved', 'Closed'])
+dept_names = list(dept_stats.index)
+resolution_rates = (dept_stats['Resolved'] / dept_stats['Total'] * 100).tolist()
+
 with col1:
-    # Department workload
-    dept_stats = {}
-    for issue in st.session_state.issues:
-        dept = issue.get('department', 'Unassigned')
-        status = issue.get('status', 'Pending')
-        
-        if dept not in dept_stats:
-            dept_stats[dept] = {'Total': 0, 'Pending': 0, 'In Progress': 0, 'Resolved': 0, 'Closed': 0}
-        
-        dept_stats[dept]['Total'] += 1
-        dept_stats[dept][status] += 1
-    
     # Create department performance chart
-    dept_names = list(dept_stats.keys())
-    resolved_counts = [dept_stats[dept]['Resolved'] for dept in dept_names]
-    total_counts = [dept_stats[dept]['Total'] for dept in dept_names]
-    
-    # Calculate resolution rates
-    resolution_rates = [(resolved/total*100) if total > 0 else 0 for resolved, total in zip(resolved_counts, total_counts)]
-    
     fig_dept_performance = px.bar(
         x=dept_names,
         y=resolution_rates,
@@ -224,11 +194,9 @@ with col1:
 
 with col2:
     # Department workload distribution
-    dept_workload = {dept: stats['Total'] for dept, stats in dept_stats.items()}
-    
     fig_workload = px.pie(
-        values=list(dept_workload.values()),
-        names=list(dept_workload.keys()),
+        values=dept_stats['Total'].tolist(),
+        names=dept_names,
         title="📊 Issue Distribution by Department",
         color_discrete_sequence=px.colors.qualitative.Set3
     )
@@ -242,23 +210,9 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Priority distribution over time
-    priority_by_date = {}
-    for issue in st.session_state.issues:
-        try:
-            date = datetime.fromisoformat(issue.get('timestamp', '')).date()
-            priority = issue.get('priority', 'Medium')
-            
-            if date not in priority_by_date:
-                priority_by_date[date] = {'High': 0, 'Medium': 0, 'Low': 0}
-            
-            priority_by_date[date][priority] += 1
-        except:
-            continue
+    priority_df = daily_breakdown(rollup, 'priority', ['High', 'Medium', 'Low'])
     
-    if priority_by_date:
-        dates = sorted(priority_by_date.keys())
-        priority_df = pd.DataFrame([priority_by_date[date] for date in dates], index=dates)
-        
+    if not priority_df.empty:
         fig_priority_trend = go.Figure()
         
         priority_colors = {'High': '#FF4757', 'Medium': '#FFA502', 'Low': '#2ED573'}
@@ -282,16 +236,9 @@ with col1:
         st.plotly_chart(fig_priority_trend, use_container_width=True)
 
 with col2:
-    # Geographic hotspots (mock visualization)
-    location_counts = {}
-    for issue in st.session_state.issues:
-        location = issue.get('location', 'Unknown')
-        # Extract area/city from location (simplified)
-        area = location.split(',')[0].strip() if ',' in location else location
-        location_counts[area] = location_counts.get(area, 0) + 1
-    
-    # Show top 10 locations
-    top_locations = sorted(location_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    # Geographic hotspots: top 10 areas (location up to the first comma), from
+    # the hotspot top-K sketch
+    top_locations = get_hotspots(10)
     
     if top_locations:
         fig_hotspots = px.bar(
@@ -309,14 +256,10 @@ with col2:
 # Response Time Analysis
 st.markdown("### ⏱️ Response Time Analysis")
 
-# Mock response time data (in a real system, this would be calculated from timestamps)
-response_time_data = {
-    'Sanitation': [1.2, 2.1, 1.8, 2.5, 1.9, 2.3, 1.7],
-    'Public Works': [3.2, 4.1, 3.8, 4.5, 3.9, 4.3, 3.7],
-    'Traffic Police': [0.8, 1.2, 1.1, 1.5, 1.3, 1.7, 1.0],
-    'Water Department': [2.1, 3.2, 2.8, 3.5, 2.9, 3.3, 2.7],
-    'Electricity Board': [2.5, 3.1, 2.8, 3.5, 2.9, 3.3, 2.7]
-}
+# Quartiles per department and mean per weekday of submission come from the
+# response time sketches, not from the individual durations
+department_responses = {dept: summary for dept, summary in response_times['departments'].items()
+                        if summary['count']}
 
 col1, col2 = st.columns(2)
 
@@ -324,13 +267,16 @@ with col1:
     # Box plot of response times
     fig_response_box = go.Figure()
     
-    for dept, times in response_time_data.items():
+    for dept, summary in department_responses.items():
         fig_response_box.add_trace(go.Box(
-            y=times,
+            x=[dept],
             name=dept,
-            boxpoints='all',
-            jitter=0.3,
-            pointpos=-1.8
+            q1=[summary['q1']],
+            median=[summary['median']],
+            q3=[summary['q3']],
+            lowerfence=[summary['min']],
+            upperfence=[summary['max']],
+            mean=[summary['mean']]
         ))
     
     fig_response_box.update_layout(
@@ -342,8 +288,8 @@ with col1:
 
 with col2:
     # Average response time trend
-    days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    avg_response_by_day = [np.mean([times[i] for times in response_time_data.values()]) for i in range(7)]
+    days = list(response_times['weekdays'])
+    avg_response_by_day = [summary['mean'] for summary in response_times['weekdays'].values()]
     
     fig_response_trend = px.line(
         x=days,
@@ -362,13 +308,12 @@ st.markdown("### 🤖 AI Performance Metrics")
 col1, col2, col3 = st.columns(3)
 
 # Calculate AI metrics from actual data
-ai_routed = len([i for i in st.session_state.issues if i.get('routing_method') == 'AI'])
-manual_routed = len([i for i in st.session_state.issues if i.get('routing_method') == 'Manual'])
+ai_routed = stats['routing_methods'].get('AI', 0) + stats['routing_methods'].get('Local', 0)
+manual_routed = stats['routing_methods'].get('Manual', 0)
 total_routed = ai_routed + manual_routed
 
 # Calculate average AI confidence
-ai_issues = [i for i in st.session_state.issues if i.get('routing_method') == 'AI']
-avg_ai_confidence = np.mean([i.get('ai_confidence', 0) for i in ai_issues]) if ai_issues else 0
+avg_ai_confidence = mean_confidence(frame, 'AI')
 
 with col1:
     st.metric(
@@ -397,20 +342,16 @@ with col3:
 st.markdown("### 📊 Department Performance Summary")
 
 # Create comprehensive department summary
-dept_summary = []
-for dept, stats in dept_stats.items():
-    resolution_rate = (stats['Resolved'] / stats['Total'] * 100) if stats['Total'] > 0 else 0
-    dept_summary.append({
-        'Department': dept,
-        'Total Issues': stats['Total'],
-        'Pending': stats['Pending'],
-        'In Progress': stats['In Progress'],
-        'Resolved': stats['Resolved'],
-        'Resolution Rate': f"{resolution_rate:.1f}%",
-        'Avg Response Time': response_time_data.get(dept, [2.5])[0] if dept in response_time_data else 'N/A'
-    })
-
-dept_df = pd.DataFrame(dept_summary)
+dept_df = pd.DataFrame({
+    'Department': dept_names,
+    'Total Issues': dept_stats['Total'].tolist(),
+    'Pending': dept_stats['Pending'].tolist(),
+    'In Progress': dept_stats['In Progress'].tolist(),
+    'Resolved': dept_stats['Resolved'].tolist(),
+    'Resolution Rate': [f"{rate:.1f}%" for rate in resolution_rates],
+    'Avg Response Time': [format_hours(department_responses[dept]['mean']) if dept in department_responses else 'N/A'
+                          for dept in dept_names]
+})
 dept_df = dept_df.sort_values('Total Issues', ascending=False)
 
 # Style the dataframe
@@ -457,19 +398,14 @@ with col2:
         )
 
 with col3:
+    # The CSV is streamed to a temporary file only when an export is requested
     if st.button("📋 Export All Issues"):
-        if st.session_state.issues:
-            issues_df = pd.DataFrame(st.session_state.issues)
-            # Remove sensitive data before export
-            export_df = issues_df.drop(columns=['image_data'], errors='ignore')
-            csv = export_df.to_csv(index=False)
-            
-            st.download_button(
-                label="📥 Download Issues CSV",
-                data=csv,
-                file_name=f"civicconnect_issues_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
+        st.download_button(
+            label="📥 Download Issues CSV",
+            data=spool_csv(stream_issues_csv()),
+            file_name=f"civicconnect_issues_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv"
+        )
 
 # Footer with insights
 st.markdown("---")
@@ -486,7 +422,7 @@ else:
 if ai_routed > manual_routed:
     insights.append("🤖 **AI Adoption**: AI routing is being used effectively")
 
-high_priority_count = len([i for i in st.session_state.issues if i.get('priority') == 'High'])
+high_priority_count = stats['priorities'].get('High', 0)
 if high_priority_count > total_issues * 0.3:
     insights.append("🚨 **High Priority Alert**: Many high-priority issues detected")
 
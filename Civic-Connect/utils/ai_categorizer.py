@@ -1,41 +1,59 @@
+import hashlib
 import json
 import os
 from openai import OpenAI
+from utils.categorization_cache import cache_categorization, categorization_key, get_cached_categorization
+from utils.keyword_rules import get_rules
+from utils.response_times import format_hours
 
 # the newest OpenAI model is "gpt-5" which was released August 7, 2025.
 # do not change this unless explicitly requested by the user
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "default_key")
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Any OpenAI-compatible endpoint, e.g. a local test server (default: OpenAI)
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL") or None
+client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
 
-def categorize_issue_with_ai(issue_context, image_data=None):
+# Department categories and their descriptions
+DEPARTMENT_MAPPING = {
+    "Sanitation": "Garbage collection, waste management, cleanliness, litter, overflowing bins, street cleaning, public toilet issues",
+    "Public Works": "Road repairs, potholes, street construction, sidewalk issues, public infrastructure maintenance, building repairs",
+    "Traffic Police": "Traffic violations, signal problems, road safety, parking issues, accident reports, traffic congestion",
+    "Water Department": "Water supply issues, leakage, contamination, shortage, water quality, pipeline problems, sewage",
+    "Electricity Board": "Power outages, streetlight problems, electrical faults, transformer issues, power line problems",
+    "Parks & Recreation": "Park maintenance, playground issues, garden problems, recreational facility maintenance, tree care"
+}
+
+# Request options shared by single and batch categorization
+CATEGORIZATION_OPTIONS = {
+    'model': "gpt-5",
+    'response_format': {"type": "json_object"},
+    'temperature': 0.1,  # Low temperature for consistent categorization
+    'max_tokens': 500
+}
+
+# Request options and prompt of the image analysis done before categorizing
+IMAGE_ANALYSIS_OPTIONS = {
+    'model': "gpt-5",
+    'max_tokens': 300
+}
+IMAGE_ANALYSIS_PROMPT = "Analyze this civic issue image and describe what type of problem it shows. Focus on identifying the category of issue (roads, sanitation, electricity, water, traffic, etc.) and key visual elements that would help categorize it for municipal department routing."
+
+def build_categorization_messages(issue_context, image_analysis=None):
     """
-    Use AI to categorize civic issues and route them to appropriate departments
+    Build the chat messages that ask the AI to categorize an issue
     
     Args:
         issue_context (dict): Contains title, description, location, etc.
-        image_data (str): Base64 encoded image data (optional)
-    
+        image_analysis (str): Description of the issue photo (optional)
+        
     Returns:
-        tuple: (department, confidence_score)
+        list: Chat messages
     """
-    
-    # Define department categories and their descriptions
-    department_mapping = {
-        "Sanitation": "Garbage collection, waste management, cleanliness, litter, overflowing bins, street cleaning, public toilet issues",
-        "Public Works": "Road repairs, potholes, street construction, sidewalk issues, public infrastructure maintenance, building repairs",
-        "Traffic Police": "Traffic violations, signal problems, road safety, parking issues, accident reports, traffic congestion",
-        "Water Department": "Water supply issues, leakage, contamination, shortage, water quality, pipeline problems, sewage",
-        "Electricity Board": "Power outages, streetlight problems, electrical faults, transformer issues, power line problems",
-        "Parks & Recreation": "Park maintenance, playground issues, garden problems, recreational facility maintenance, tree care"
-    }
-    
-    try:
-        # Prepare the prompt for AI categorization
-        system_prompt = f"""
+    system_prompt = f"""
 You are an AI assistant for a civic issue management system in India. Your task is to categorize civic issues and route them to the appropriate government department.
 
 Available Departments and their responsibilities:
-{json.dumps(department_mapping, indent=2)}
+{json.dumps(DEPARTMENT_MAPPING, indent=2)}
 
 Analyze the provided issue details and categorize it into the most appropriate department. Consider the following:
 1. The main problem described
@@ -55,8 +73,7 @@ Guidelines for confidence scoring:
 - 0.0-0.4: Low confidence, unclear categorization
 """
 
-        # Prepare user message
-        user_content = f"""
+    user_content = f"""
 Issue Title: {issue_context.get('title', 'No title')}
 Description: {issue_context.get('description', 'No description')}
 Location: {issue_context.get('location', 'No location specified')}
@@ -64,52 +81,126 @@ Has Image: {issue_context.get('image_provided', False)}
 
 Please categorize this civic issue.
 """
+    if image_analysis:
+        user_content += f"\n\nImage Analysis: {image_analysis}"
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content}
+    ]
+
+def parse_categorization(content):
+    """
+    Read the department and confidence from an AI categorization reply
+    
+    Args:
+        content (str): JSON reply text
+        
+    Returns:
+        tuple: (department, confidence_score, reasoning, valid), where valid
+            is False if the reply named no known department or gave a
+            confidence outside 0-1; such replies must not be cached
+    """
+    result = json.loads(content)
+    
+    department = result.get('department', 'Public Works')  # Default fallback
+    confidence = float(result.get('confidence', 0.5))
+    reasoning = result.get('reasoning', 'AI categorization completed')
+    valid = department in DEPARTMENT_MAPPING and 0.0 <= confidence <= 1.0
+    
+    # Validate department exists in our mapping
+    if department not in DEPARTMENT_MAPPING:
+        department = 'Public Works'  # Safe fallback
+        confidence = 0.3
+    confidence = min(1.0, max(0.0, confidence))
+    
+    return department, confidence, reasoning, valid
 
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_content}
-        ]
+def categorize_issue_with_ai(issue_context, image_data=None, image_ref=None):
+    """
+    Use AI to categorize civic issues and route them to appropriate departments
+    
+    Args:
+        issue_context (dict): Contains title, description, location, etc.
+        image_data (str): Base64 encoded image data (optional)
+        image_ref (str): Blob reference of the stored full image that
+            image_data was made from, for the cache key; without it an
+            image is keyed by the hash of image_data (optional)
+    
+    Returns:
+        tuple: (department, confidence_score, routing_method), where
+            routing_method is 'AI', or 'Fallback' when the AI could not be
+            reached and keyword routing was used
+    """
+    # Repeat reports are answered from the cache without calling the API
+    if image_data and not image_ref:
+        image_ref = hashlib.sha256(image_data.encode()).hexdigest()
+    cache_key = categorization_key(issue_context, image_ref)
+    cached = get_cached_categorization(cache_key)
+    if cached is not None:
+        department, confidence, reasoning = cached
+        print(f"AI Categorization (cached): {department} (confidence: {confidence:.2f})")
+        return department, confidence, 'AI'
 
+    try:
         # Add image analysis if image is provided
+        image_analysis = None
         if image_data:
             try:
                 # Request image analysis first
                 image_analysis = analyze_image_for_categorization(image_data)
-                user_content += f"\n\nImage Analysis: {image_analysis}"
-                messages[1]["content"] = user_content
             except Exception as e:
                 print(f"Image analysis failed: {e}")
 
         # Make API call
         response = client.chat.completions.create(
-            model="gpt-5",
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0.1,  # Low temperature for consistent categorization
-            max_tokens=500
+            messages=build_categorization_messages(issue_context, image_analysis),
+            **CATEGORIZATION_OPTIONS
         )
 
         # Parse response
-        result = json.loads(response.choices[0].message.content)
-        
-        department = result.get('department', 'Public Works')  # Default fallback
-        confidence = float(result.get('confidence', 0.5))
-        reasoning = result.get('reasoning', 'AI categorization completed')
-        
-        # Validate department exists in our mapping
-        if department not in department_mapping:
-            department = 'Public Works'  # Safe fallback
-            confidence = 0.3
+        department, confidence, reasoning, valid = parse_categorization(response.choices[0].message.content)
+        if valid:
+            cache_categorization(cache_key, department, confidence, reasoning)
         
         print(f"AI Categorization: {department} (confidence: {confidence:.2f}) - {reasoning}")
         
-        return department, confidence
+        return department, confidence, 'AI'
 
     except Exception as e:
         print(f"AI categorization error: {e}")
         
         # Fallback to keyword-based categorization
-        return fallback_categorization(issue_context)
+        department, confidence = fallback_categorization(issue_context)
+        return department, confidence, 'Fallback'
+
+def build_image_analysis_messages(image_data):
+    """
+    Build the chat messages that ask the AI to describe an issue photo
+    
+    Args:
+        image_data (str): Base64 encoded image
+        
+    Returns:
+        list: Chat messages
+    """
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": IMAGE_ANALYSIS_PROMPT
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{image_data}"
+                    }
+                }
+            ]
+        }
+    ]
 
 def analyze_image_for_categorization(image_data):
     """
@@ -123,25 +214,8 @@ def analyze_image_for_categorization(image_data):
     """
     try:
         response = client.chat.completions.create(
-            model="gpt-5",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "Analyze this civic issue image and describe what type of problem it shows. Focus on identifying the category of issue (roads, sanitation, electricity, water, traffic, etc.) and key visual elements that would help categorize it for municipal department routing."
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_data}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=300
+            messages=build_image_analysis_messages(image_data),
+            **IMAGE_ANALYSIS_OPTIONS
         )
         
         return response.choices[0].message.content
@@ -160,26 +234,12 @@ def fallback_categorization(issue_context):
     Returns:
         tuple: (department, confidence)
     """
-    text = f"{issue_context.get('title', '')} {issue_context.get('description', '')}".lower()
-    
-    # Keyword mapping for fallback
-    keyword_mapping = {
-        "Sanitation": ["garbage", "trash", "waste", "dirty", "clean", "toilet", "bin", "litter"],
-        "Public Works": ["road", "pothole", "construction", "building", "infrastructure", "repair", "sidewalk"],
-        "Traffic Police": ["traffic", "signal", "parking", "accident", "violation", "congestion", "vehicle"],
-        "Water Department": ["water", "leak", "pipe", "sewage", "drainage", "contamination", "supply"],
-        "Electricity Board": ["light", "power", "electrical", "outage", "transformer", "wire", "electricity"],
-        "Parks & Recreation": ["park", "garden", "tree", "playground", "recreation", "green"]
-    }
-    
-    best_match = "Public Works"  # Default
-    best_score = 0
+    text = f"{issue_context.get('title', '')} {issue_context.get('description', '')}"
     
-    for department, keywords in keyword_mapping.items():
-        score = sum(1 for keyword in keywords if keyword in text)
-        if score > best_score:
-            best_match = department
-            best_score = score
+    # Department keywords, including admin edits
+    best_match, best_score = get_rules().department(text)
+    if best_match is None:
+        best_match = "Public Works"  # Default
     
     # Calculate confidence based on keyword matches
     confidence = min(0.8, max(0.3, best_score / 5))  # Scale confidence
@@ -247,42 +307,29 @@ def prioritize_issue(issue_context):
     Returns:
         str: Priority level (High, Medium, Low)
     """
-    text = f"{issue_context.get('title', '')} {issue_context.get('description', '')}".lower()
+    text = f"{issue_context.get('title', '')} {issue_context.get('description', '')}"
     
-    # High priority keywords
-    high_priority_keywords = [
-        "emergency", "urgent", "danger", "hazard", "accident", "injury", "fire", 
-        "flood", "electrical shock", "gas leak", "collapse", "blocked", "overflow"
-    ]
-    
-    # Medium priority keywords  
-    medium_priority_keywords = [
-        "broken", "damaged", "not working", "problem", "issue", "complaint",
-        "repair needed", "maintenance required"
-    ]
-    
-    # Check for high priority indicators
-    if any(keyword in text for keyword in high_priority_keywords):
-        return "High"
-    
-    # Check for medium priority indicators
-    if any(keyword in text for keyword in medium_priority_keywords):
-        return "Medium"
-    
-    # Default to low priority
-    return "Low"
+    # High and medium priority keywords, including admin edits
+    return get_rules().priority(text)
 
-def get_estimated_resolution_time(department, priority):
+def get_estimated_resolution_time(department, priority, estimate=None):
     """
     Get estimated resolution time based on department and priority
     
     Args:
         department (str): Department name
         priority (str): Priority level
+        estimate (tuple): (median hours, 90th percentile hours) observed for
+            past issues, from data_manager.get_resolution_estimate (optional;
+            a fixed guideline is used without it)
         
     Returns:
         str: Estimated resolution time
     """
+    if estimate is not None:
+        median, p90 = estimate
+        return f"about {format_hours(median)} (90% within {format_hours(p90)})"
+    
     base_times = {
         "Sanitation": {"High": "2-4 hours", "Medium": "1-2 days", "Low": "3-5 days"},
         "Public Works": {"High": "4-6 hours", "Medium": "2-3 days", "Low": "1-2 weeks"},
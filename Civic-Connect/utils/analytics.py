@@ -0,0 +1,233 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Categorical columns of the analytics frame: column -> (issue field, value
+# used when the issue has none). 'area' is the part of the location before
+# the first comma.
+CATEGORY_COLUMNS = {
+    'status': ('status', 'Pending'),
+    'department': ('department', 'Unassigned'),
+    'priority': ('priority', 'Medium'),
+    'routing_method': ('routing_method', 'Unknown'),
+    'area': ('location', 'Unknown'),
+}
+
+# Issue fields that feed the frame; patches touching none of them are ignored
+SOURCE_FIELDS = {field for field, default in CATEGORY_COLUMNS.values()} | {'timestamp', 'ai_confidence'}
+
+# Day number stored for issues without a parseable timestamp; it is the bit
+# pattern of NaT, so the day array can be viewed as datetime64 directly
+NO_DAY = np.iinfo(np.int64).min
+
+_EPOCH = datetime(1970, 1, 1).date()
+
+def location_area(location):
+    """Get the area (ward) of a location: the part before the first comma"""
+    return location.split(',')[0].strip() if ',' in location else location
+
+def _day(timestamp):
+    try:
+        return (datetime.fromisoformat(timestamp).date() - _EPOCH).days
+    except (TypeError, ValueError):
+        return NO_DAY
+
+def _confidence(issue):
+    value = issue.get('ai_confidence', 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return np.nan
+
+class AnalyticsIndex:
+    """
+    Per-position analytics columns kept alongside the issue store
+
+    Category fields are held as integer codes into per-column value lists,
+    the report day as days since the epoch and AI confidence as a float,
+    each in a numpy array with one slot per store position. Timestamps are
+    parsed once when an issue is added or patched, never per page render.
+    frame() turns the arrays into a DataFrame without touching the issues.
+    The index is kept up to date through the IssueStore index hooks.
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.capacity = capacity
+        self.codes = {column: np.zeros(capacity, dtype=np.int32) for column in CATEGORY_COLUMNS}
+        self.values = {column: [] for column in CATEGORY_COLUMNS}
+        self.value_codes = {column: {} for column in CATEGORY_COLUMNS}
+        self.days = np.full(capacity, NO_DAY, dtype=np.int64)
+        self.confidence = np.zeros(capacity, dtype=np.float64)
+
+    def _grow(self, size):
+        if size <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < size:
+            capacity *= 2
+        for column, codes in self.codes.items():
+            grown = np.zeros(capacity, dtype=np.int32)
+            grown[:self.capacity] = codes
+            self.codes[column] = grown
+        days = np.full(capacity, NO_DAY, dtype=np.int64)
+        days[:self.capacity] = self.days
+        self.days = days
+        confidence = np.zeros(capacity, dtype=np.float64)
+        confidence[:self.capacity] = self.confidence
+        self.confidence = confidence
+        self.capacity = capacity
+
+    def _code(self, column, value):
+        codes = self.value_codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.values[column].append(value)
+        return code
+
+    def _set(self, position, issue):
+        for column, (field, default) in CATEGORY_COLUMNS.items():
+            value = issue.get(field)
+            if value is None:
+                value = default
+            elif column == 'area' and isinstance(value, str):
+                value = location_area(value)
+            self.codes[column][position] = self._code(column, value)
+        self.days[position] = _day(issue.get('timestamp'))
+        self.confidence[position] = _confidence(issue)
+
+    def _copy(self, source, target):
+        for codes in self.codes.values():
+            codes[target] = codes[source]
+        self.days[target] = self.days[source]
+        self.confidence[target] = self.confidence[source]
+
+    def on_add(self, position, issue):
+        self._grow(position + 1)
+        self.size = max(self.size, position + 1)
+        self._set(position, issue)
+
+    def on_patch(self, position, issue, old_fields):
+        if SOURCE_FIELDS.intersection(old_fields):
+            self._set(position, issue)
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        if moved_issue is not None:
+            self._copy(self.size - 1, position)
+        self.size -= 1
+
+    def frame(self):
+        """
+        Build the analytics frame of the current issues
+
+        Returns:
+            pandas.DataFrame: One row per issue with categorical status,
+                department, priority, routing_method and area columns, a
+                datetime64 'date' (NaT if unparseable) and 'ai_confidence'
+        """
+        size = self.size
+        data = {}
+        for column in CATEGORY_COLUMNS:
+            data[column] = pd.Categorical.from_codes(self.codes[column][:size],
+                                                     categories=pd.Index(self.values[column], dtype=object))
+        data['date'] = self.days[:size].view('datetime64[D]')
+        data['ai_confidence'] = self.confidence[:size].copy()
+        return pd.DataFrame(data)
+
+def _tally(frame, keys):
+    """Count issues per group; rollup rows are weighted by their 'count'"""
+    grouped = frame.groupby(keys, observed=True)
+    return grouped['count'].sum() if 'count' in frame else grouped.size()
+
+def daily_counts(frame):
+    """
+    Count issues per report day
+
+    Args:
+        frame (DataFrame): Analytics frame, or daily rollup rows
+
+    Returns:
+        pandas.Series: Date -> number of issues, in date order
+    """
+    return _tally(frame, 'date').sort_index()
+
+def daily_breakdown(frame, column, columns=None):
+    """
+    Count issues per report day and value of a category column
+
+    Args:
+        frame (DataFrame): Analytics frame, or daily rollup rows
+        column (str): Category column, e.g. 'status' or 'priority'
+        columns (list): Values to report, in order (default: all present)
+
+    Returns:
+        pandas.DataFrame: Date index, one count column per value
+    """
+    counts = _tally(frame, ['date', column]).unstack(fill_value=0)
+    counts.columns = counts.columns.astype(object)
+    if columns is not None:
+        counts = counts.reindex(columns=columns, fill_value=0)
+    return counts.sort_index()
+
+def department_summary(frame, statuses):
+    """
+    Count issues per department, in total and per status
+
+    Args:
+        frame (DataFrame): Analytics frame, or daily rollup rows
+        statuses (list): Status columns to report
+
+    Returns:
+        pandas.DataFrame: Department index with 'Total' and one column per
+            status
+    """
+    counts = _tally(frame, ['department', 'status']).unstack(fill_value=0)
+    counts.index = counts.index.astype(object)
+    counts.columns = counts.columns.astype(object)
+    summary = counts.reindex(columns=statuses, fill_value=0)
+    summary.insert(0, 'Total', counts.sum(axis=1))
+    return summary
+
+def totals(frame, column):
+    """
+    Count issues per value of a category column
+
+    Args:
+        frame (DataFrame): Analytics frame, or daily rollup rows
+        column (str): Category column, e.g. 'priority' or 'area'
+
+    Returns:
+        pandas.Series: Value -> count, most frequent first
+    """
+    counts = _tally(frame, column)
+    counts.index = counts.index.astype(object)
+    return counts.sort_values(ascending=False, kind='stable')
+
+def top_values(frame, column, limit=10):
+    """
+    Get the most frequent values of a category column
+
+    Args:
+        frame (DataFrame): Analytics frame, or daily rollup rows
+        column (str): Category column, e.g. 'area'
+        limit (int): Number of values to return
+
+    Returns:
+        pandas.Series: Value -> count, most frequent first
+    """
+    return totals(frame, column).head(limit)
+
+def mean_confidence(frame, routing_method='AI'):
+    """
+    Average AI confidence of the issues routed by one method
+
+    Args:
+        frame (DataFrame): Analytics frame
+        routing_method (str): Routing method to select
+
+    Returns:
+        float: Mean confidence, or 0 when no issue matches
+    """
+    selected = frame.loc[frame['routing_method'] == routing_method, 'ai_confidence']
+    mean = selected.mean()
+    return 0 if pd.isna(mean) else float(mean)
@@ -0,0 +1,180 @@
+import gzip
+import json
+import os
+from datetime import datetime
+
+# Incremental backups: a gzip-compressed base snapshot of all issues followed
+# by gzip-compressed deltas holding the change records written since the
+# previous backup. The catalog lists every backup in order with the last
+# change sequence number it covers.
+BACKUP_DIR = os.path.join('data', 'backups')
+CATALOG_FILE = os.path.join(BACKUP_DIR, 'catalog.json')
+
+# Folded change-log segments kept until a delta backup has copied them,
+# named <first seq>-<last seq>.jsonl
+JOURNAL_DIR = os.path.join(BACKUP_DIR, 'journal')
+
+# A new base snapshot is taken after this many deltas
+BASE_INTERVAL = 7
+
+def read_catalog():
+    """
+    Read the backup catalog
+
+    Returns:
+        dict: {'backups': [entry, ...], 'needs_base': bool}
+    """
+    if not os.path.exists(CATALOG_FILE):
+        return {'backups': [], 'needs_base': False}
+    with open(CATALOG_FILE, 'r') as f:
+        return json.load(f)
+
+def save_catalog(catalog):
+    """Atomically replace the backup catalog"""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    tmp_path = f"{CATALOG_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(catalog, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, CATALOG_FILE)
+
+def chain_active(catalog):
+    """Check whether the next backup can be a delta on top of the catalog"""
+    return bool(catalog['backups']) and not catalog.get('needs_base')
+
+def last_seq(catalog):
+    """Get the last change sequence number covered by any backup"""
+    return max((entry['seq'] for entry in catalog['backups']), default=0)
+
+def deltas_since_base(catalog):
+    """Count the deltas taken since the most recent base snapshot"""
+    count = 0
+    for entry in reversed(catalog['backups']):
+        if entry['kind'] == 'base':
+            break
+        count += 1
+    return count
+
+def _write_gzip(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+        f.write(payload)
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def write_backup(kind, payload, seq, records):
+    """
+    Compress and store one backup file
+
+    Args:
+        kind (str): 'base' (JSON list of issues) or 'delta' (JSONL records)
+        payload (bytes): Uncompressed content
+        seq (int): Last change sequence number the backup covers
+        records (int): Number of issues or change records it holds
+
+    Returns:
+        dict: Catalog entry for the new backup (not yet saved)
+    """
+    created = datetime.now()
+    extension = 'json.gz' if kind == 'base' else 'jsonl.gz'
+    path = os.path.join(BACKUP_DIR, f"{kind}_{created.strftime('%Y%m%d_%H%M%S_%f')}_{seq}.{extension}")
+    _write_gzip(path, payload)
+    return {
+        'kind': kind,
+        'file': path,
+        'seq': seq,
+        'created': created.isoformat(),
+        'records': records,
+        'bytes': os.path.getsize(path)
+    }
+
+def read_backup(entry):
+    """
+    Read the content of a backup
+
+    Args:
+        entry (dict): Catalog entry
+
+    Returns:
+        list: Issues for a base backup, change records for a delta
+    """
+    with gzip.open(entry['file'], 'rt') as f:
+        if entry['kind'] == 'base':
+            return json.load(f)
+        return [json.loads(line) for line in f if line.strip()]
+
+def resolve_chain(catalog, backup_file=None, until=None):
+    """
+    Find the base and deltas needed to rebuild a point in time
+
+    Args:
+        catalog (dict): Backup catalog
+        backup_file (str): Restore the state as of this backup (optional)
+        until (str): Restore the state as of this ISO timestamp (optional);
+            defaults to the latest backup
+
+    Returns:
+        tuple: (base entry, list of delta entries in order)
+
+    Raises:
+        ValueError: If no backup covers the requested point
+    """
+    entries = catalog['backups']
+    if backup_file is not None:
+        matches = [i for i, entry in enumerate(entries) if entry['file'] == backup_file]
+        if not matches:
+            raise ValueError(f"Backup not in catalog: {backup_file}")
+        last = matches[0]
+    elif until is not None:
+        # Deltas taken after `until` may still hold earlier changes, so
+        # the chain runs up to the first base created after it
+        bases = [i for i, entry in enumerate(entries)
+                 if entry['kind'] == 'base' and entry['created'] <= until]
+        if not bases:
+            raise ValueError(f"No base backup at or before {until}")
+        last = bases[-1]
+        while last + 1 < len(entries) and entries[last + 1]['kind'] == 'delta':
+            last += 1
+    else:
+        last = len(entries) - 1
+
+    first = last
+    while first >= 0 and entries[first]['kind'] != 'base':
+        first -= 1
+    if first < 0:
+        raise ValueError("No base backup precedes the requested point")
+    return entries[first], entries[first + 1:last + 1]
+
+def journal_path(first_seq, last_seq):
+    """Get the path of a journal segment covering a sequence range"""
+    return os.path.join(JOURNAL_DIR, f"{first_seq:012d}-{last_seq:012d}.jsonl")
+
+def journal_segments():
+    """
+    List journal segments in sequence order
+
+    Returns:
+        list: (first seq, last seq, path) tuples
+    """
+    if not os.path.isdir(JOURNAL_DIR):
+        return []
+    segments = []
+    for name in sorted(os.listdir(JOURNAL_DIR)):
+        if name.endswith('.jsonl'):
+            first, last = name[:-len('.jsonl')].split('-')
+            segments.append((int(first), int(last), os.path.join(JOURNAL_DIR, name)))
+    return segments
+
+def prune_journal(upto_seq=None):
+    """
+    Delete journal segments fully covered by backups
+
+    Args:
+        upto_seq (int): Highest backed-up sequence number; None deletes all
+    """
+    for first, last, path in journal_segments():
+        if upto_seq is None or last <= upto_seq:
+            os.remove(path)
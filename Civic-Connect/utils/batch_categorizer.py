@@ -0,0 +1,400 @@
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import openai
+from openai import AsyncOpenAI
+from utils.ai_categorizer import (CATEGORIZATION_OPTIONS, DEPARTMENT_MAPPING, IMAGE_ANALYSIS_OPTIONS, OPENAI_API_KEY,
+                                  OPENAI_BASE_URL, build_categorization_messages, build_image_analysis_messages,
+                                  fallback_categorization, parse_categorization)
+from utils.blob_store import get_issue_image_bytes, has_image
+from utils.categorization_cache import cache_categorization, categorization_key, get_cached_categorization
+from utils.image_pipeline import encode_for_analysis, stored_full_image
+from utils.issue_router import classify_locally
+
+# Requests in flight at once
+DEFAULT_CONCURRENCY = 32
+
+# Retries per issue after a rate limit, timeout, connection or server error
+MAX_RETRIES = 6
+
+# Exponential backoff between retries, in seconds, unless the server sends
+# Retry-After; a random jitter of up to 50% is added
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+# Errors worth retrying; anything else falls back to keyword routing at once
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError,
+                    openai.InternalServerError)
+
+# Departments meaning "not routed yet", and routing states worth re-running.
+# 'processing' issues are left to their single-issue worker, which would
+# otherwise route them a second time.
+UNROUTED_DEPARTMENTS = ['General']
+UNROUTED_STATUSES = ('failed',)
+
+class _RateLimitGate:
+    """Pause shared by all requests of a batch after a rate limit reply"""
+
+    def __init__(self):
+        self.resume_at = 0.0
+
+    def pause(self, seconds):
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    async def wait(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def _retry_delay(error, attempt):
+    """Seconds to wait before retry `attempt` (0-based)"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            pass
+    return min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt) * random.uniform(1.0, 1.5)
+
+async def _categorize_one(client, semaphore, gate, issue_context, image, max_retries, use_cache, use_local):
+    """Categorize one issue; returns (department, confidence, routing_method)"""
+    local = classify_locally(issue_context) if use_local else None
+    if local is not None:
+        return local[0], local[1], 'Local'
+
+    image_ref, encode = image if image is not None else (None, None)
+    cache_key = None
+    if use_cache and (encode is None or image_ref is not None):
+        cache_key = categorization_key(issue_context, image_ref)
+        cached = get_cached_categorization(cache_key)
+        if cached is not None:
+            return cached[0], cached[1], 'AI'
+
+    image_analysis = None
+    async with semaphore:
+        # Photos are encoded only once a request slot is free, so at most
+        # `concurrency` of them are held in memory
+        image_data = None
+        if encode is not None:
+            try:
+                image_ref, image_data = await asyncio.to_thread(encode)
+            except Exception as e:
+                print(f"Batch image encoding error: {e}")
+                # Not cached: the result was not made with the photo
+                cache_key = None
+            else:
+                if use_cache and cache_key is None:
+                    cache_key = categorization_key(issue_context, image_ref)
+                    cached = get_cached_categorization(cache_key)
+                    if cached is not None:
+                        return cached[0], cached[1], 'AI'
+
+        for attempt in range(max_retries + 1):
+            await gate.wait()
+            try:
+                if image_data is not None and image_analysis is None:
+                    response = await client.chat.completions.create(
+                        messages=build_image_analysis_messages(image_data),
+                        **IMAGE_ANALYSIS_OPTIONS
+                    )
+                    image_analysis = response.choices[0].message.content
+                response = await client.chat.completions.create(
+                    messages=build_categorization_messages(issue_context, image_analysis),
+                    **CATEGORIZATION_OPTIONS
+                )
+                department, confidence, reasoning, valid = parse_categorization(response.choices[0].message.content)
+                if cache_key is not None and valid:
+                    cache_categorization(cache_key, department, confidence, reasoning)
+                return department, confidence, 'AI'
+            except RETRYABLE_ERRORS as e:
+                if attempt == max_retries:
+                    print(f"Batch categorization gave up after {attempt + 1} attempts: {e}")
+                    break
+                delay = _retry_delay(e, attempt)
+                if isinstance(e, openai.RateLimitError):
+                    # Slow the whole batch down, not just this request
+                    gate.pause(delay)
+                await asyncio.sleep(delay)
+            except Exception as e:
+                print(f"Batch categorization error: {e}")
+                break
+
+    department, confidence = fallback_categorization(issue_context)
+    return department, confidence, 'Fallback'
+
+async def categorize_batch_async(issue_contexts, concurrency=DEFAULT_CONCURRENCY, max_retries=MAX_RETRIES,
+                                 client=None, progress=None, use_cache=True, use_local=True, images=None):
+    """
+    Categorize many issues concurrently
+
+    Args:
+        issue_contexts (list): Dicts with title, description, location and
+            image_provided, as passed to categorize_issue_with_ai
+        concurrency (int): Maximum requests in flight
+        max_retries (int): Retries per issue on retryable errors
+        client (AsyncOpenAI): Client to use (default: one for
+            OPENAI_BASE_URL, closed afterwards)
+        progress (callable): Called with (done, total) after each issue
+        use_cache (bool): Answer repeat issues from the categorization
+            cache and store new results in it
+        use_local (bool): Route issues the local router is confident about
+            without calling the AI
+        images (list): Per context, None or (image_ref, encode): the blob
+            reference of its stored full image (None if not known yet) and
+            a callable returning (image_ref, base64 photo from
+            image_pipeline.encode_for_analysis). encode is run in a thread
+            while the issue holds a request slot; the photo is analyzed and
+            its reference is part of the cache key like in single-issue
+            routing (optional)
+
+    Returns:
+        list: (department, confidence, routing_method) per context, in
+            order; routing_method is 'Local' when the local router was
+            confident, 'AI', or 'Fallback' when the AI could not be reached
+            and keyword routing was used
+    """
+    own_client = client is None
+    if own_client:
+        # Retries are handled here so the backoff can be shared by the batch
+        client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+    semaphore = asyncio.Semaphore(concurrency)
+    gate = _RateLimitGate()
+    done = 0
+
+    async def run(issue_context, image):
+        nonlocal done
+        result = await _categorize_one(client, semaphore, gate, issue_context, image, max_retries,
+                                       use_cache, use_local)
+        done += 1
+        if progress is not None:
+            progress(done, len(issue_contexts))
+        return result
+
+    images = images or [None] * len(issue_contexts)
+    try:
+        return await asyncio.gather(*(run(issue_context, image) for issue_context, image in zip(issue_contexts, images)))
+    finally:
+        if own_client:
+            await client.close()
+
+def categorize_batch(issue_contexts, **kwargs):
+    """
+    Categorize many issues concurrently (blocking)
+
+    Args:
+        issue_contexts (list): See categorize_batch_async
+        **kwargs: Options of categorize_batch_async
+
+    Returns:
+        list: (department, confidence, routing_method) per context
+    """
+    return asyncio.run(categorize_batch_async(issue_contexts, **kwargs))
+
+def find_unrouted_issues():
+    """
+    Get the IDs of issues that still need AI routing
+
+    These are issues in an UNROUTED_DEPARTMENTS department and issues
+    whose background routing failed. Issues still waiting for their
+    single-issue routing are not included. Both sets are read from the
+    facet index.
+
+    Returns:
+        list: Issue IDs
+    """
+    from utils.data_manager import filter_issues
+
+    issue_ids = {issue['id'] for issue in filter_issues({'department': UNROUTED_DEPARTMENTS})}
+    issue_ids.update(issue['id'] for issue in filter_issues({'routing_status': list(UNROUTED_STATUSES)}))
+    return sorted(issue_ids)
+
+def _analysis_image(image_fields):
+    """
+    Encode an issue's stored photo for analysis
+
+    Gives the same copy and image reference, and so the same cache key, as
+    the original upload in single-issue routing.
+
+    Args:
+        image_fields (dict): The issue's image_ref and image_data
+
+    Returns:
+        tuple: (blob reference of the stored full image, base64 encoded
+            JPEG), or (None, None) if the image is missing
+    """
+    image_bytes = get_issue_image_bytes(image_fields)
+    if not image_bytes:
+        return None, None
+    image_ref = image_fields.get('image_ref')
+    if not image_ref:
+        # A legacy inline image, not stored in the blob store yet
+        image_bytes, image_ref = stored_full_image(image_bytes)
+    return image_ref, encode_for_analysis(image_bytes, stored=True)
+
+def route_issues(issue_ids, concurrency=DEFAULT_CONCURRENCY, progress=None):
+    """
+    Re-route issues with AI and write all results back in one batch
+
+    Issues whose department changed while the batch ran (e.g. an admin
+    reassigned them) are left alone.
+
+    Args:
+        issue_ids (list): IDs of the issues to route
+        concurrency (int): Maximum requests in flight
+        progress (callable): Called with (done, total) after each issue
+
+    Returns:
+        dict: Numbers of issues 'routed' by AI, routed by the 'local'
+            router, routed by keyword 'fallback', and 'skipped' (missing or
+            reassigned)
+    """
+    from utils.data_manager import get_issue, patch_issues
+
+    issues = [issue for issue in map(get_issue, issue_ids) if issue is not None]
+    contexts = [{
+        'title': issue.get('title', ''),
+        'description': issue.get('description', ''),
+        'location': issue.get('location', ''),
+        'image_provided': has_image(issue)
+    } for issue in issues]
+    images = [(issue.get('image_ref'),
+               partial(_analysis_image, {field: issue.get(field) for field in ('image_ref', 'image_data')}))
+              if has_image(issue) else None for issue in issues]
+    results = categorize_batch(contexts, concurrency=concurrency, progress=progress, images=images)
+
+    updates = {}
+    routed_from = {}
+    for issue, (department, confidence, routing_method) in zip(issues, results):
+        current = get_issue(issue['id'])
+        if current is None or current.get('department') != issue.get('department'):
+            continue
+        routed_from[issue['id']] = {'department': issue.get('department')}
+        updates[issue['id']] = {
+            'department': department,
+            'ai_confidence': confidence,
+            'routing_method': routing_method,
+            'routing_status': 'failed' if routing_method == 'Fallback' else 'ready'
+        }
+    # Checked again as part of the write, for a reassignment landing just now
+    patch_issues(updates, expected=routed_from)
+
+    methods = Counter(fields['routing_method'] for fields in updates.values())
+    return {
+        'routed': methods['AI'],
+        'local': methods['Local'],
+        'fallback': methods['Fallback'],
+        'skipped': len(issue_ids) - len(updates)
+    }
+
+def serve_fake_openai(latency=0.2, rate_limit_rate=0.05, error_rate=0.01):
+    """
+    Start a local OpenAI-compatible chat completions server for testing
+
+    It answers every request with a random department after `latency`
+    seconds, and replies 429 (with Retry-After) or 500 for the given
+    fractions of requests.
+
+    Args:
+        latency (float): Seconds per reply
+        rate_limit_rate (float): Fraction of 429 replies
+        error_rate (float): Fraction of 500 replies
+
+    Returns:
+        tuple: (server, base URL to pass as base_url / OPENAI_BASE_URL);
+            call server.shutdown() when done
+    """
+    departments = list(DEPARTMENT_MAPPING)
+    counts = {'requests': 0, 'rate_limited': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            draw = random.random()
+            with lock:
+                counts['requests'] += 1
+                if draw < rate_limit_rate:
+                    counts['rate_limited'] += 1
+                elif draw < rate_limit_rate + error_rate:
+                    counts['errors'] += 1
+            if draw < rate_limit_rate:
+                self._reply(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error'}},
+                            {'Retry-After': '0.5'})
+                return
+            if draw < rate_limit_rate + error_rate:
+                self._reply(500, {'error': {'message': 'Internal error', 'type': 'server_error'}})
+                return
+            time.sleep(latency)
+            content = json.dumps({'department': random.choice(departments), 'confidence': 0.9,
+                                  'reasoning': 'fake server'})
+            self._reply(200, {
+                'id': 'chatcmpl-fake', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': CATEGORIZATION_OPTIONS['model'],
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': content}}]
+            })
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.counts = counts
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def benchmark(count, concurrency=DEFAULT_CONCURRENCY, latency=0.2):
+    """
+    Time a batch against the local fake server
+
+    Args:
+        count (int): Number of issues
+        concurrency (int): Maximum requests in flight
+        latency (float): Seconds per fake reply
+    """
+    server, base_url = serve_fake_openai(latency)
+    try:
+        contexts = [{'title': f'Issue {i}', 'description': 'Overflowing garbage bin near the market',
+                     'location': f'Ward {i % 120}'} for i in range(count)]
+
+        async def run():
+            client = AsyncOpenAI(api_key='test', base_url=base_url, max_retries=0)
+            try:
+                return await categorize_batch_async(contexts, concurrency=concurrency, client=client,
+                                                    use_cache=False, use_local=False)
+            finally:
+                await client.close()
+
+        start = time.perf_counter()
+        results = asyncio.run(run())
+        seconds = time.perf_counter() - start
+        routed = sum(1 for result in results if result[2] == 'AI')
+        print(f"{count} issues, concurrency {concurrency}, {latency}s per reply: {seconds:.1f}s "
+              f"({count / seconds:.0f} issues/s; sequential would take {count * latency:.0f}s)")
+        print(f"AI routed {routed}, fallback {count - routed}; server saw {server.counts}")
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    # Usage: python -m utils.batch_categorizer benchmark [count] [concurrency]
+    if sys.argv[1:2] == ['benchmark']:
+        args = [int(arg) for arg in sys.argv[2:4]]
+        benchmark(*(args or [2000]))
+    else:
+        print("Usage: python -m utils.batch_categorizer benchmark [count] [concurrency]")
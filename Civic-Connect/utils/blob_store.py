@@ -0,0 +1,151 @@
+import base64
+import hashlib
+import os
+import sys
+
+# Images and other binary attachments are stored once per distinct content,
+# named by their SHA-256 digest: data/blobs/<first 2 hex chars>/<digest>
+BLOB_DIR = os.path.join('data', 'blobs')
+
+# Issues updated per write when migrating inline images
+MIGRATION_CHUNK = 500
+
+def blob_path(ref):
+    """
+    Get the file path for a blob reference
+
+    Args:
+        ref (str): SHA-256 hex digest
+
+    Returns:
+        str: Path of the blob file
+    """
+    return os.path.join(BLOB_DIR, ref[:2], ref)
+
+def blob_ref(data):
+    """
+    Get the reference content is stored under, without storing it
+
+    Args:
+        data (bytes): Content
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+def put_blob(data):
+    """
+    Store binary content and return its reference
+
+    Storing the same content twice is a no-op.
+
+    Args:
+        data (bytes): Content to store
+
+    Returns:
+        str: SHA-256 hex digest referencing the content
+    """
+    ref = blob_ref(data)
+    path = blob_path(ref)
+    if os.path.exists(path):
+        return ref
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return ref
+
+def get_blob(ref):
+    """
+    Read stored content by reference
+
+    Args:
+        ref (str): SHA-256 hex digest
+
+    Returns:
+        bytes: Stored content, or None if it does not exist
+    """
+    try:
+        with open(blob_path(ref), 'rb') as f:
+            return f.read()
+    except (OSError, TypeError):
+        return None
+
+def get_issue_image_bytes(issue, thumbnail=False):
+    """
+    Get the raw image bytes attached to an issue
+
+    Supports both blob references and legacy inline base64 `image_data`.
+
+    Args:
+        issue (dict): Issue record
+        thumbnail (bool): Prefer the small thumbnail when one exists
+
+    Returns:
+        bytes: JPEG/PNG bytes, or None if the issue has no image
+    """
+    if thumbnail and issue.get('thumbnail_ref'):
+        return get_blob(issue['thumbnail_ref'])
+    if issue.get('image_ref'):
+        return get_blob(issue['image_ref'])
+    if issue.get('image_data'):
+        return base64.b64decode(issue['image_data'])
+    return None
+
+def has_image(issue):
+    """Check whether an issue has an attached image without loading it"""
+    return bool(issue.get('image_ref') or issue.get('image_data'))
+
+def migrate_inline_images(chunk_size=MIGRATION_CHUNK):
+    """
+    Move inline base64 images out of issue records into the blob store
+
+    Each migrated record gets an `image_ref` and its `image_data` cleared.
+    The records are updated through data_manager.patch_issues, one log
+    write per `chunk_size` issues, so the snapshot sheds the image text on
+    the next compaction. An issue whose image changed meanwhile is left
+    for the next run.
+
+    Args:
+        chunk_size (int): Issues updated per write
+
+    Returns:
+        int: Number of issues migrated
+    """
+    from utils.data_manager import compact_issues, get_issues_view, patch_issues
+
+    # Views into the shared store; each image is read only when stored
+    pending = [issue for issue in get_issues_view() if issue.get('image_data')]
+
+    migrated = 0
+    for start in range(0, len(pending), chunk_size):
+        updates = {}
+        expected = {}
+        for issue in pending[start:start + chunk_size]:
+            issue_id = None
+            try:
+                issue_id, image_data = issue['id'], issue['image_data']
+                ref = put_blob(base64.b64decode(image_data))
+            except Exception as e:
+                print(f"Error migrating image for issue {issue_id}: {e}")
+                continue
+            updates[issue_id] = {'image_ref': ref, 'image_data': None}
+            expected[issue_id] = {'image_data': image_data}
+        migrated += patch_issues(updates, expected)
+
+    if migrated:
+        compact_issues()
+    print(f"Migrated {migrated} inline images to {BLOB_DIR}")
+    return migrated
+
+if __name__ == '__main__':
+    # Usage: python -m utils.blob_store migrate
+    if sys.argv[1:] == ['migrate']:
+        migrate_inline_images()
+    else:
+        print("Usage: python -m utils.blob_store migrate")
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# AI categorization results by normalized report text and image. Entries are
+# kept in an in-memory LRU in front of an SQLite file, so repeat reports skip
+# the API even after a restart.
+CACHE_FILE = os.path.join('data', 'cache', 'categorizations.sqlite3')
+
+# Seconds a cached categorization stays valid
+CACHE_TTL = 30 * 24 * 3600
+
+# Entries kept in memory across all sessions
+MAX_MEMORY_ENTRIES = 10000
+
+_NON_WORD = re.compile(r'\W+')
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_connection = None
+_connection_version = None
+_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+
+def normalize_text(text):
+    """Lowercase text and reduce punctuation and whitespace runs to single spaces"""
+    return ' '.join(_NON_WORD.sub(' ', (text or '').lower()).split())
+
+def prompt_version():
+    """
+    Fingerprint of the categorization prompt, departments and model
+
+    Changes whenever DEPARTMENT_MAPPING, the prompts or the request options
+    change, which makes all earlier cache entries unreachable.
+
+    Returns:
+        str: Hex digest
+    """
+    from utils.ai_categorizer import (CATEGORIZATION_OPTIONS, IMAGE_ANALYSIS_OPTIONS, IMAGE_ANALYSIS_PROMPT,
+                                      build_categorization_messages)
+
+    payload = json.dumps([build_categorization_messages({}), CATEGORIZATION_OPTIONS,
+                          IMAGE_ANALYSIS_PROMPT, IMAGE_ANALYSIS_OPTIONS], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def categorization_key(issue_context, image_ref=None):
+    """
+    Get the cache key of an issue
+
+    The photo enters the key by its blob reference, so a cached issue is
+    answered without reading or encoding the photo.
+
+    Args:
+        issue_context (dict): Contains title, description, etc.
+        image_ref (str): Blob reference of the issue's stored full image
+            (optional)
+
+    Returns:
+        str: Key combining the prompt version, normalized title and
+            description, and image reference
+    """
+    payload = '\x00'.join([
+        prompt_version(),
+        normalize_text(issue_context.get('title')),
+        normalize_text(issue_context.get('description')),
+        image_ref or ''
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _connect():
+    """Open the cache file, dropping expired entries and those of older prompts"""
+    global _connection, _connection_version
+
+    version = prompt_version()
+    if _connection is not None and _connection_version == version:
+        return _connection
+    if _connection is None:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        _connection = sqlite3.connect(CACHE_FILE, timeout=5, isolation_level=None, check_same_thread=False)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("""
+            CREATE TABLE IF NOT EXISTS categorizations (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                department TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                reasoning TEXT,
+                expires_at REAL NOT NULL
+            )
+        """)
+    if _connection_version is not None:
+        # Entries of the old prompt can no longer be hit
+        _memory.clear()
+    _connection.execute("DELETE FROM categorizations WHERE version != ? OR expires_at <= ?",
+                        (version, time.time()))
+    _connection_version = version
+    return _connection
+
+def get_cached_categorization(key):
+    """
+    Look up a categorization
+
+    Args:
+        key (str): Key from categorization_key()
+
+    Returns:
+        tuple: (department, confidence, reasoning), or None on a miss
+    """
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            if entry[3] > now:
+                _memory.move_to_end(key)
+                _stats['hits'] += 1
+                return entry[:3]
+            del _memory[key]
+
+        try:
+            row = _connect().execute(
+                "SELECT department, confidence, reasoning, expires_at FROM categorizations WHERE key = ?",
+                (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading categorization cache: {e}")
+            row = None
+
+        if row is None or row[3] <= now:
+            _stats['misses'] += 1
+            return None
+        _remember(key, tuple(row))
+        _stats['hits'] += 1
+        _stats['disk_hits'] += 1
+        return tuple(row[:3])
+
+def _remember(key, entry):
+    _memory[key] = entry
+    _memory.move_to_end(key)
+    while len(_memory) > MAX_MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+def cache_categorization(key, department, confidence, reasoning=None):
+    """
+    Store a categorization for CACHE_TTL seconds
+
+    Args:
+        key (str): Key from categorization_key()
+        department (str): Department the AI chose
+        confidence (float): AI confidence score
+        reasoning (str): AI reasoning (optional)
+    """
+    expires_at = time.time() + CACHE_TTL
+    with _lock:
+        try:
+            _connect().execute(
+                "INSERT OR REPLACE INTO categorizations VALUES (?, ?, ?, ?, ?, ?)",
+                (key, _connection_version, department, confidence, reasoning, expires_at)
+            )
+        except sqlite3.Error as e:
+            print(f"Error writing categorization cache: {e}")
+        _remember(key, (department, confidence, reasoning, expires_at))
+        _stats['stores'] += 1
+
+def get_cache_stats():
+    """
+    Get hit/miss counts of this process and the cache size
+
+    Returns:
+        dict: hits (of which disk_hits came from the file), misses, stores,
+            hit_rate (0-1), memory_entries and disk_entries
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['memory_entries'] = len(_memory)
+        try:
+            stats['disk_entries'] = _connect().execute("SELECT COUNT(*) FROM categorizations").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error reading categorization cache: {e}")
+            stats['disk_entries'] = 0
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+def clear_categorization_cache():
+    """Drop all cached categorizations, in memory and on disk"""
+    with _lock:
+        _memory.clear()
+        try:
+            _connect().execute("DELETE FROM categorizations")
+        except sqlite3.Error as e:
+            print(f"Error clearing categorization cache: {e}")
@@ -0,0 +1,154 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.ai_categorizer import categorize_issue_with_ai, fallback_categorization
+from utils.batch_categorizer import route_issues
+from utils.image_pipeline import encode_for_analysis, stored_full_image
+from utils.issue_router import classify_locally
+
+# Concurrent AI routing requests; the work is waiting on the API, not CPU
+MAX_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="categorize")
+
+# The batch re-route run by admins; one at a time for the whole process
+_batch_job = None
+_batch_lock = threading.Lock()
+
+class BatchRoutingJob:
+    """
+    Progress of a background batch re-route
+
+    Attributes:
+        total (int): Number of issues to route
+        done (int): Number of issues routed so far
+        future (Future): Resolves to the counts from
+            batch_categorizer.route_issues
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.future = None
+
+    def progress(self, done, total):
+        self.done = done
+
+    def running(self):
+        return not self.future.done()
+
+def provisional_routing(issue_context):
+    """
+    Get the routing fields an issue is saved with before AI routing finishes
+
+    Issues the local router is confident about are routed right away and
+    need no AI call (routing_method 'Local', routing_status 'ready').
+
+    Args:
+        issue_context (dict): Title, description and location of the issue
+
+    Returns:
+        dict: Issue fields department, ai_confidence, routing_method
+            ('Local' or 'Fallback') and routing_status ('ready' or
+            'processing')
+    """
+    local = classify_locally(issue_context)
+    if local is not None:
+        department, confidence = local
+        return {
+            'department': department,
+            'ai_confidence': confidence,
+            'routing_method': 'Local',
+            'routing_status': 'ready'
+        }
+
+    department, confidence = fallback_categorization(issue_context)
+    return {
+        'department': department,
+        'ai_confidence': confidence,
+        'routing_method': 'Fallback',
+        'routing_status': 'processing'
+    }
+
+def _categorize(issue_id, issue_context, provisional_department, image_bytes=None):
+    """
+    Route an issue with AI and update it unless it was reassigned meanwhile
+
+    When the AI cannot be reached the keyword routing is kept and the
+    issue is marked 'failed', so a later batch run routes it again.
+    """
+    from utils.data_manager import patch_issue
+
+    try:
+        image_data = image_ref = None
+        if image_bytes:
+            full_image, image_ref = stored_full_image(image_bytes)
+            image_data = encode_for_analysis(full_image, stored=True)
+        department, confidence, routing_method = categorize_issue_with_ai(issue_context, image_data, image_ref)
+        fields = {
+            'department': department,
+            'ai_confidence': confidence,
+            'routing_method': routing_method,
+            'routing_status': 'failed' if routing_method == 'Fallback' else 'ready'
+        }
+    except Exception as e:
+        print(f"AI routing failed for issue {issue_id}: {e}")
+        fields = {'routing_status': 'failed'}
+
+    # Written only if the issue still has its provisional department
+    if patch_issue(issue_id, fields, expected={'department': provisional_department}):
+        return fields
+    # An admin already routed the issue (or it was removed); keep their choice
+    fields = {'routing_status': 'ready'}
+    return fields if patch_issue(issue_id, fields) else None
+
+def submit_categorization(issue_id, issue_context, provisional_department, image_bytes=None):
+    """
+    Route a saved issue with AI in the background
+
+    The issue should already be saved with provisional_routing(); it is
+    patched with the AI department, confidence and routing method once the
+    AI answers, or marked 'failed' if it cannot.
+
+    Args:
+        issue_id (str): ID of the issue to route
+        issue_context (dict): Title, description, location and
+            image_provided, as passed to categorize_issue_with_ai
+        provisional_department (str): Department the issue was saved with
+        image_bytes (bytes): Uploaded photo to analyze (optional)
+
+    Returns:
+        Future: Resolves to the fields written to the issue
+    """
+    return _executor.submit(_categorize, issue_id, issue_context, provisional_department, image_bytes)
+
+def submit_batch_routing(issue_ids):
+    """
+    Re-route many issues with AI in the background
+
+    Only one batch runs at a time; while one is running it is returned
+    instead of starting another.
+
+    Args:
+        issue_ids (list): IDs of the issues to route
+
+    Returns:
+        BatchRoutingJob: The running job
+    """
+    global _batch_job
+
+    with _batch_lock:
+        if _batch_job is not None and _batch_job.running():
+            return _batch_job
+        job = BatchRoutingJob(len(issue_ids))
+        job.future = _executor.submit(route_issues, issue_ids, progress=job.progress)
+        _batch_job = job
+        return job
+
+def get_batch_routing():
+    """
+    Get the latest batch re-route
+
+    Returns:
+        BatchRoutingJob: The running or last finished job, or None
+    """
+    return _batch_job
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import tempfile
+
+# Columns written by issue exports, in output order. Binary image data and
+# internal blob references are never exported.
+EXPORT_COLUMNS = [
+    'id', 'title', 'description', 'location', 'latitude', 'longitude',
+    'reporter_name', 'phone', 'email', 'preferred_contact',
+    'department', 'manual_department', 'ai_confidence', 'routing_method',
+    'priority', 'status', 'timestamp', 'last_updated',
+    'reassignment_history', 'image_status'
+]
+
+# Admin exports additionally include the internal admin notes
+ADMIN_EXPORT_COLUMNS = EXPORT_COLUMNS + ['admin_notes']
+
+# Number of rows serialized per yielded chunk
+CHUNK_ROWS = 1000
+
+def _cell(value):
+    """Format one field value for a CSV cell"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def csv_chunks(issues, columns=None, chunk_size=CHUNK_ROWS):
+    """
+    Serialize issues to CSV text, one chunk at a time
+
+    Only the requested columns are read from each issue, and at most
+    `chunk_size` rows are held in memory at once.
+
+    Args:
+        issues (iterable): Issue dictionaries, e.g. a generator
+        columns (list): Columns to export (default EXPORT_COLUMNS)
+        chunk_size (int): Rows per chunk
+
+    Yields:
+        str: CSV text; the first chunk is the header row
+    """
+    columns = columns or EXPORT_COLUMNS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    rows = 0
+    for issue in issues:
+        writer.writerow([_cell(issue.get(column)) for column in columns])
+        rows += 1
+        if rows % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def write_csv(chunks, filename):
+    """
+    Write CSV chunks to a file
+
+    Args:
+        chunks (iterable): CSV text chunks from csv_chunks()
+        filename (str): Output path
+
+    Returns:
+        str: The output path
+    """
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return filename
+
+def spool_csv(chunks):
+    """
+    Write CSV chunks to an anonymous temporary file
+
+    The export never exists as one string while it is built. The file is
+    unbuffered, i.e. an io.RawIOBase, which st.download_button accepts as
+    data directly.
+
+    Args:
+        chunks (iterable): CSV text chunks from csv_chunks()
+
+    Returns:
+        file: Binary file object positioned at the start
+    """
+    spool = tempfile.TemporaryFile(buffering=0)
+    for chunk in chunks:
+        spool.write(chunk.encode('utf-8'))
+    spool.seek(0)
+    return spool
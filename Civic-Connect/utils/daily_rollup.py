@@ -0,0 +1,107 @@
+from collections import Counter
+from datetime import datetime
+import pandas as pd
+from utils.issue_stats import STATS_FIELDS
+
+# Dimensions of a rollup row after the report day, in key order; an issue
+# without a value is counted under the STATS_FIELDS default
+DIMENSIONS = ('department', 'status', 'priority', 'routing_method')
+
+# Fields whose change moves an issue to another rollup row
+SOURCE_FIELDS = set(DIMENSIONS) | {'timestamp'}
+
+def report_day(timestamp):
+    """
+    Get the report day of a timestamp
+
+    Args:
+        timestamp (str): ISO timestamp
+
+    Returns:
+        str: 'YYYY-MM-DD', or None if the timestamp cannot be parsed
+    """
+    try:
+        return datetime.fromisoformat(timestamp).date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+class DailyRollup:
+    """
+    Materialized issue counts per (day, department, status, priority,
+    routing_method)
+
+    Each save, patch and removal moves one issue between at most two rows,
+    so dashboards read a table with one row per day and dimension
+    combination instead of scanning the issues. The rollup is kept up to
+    date through the IssueStore index hooks; attaching it with build=True
+    back-fills it from the existing issues. It can be saved and restored
+    with to_dict() / from_dict().
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def _key(self, issue):
+        key = [report_day(issue.get('timestamp'))]
+        for field in DIMENSIONS:
+            value = issue.get(field)
+            key.append(value if value is not None else STATS_FIELDS[field])
+        return tuple(key)
+
+    def _count(self, key, delta):
+        self.counts[key] += delta
+        if self.counts[key] <= 0:
+            del self.counts[key]
+
+    def on_add(self, position, issue):
+        self._count(self._key(issue), 1)
+
+    def on_patch(self, position, issue, old_fields):
+        if not SOURCE_FIELDS.intersection(old_fields):
+            return
+        old_issue = dict(issue)
+        old_issue.update(old_fields)
+        old_key = self._key(old_issue)
+        new_key = self._key(issue)
+        if old_key != new_key:
+            self._count(old_key, -1)
+            self._count(new_key, 1)
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        self._count(self._key(removed_issue), -1)
+
+    def frame(self):
+        """
+        Get the rollup rows as a DataFrame
+
+        Returns:
+            pandas.DataFrame: Columns 'date' (datetime64, NaT for issues
+                without a parseable timestamp), the categorical DIMENSIONS
+                and 'count'
+        """
+        rows = [key + (count,) for key, count in self.counts.items()]
+        frame = pd.DataFrame(rows, columns=['date', *DIMENSIONS, 'count'])
+        frame['date'] = pd.to_datetime(frame['date'])
+        for field in DIMENSIONS:
+            frame[field] = frame[field].astype('category')
+        frame['count'] = frame['count'].astype('int64')
+        return frame
+
+    def to_dict(self):
+        """Get the rows as a JSON-serializable dictionary"""
+        return {'rows': [[*key, count] for key, count in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore rows saved with to_dict()
+
+        Args:
+            data (dict): Saved rows
+
+        Returns:
+            DailyRollup: Rollup holding the saved counts
+        """
+        rollup = cls()
+        rollup.counts.update({tuple(row[:-1]): row[-1] for row in data['rows']})
+        return rollup
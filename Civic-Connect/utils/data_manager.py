@@ -1,77 +1,1002 @@
 import json
 import os
-from datetime import datetime
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+from utils import backup_store, csv_export, issue_query, partitions, snapshot_cache
+from utils.analytics import AnalyticsIndex
+from utils.daily_rollup import DailyRollup
+from utils.facet_index import FacetIndex
+from utils.issue_stats import IssueStats
+from utils.issue_store import IssueStore
+from utils.issue_table import IssueTable
+from utils.reporter_profiles import ReporterProfiles
+from utils.reporter_sketches import ReporterSketches
+from utils.response_times import MIN_SAMPLES, RESOLVED_STATUSES, WEEKDAYS, ResponseTimes
+from utils.sorted_index import SortedIndex
 
-def save_issue(issue_data):
+# Storage layout: a snapshot of all issues, partitioned by month (see
+# utils.partitions), plus an append-only JSONL log of changes made since the
+# snapshot was written. The log is folded back into the snapshot by a
+# background compactor.
+DATA_DIR = 'data'
+# Single-file snapshot used before partitioning; migrated on the next write
+ISSUES_FILE = os.path.join(DATA_DIR, 'issues.json')
+ISSUES_LOG = os.path.join(DATA_DIR, 'issues.log.jsonl')
+ISSUES_LOG_COMPACTING = os.path.join(DATA_DIR, 'issues.log.compacting.jsonl')
+# Issue counters matching the snapshot, so loading does not have to recount
+ISSUES_STATS_FILE = os.path.join(DATA_DIR, 'issue_stats.json')
+
+# Counter indexes saved in ISSUES_STATS_FILE: name -> class with
+# to_dict() / from_dict()
+COUNTER_INDEXES = {
+    'stats': IssueStats,
+    'rollup': DailyRollup,
+    'response_times': ResponseTimes,
+    'reporters': ReporterSketches,
+}
+
+# Number of log records after which a background compaction is started
+COMPACTION_THRESHOLD = 500
+
+# Storage backend: 'json' (snapshot + log files above) or 'sql' (utils.sql_store)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+
+_store_lock = threading.RLock()
+_log_record_count = None
+_generation = 0
+_compactor = None
+# Incremented by every compaction as it rotates the log; a merge that finds
+# it changed leaves the folding to the newer compaction
+_compaction_round = 0
+# Sequence number of the last change record written, see _current_seq()
+_last_seq = None
+
+# Process-wide issue store shared by all sessions, see _get_store()
+_store = None
+_store_version = None
+_write_counter = 0
+
+# Analytics frame of the shared store and the data version it was built at
+_analytics_frame = None
+_analytics_version = None
+# Daily rollup frame of the shared store and the data version it was built at
+_rollup_frame = None
+_rollup_version = None
+
+def _sql_backend():
+    """Return the SQL storage backend module if it is configured, else None"""
+    if STORAGE_BACKEND != 'sql':
+        return None
+    from utils import sql_store
+    return sql_store
+
+def _read_log(path):
     """
-    Save a single issue to the data store
+    Read change records from a log segment
+    
+    A torn final line (crash mid-write) is ignored so that at most the
+    last record is lost.
     
     Args:
-        issue_data (dict): Issue information to save
+        path (str): Log segment path
+        
+    Returns:
+        list: Change records in write order
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    
+    for line_no, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            if line_no == len(lines) - 1:
+                print(f"Ignoring incomplete last record in {path}")
+            else:
+                print(f"Skipping corrupt record at {path}:{line_no + 1}")
+    return records
+
+def _repair_log_tail(path):
+    """Truncate a partially written final line so new appends start clean"""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    
+    with open(path, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b'\n':
+            return
+        f.seek(0)
+        data = f.read()
+        f.truncate(data.rfind(b'\n') + 1)
+        print(f"Truncated incomplete last record in {path}")
+
+def _current_seq():
+    """
+    Get the sequence number of the last change record written
+    
+    Worked out once per process from the newest of the log segments,
+    backup journal, snapshot manifest and backup catalog.
+    """
+    global _last_seq
+    
+    if _last_seq is None:
+        manifest = partitions.read_manifest() or {}
+        candidates = [manifest.get('seq', 0), backup_store.last_seq(backup_store.read_catalog())]
+        candidates.extend(last for first, last, path in backup_store.journal_segments())
+        for segment in (ISSUES_LOG_COMPACTING, ISSUES_LOG):
+            candidates.extend(record.get('seq', 0) for record in _read_log(segment))
+        _last_seq = max(candidates)
+    return _last_seq
+
+def _append_log(records):
+    """
+    Durably append change records to the active log segment
+    
+    Each record is stamped with the next change sequence number and the
+    time of the change, which incremental backups rely on.
+    
+    Args:
+        records (list): Change records to append
+    """
+    global _log_record_count, _last_seq
+    
+    with _store_lock:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        _repair_log_tail(ISSUES_LOG)
+        
+        seq = _current_seq()
+        changed_at = datetime.now().isoformat()
+        for record in records:
+            seq += 1
+            record['seq'] = seq
+            record['at'] = changed_at
+        _last_seq = seq
+        
+        payload = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+        with open(ISSUES_LOG, 'a') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        if _log_record_count is None:
+            _log_record_count = len(_read_log(ISSUES_LOG))
+        else:
+            _log_record_count += len(records)
+        
+        if _log_record_count >= COMPACTION_THRESHOLD:
+            _start_compaction()
+
+def _apply_log_record(store, record):
+    """
+    Apply one change record to an in-memory issue store
+    
+    Args:
+        store (IssueStore): Issues to modify in place
+        record (dict): Change record with an 'op' of put, patch or delete
+    """
+    op = record.get('op')
+    
+    if op == 'put':
+        store.add(record['issue'])
+    elif op == 'patch':
+        store.patch(record.get('id'), record.get('fields', {}))
+    elif op == 'delete':
+        store.remove(record.get('id'))
+
+def _read_snapshot(months=None):
     """
+    Read the issue snapshot
+    
+    Args:
+        months (list): Month partitions to read (default: all)
+        
+    Returns:
+        IssueTable or list: Snapshot issues; a full read returns the
+            IssueTable an IssueStore adopts without re-encoding
+    """
+    if months is None:
+        stamp = _snapshot_stamp()
+        issues = snapshot_cache.load(stamp)
+        if issues is not None:
+            return issues
+    
+    manifest = partitions.read_manifest()
+    if manifest is not None:
+        issues = partitions.read_segments(manifest, months)
+    elif os.path.exists(ISSUES_FILE):
+        with open(ISSUES_FILE, 'r') as f:
+            issues = json.load(f)
+        if months is not None:
+            wanted = set(months)
+            issues = [issue for issue in issues if partitions.partition_key(issue) in wanted]
+    else:
+        return []
+    
+    if months is None:
+        issues = IssueStore(issues).issues
+        # Cache the full snapshot unless it was replaced while being read
+        if stamp is not None and _snapshot_stamp() == stamp:
+            _save_snapshot_cache(snapshot_cache.encode(issues))
+    return issues
+
+def _save_snapshot_cache(arrays, stamp=None):
+    """Save encoded snapshot arrays stamped for a snapshot (default: the current one)"""
     try:
-        # Ensure data directory exists
-        os.makedirs('data', exist_ok=True)
+        snapshot_cache.save(arrays, stamp if stamp is not None else _snapshot_stamp())
+    except Exception as e:
+        print(f"Error saving snapshot cache: {e}")
+
+def _write_snapshot(issues, dirty=None, seq=None):
+    """
+    Write the issue snapshot partitions
+    
+    Args:
+        issues (iterable): Current issues; with `dirty`, those of the
+            dirty segments are enough
+        dirty (set): Segments that changed since the last snapshot
+            (default: rewrite all)
+        seq (int): Last change sequence number folded in (optional)
+    """
+    manifest = partitions.read_manifest()
+    if manifest is None:
+        dirty = None
+        manifest = {'segments': {}}
+    if seq is not None:
+        manifest['seq'] = max(seq, manifest.get('seq', 0))
+    partitions.write_segments(issues, dirty, manifest)
+    if os.path.exists(ISSUES_FILE):
+        os.remove(ISSUES_FILE)
+
+def _apply_segments(store, segments):
+    """Apply the change records of log segments to a store, in order"""
+    for segment in segments:
+        for record in _read_log(segment):
+            _apply_log_record(store, record)
+    return store
+
+def _snapshot_stamp():
+    """Get the (size, mtime) of the snapshot manifest, or None if it is missing"""
+    for path in (partitions.MANIFEST_FILE, ISSUES_FILE):
+        try:
+            stat = os.stat(path)
+            return [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            continue
+    return None
+
+def _write_counters(counters):
+    """
+    Save issue counters for the snapshot file that was just written
+    
+    The counters are stamped with the snapshot's size and modification
+    time; _read_counters ignores them once the snapshot changes.
+    
+    Args:
+        counters (dict): Name -> counter index over exactly the snapshot's
+            issues, for every name in COUNTER_INDEXES
+    """
+    payload = {
+        'snapshot': _snapshot_stamp(),
+        'indexes': {name: counter.to_dict() for name, counter in counters.items()}
+    }
+    tmp_path = f"{ISSUES_STATS_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, ISSUES_STATS_FILE)
+
+def _read_counters(stamp):
+    """
+    Load saved issue counters if they belong to the given snapshot
+    
+    Args:
+        stamp (list): Snapshot stamp from _snapshot_stamp()
         
-        # Load existing issues
-        issues = load_issues()
+    Returns:
+        dict: Name -> restored counter index (names missing from the file
+            are left out), or None if the file is missing or stale
+    """
+    try:
+        with open(ISSUES_STATS_FILE, 'r') as f:
+            payload = json.load(f)
+        if stamp is None or payload.get('snapshot') != stamp or 'indexes' not in payload:
+            return None
+        return {name: COUNTER_INDEXES[name].from_dict(data)
+                for name, data in payload['indexes'].items() if name in COUNTER_INDEXES}
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable issue statistics: {e}")
+        return None
+
+def _load_store():
+    """
+    Load the snapshot and log segments into an indexed store
+    
+    Saved counters are reused when they match the snapshot, so only the
+    log records are counted; otherwise the counters are rebuilt.
+    """
+    stamp = _snapshot_stamp()
+    issues = _read_snapshot()
+    counters = _read_counters(stamp) if _snapshot_stamp() == stamp else None
+    store = _attach_indexes(IssueStore(issues), counters)
+    return _apply_segments(store, [ISSUES_LOG_COMPACTING, ISSUES_LOG])
+
+def get_data_version():
+    """
+    Get a cheap fingerprint of the stored issue data
+    
+    Combines an in-process write counter with the size and modification
+    time of the data files, so changes made by other processes are noticed
+    without reading the files. The SQL backend instead uses the database's
+    write revision, which every process bumps on each write.
+    
+    Returns:
+        tuple: Opaque version stamp
+    """
+    backend = _sql_backend()
+    if backend:
+        return (_write_counter, backend.get_revision())
+    
+    version = [_write_counter]
+    for path in (partitions.MANIFEST_FILE, ISSUES_FILE, ISSUES_LOG_COMPACTING, ISSUES_LOG):
+        try:
+            stat = os.stat(path)
+            version.extend((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.extend((0, 0))
+    return tuple(version)
+
+def _attach_indexes(store, counters=None):
+    """
+    Attach the derived indexes that are maintained alongside the store
+    
+    Args:
+        store (IssueStore): Store to index
+        counters (dict): Name -> counter index already matching the
+            store's issues (optional; missing ones are built)
+    """
+    store.attach_index('facets', FacetIndex())
+    store.attach_index('timestamp', SortedIndex(lambda issue: issue.get('timestamp') or '', ['timestamp'],
+                                                store.issues), build=False)
+    store.attach_index('ids', SortedIndex(lambda issue: issue.get('id') or '', ['id'], store.issues), build=False)
+    store.attach_index('profiles', ReporterProfiles(store.issues), build=False)
+    store.attach_index('segments', partitions.DirtySegments(), build=False)
+    _attach_counters(store, counters)
+    return store
+
+def _attach_counters(store, counters=None):
+    """
+    Attach the COUNTER_INDEXES to a store
+    
+    Args:
+        store (IssueStore): Store to count
+        counters (dict): Name -> counter index already matching the
+            store's issues (optional; missing ones are built)
         
-        # Add new issue
-        issues.append(issue_data)
+    Returns:
+        dict: Name -> attached counter index
+    """
+    attached = {}
+    for name, counter_class in COUNTER_INDEXES.items():
+        if counters and name in counters:
+            attached[name] = store.attach_index(name, counters[name], build=False)
+        else:
+            attached[name] = store.attach_index(name, counter_class())
+    return attached
+
+def _get_store():
+    """
+    Get the process-wide issue store, reloading it if the data changed
+    
+    The store is shared by all Streamlit sessions in this process. It is
+    rebuilt only when the data version no longer matches the one it was
+    loaded at, i.e. after a write from outside this process.
+    """
+    global _store, _store_version
+    
+    with _store_lock:
+        version = get_data_version()
+        if _store is None or version != _store_version:
+            backend = _sql_backend()
+            if backend:
+                _store = _attach_indexes(IssueStore(backend.load_issues()))
+            else:
+                _store = _load_store()
+            _store_version = version
+        return _store
+
+def _commit_to_store(version_before, apply=None):
+    """
+    Bring the shared store up to date after a write from this process
+    
+    Args:
+        version_before (tuple): Data version taken before the write
+        apply (callable): Applies the same change to the in-memory store
+    """
+    global _write_counter, _store_version
+    
+    with _store_lock:
+        _write_counter += 1
+        if _store is not None and _store_version == version_before:
+            if apply is not None:
+                apply(_store)
+            _store_version = get_data_version()
+            if _sql_backend() and _store_version[1] != version_before[1] + 1:
+                # Another process wrote as well; reload on the next read
+                _store_version = None
+
+def get_issues_view():
+    """
+    Get the shared list of all issues
+    
+    The returned table and its records are shared by every session and
+    are read-only; use save_issue / patch_issue to change data. Taking a
+    view is O(1) and does not copy any records.
+    
+    Returns:
+        IssueTable: Shared sequence of read-only issue records
+    """
+    try:
+        return _get_store().issues
+    except Exception as e:
+        print(f"Error loading issues: {e}")
+        return []
+
+def filter_issues(filters=None):
+    """
+    Get issues matching facet filters using the bitmap index
+    
+    Args:
+        filters (dict): Field -> list of allowed values for status,
+            department, priority and routing_status; None or a missing
+            field means any
+            
+    Returns:
+        list: Matching issues (shared, read-only) in store order
+    """
+    try:
+        with _store_lock:
+            store = _get_store()
+            return [store.issues[position] for position in store.index('facets').positions(filters)]
+    except Exception as e:
+        print(f"Error filtering issues: {e}")
+        return []
+
+def query_issues(filters=None, sort='newest', limit=20, cursor=None, start=None, end=None):
+    """
+    Get one page of issues using the pre-built indexes
+    
+    Args:
+        filters (dict): Field -> list of allowed values for status,
+            department and priority (optional)
+        sort (str): 'newest', 'oldest', 'priority', 'department' or 'urgency'
+        limit (int): Maximum number of issues to return
+        cursor (str): Opaque cursor from the previous page (optional)
+        start (date, datetime or str): Earliest timestamp (optional)
+        end (date, datetime or str): Exclusive latest timestamp; a date
+            includes that whole day (optional)
+        
+    Returns:
+        tuple: (list of issues, cursor for the next page or None)
+    """
+    try:
+        with _store_lock:
+            return issue_query.query(_get_store(), filters, sort, limit, cursor,
+                                     issue_query.timestamp_bound(start),
+                                     issue_query.timestamp_bound(end, end=True))
+    except Exception as e:
+        print(f"Error querying issues: {e}")
+        return [], None
+
+def count_issues(filters=None, start=None, end=None):
+    """
+    Count issues matching facet filters and a timestamp range
+    
+    Args:
+        filters (dict): Field -> list of allowed values (optional)
+        start (date, datetime or str): Earliest timestamp (optional)
+        end (date, datetime or str): Exclusive latest timestamp; a date
+            includes that whole day (optional)
+        
+    Returns:
+        int: Number of matching issues
+    """
+    try:
+        with _store_lock:
+            store = _get_store()
+            mask = store.index('facets').mask(filters)
+            in_range = issue_query.range_mask(store.index('timestamp'), len(mask),
+                                              issue_query.timestamp_bound(start),
+                                              issue_query.timestamp_bound(end, end=True))
+            if in_range is not None:
+                mask &= in_range
+            return int(mask.sum())
+    except Exception as e:
+        print(f"Error counting issues: {e}")
+        return 0
+
+def get_facet_counts(filters=None):
+    """
+    Count issues per status, department and priority value
+    
+    Each field's counts apply the filters on the other fields only, which
+    is what multi-select filter widgets need.
+    
+    Args:
+        filters (dict): Field -> list of allowed values (optional)
+        
+    Returns:
+        dict: Field -> {value: count}
+    """
+    try:
+        with _store_lock:
+            return _get_store().index('facets').facet_counts(filters)
+    except Exception as e:
+        print(f"Error counting facets: {e}")
+        return {}
+
+def get_facet_values(field):
+    """
+    Get the distinct values present for a facet field
+    
+    Args:
+        field (str): 'status', 'department' or 'priority'
+        
+    Returns:
+        list: Sorted distinct values
+    """
+    try:
+        with _store_lock:
+            return _get_store().index('facets').values(field)
+    except Exception as e:
+        print(f"Error getting facet values: {e}")
+        return []
+
+def _replace_all_issues(issues):
+    """
+    Replace the whole data store with the given issues
+    
+    Used by bulk maintenance operations (cleanup, restore). Any pending
+    log segments are discarded and a running compaction is abandoned.
+    """
+    global _log_record_count, _generation, _store
+    
+    with _store_lock:
+        backend = _sql_backend()
+        if backend:
+            backend.replace_all_issues(issues)
+        else:
+            _generation += 1
+            store = IssueStore(issues)
+            _write_snapshot(store.issues)
+            _write_counters(_attach_counters(store))
+            _save_snapshot_cache(snapshot_cache.encode(store.issues))
+            for segment in (ISSUES_LOG, ISSUES_LOG_COMPACTING):
+                if os.path.exists(segment):
+                    os.remove(segment)
+            _log_record_count = 0
+        
+        _break_backup_chain()
+        _store = None
+        _commit_to_store(None)
+
+def compact_issues():
+    """
+    Fold the append-only log into the snapshot file
+    
+    The live store already holds every change, so nothing is re-read or
+    rebuilt: the log is rotated under the store lock together with a
+    copy of the rows of the partition segments it touched (found through
+    the timestamp index) and of the counters, which at that moment are
+    exactly the snapshot plus the rotated segment. Writers then wait only
+    while those segments and the counters are replaced; the snapshot
+    cache is brought up to date outside the lock, from the previous cache
+    and the folded records.
+    
+    Returns:
+        int: Number of log records folded into the snapshot
+    """
+    global _log_record_count, _compaction_round
+    
+    try:
+        with _store_lock:
+            if not os.path.exists(ISSUES_LOG_COMPACTING) and not os.path.exists(ISSUES_LOG):
+                return 0
+            generation = _generation
+            store = _get_store()
+            version_before = get_data_version()
+            if not os.path.exists(ISSUES_LOG_COMPACTING):
+                os.replace(ISSUES_LOG, ISSUES_LOG_COMPACTING)
+            elif os.path.exists(ISSUES_LOG):
+                # A previous compaction did not finish; fold the active log in too
+                _append_log_segment(ISSUES_LOG, ISSUES_LOG_COMPACTING)
+            _log_record_count = 0
+            _compaction_round += 1
+            compaction_round = _compaction_round
+            
+            records = _read_log(ISSUES_LOG_COMPACTING)
+            dirty = store.index('segments').take()
+            full = partitions.read_manifest() is None
+            if full:
+                # First partitioned snapshot: every segment is written
+                dirty_issues = [issue.to_dict() for issue in store.issues]
+            else:
+                timestamps = store.index('timestamp')
+                months = {key for key, segment_class in dirty}
+                dirty_issues = [store.issues.row(position) for position in
+                                _partition_positions(timestamps.keys, timestamps.positions, months)]
+            saved_counters = {name: store.index(name).to_dict() for name in COUNTER_INDEXES}
+            cache_stamp = _snapshot_stamp()
+            _commit_to_store(version_before)
+        
+        counters = {name: COUNTER_INDEXES[name].from_dict(data) for name, data in saved_counters.items()}
+        # The snapshot being written is the previous one plus the records
+        cache_table = IssueTable(dirty_issues) if full else snapshot_cache.load(cache_stamp)
+        if cache_table is not None and not full:
+            cache_store = IssueStore(cache_table)
+            for record in records:
+                _apply_log_record(cache_store, record)
+        
+        with _store_lock:
+            if generation != _generation or compaction_round != _compaction_round:
+                # Store was replaced wholesale, or a later compaction took
+                # over these records, while we were merging
+                return 0
+            if partitions.read_manifest() is None and not full:
+                # The snapshot was removed meanwhile; the next compaction
+                # writes it in full
+                return 0
+            version_before = get_data_version()
+            _write_snapshot(dirty_issues, None if full else dirty,
+                            max((record.get('seq', 0) for record in records), default=0))
+            _write_counters(counters)
+            snapshot_stamp = _snapshot_stamp()
+            _retire_log_segment(records)
+            store.index('segments').done()
+            _commit_to_store(version_before)
+        
+        if cache_table is not None:
+            _save_snapshot_cache(snapshot_cache.encode(cache_table), snapshot_stamp)
+        else:
+            # No previous cache to update; cache the segments just written
+            _read_snapshot()
         
-        # Save back to file
-        with open('data/issues.json', 'w') as f:
-            json.dump(issues, f, indent=2)
+        folded = len(records)
+        print(f"Compacted {folded} log records into {'all' if full else len(dirty)} partition segments")
+        return folded
+        
+    except Exception as e:
+        print(f"Error compacting issues: {e}")
+        return 0
+
+def _append_log_segment(source, target):
+    """Move the records of one log segment to the end of another"""
+    _repair_log_tail(target)
+    with open(source, 'r') as f:
+        payload = f.read()
+    with open(target, 'a') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.remove(source)
+
+def _partition_positions(keys, positions, months):
+    """
+    Find the store positions of the issues in some month partitions
+    
+    Each month is found by bisection and UNDATED by skipping from one
+    month's run of keys to the next, so the cost depends on the number of
+    months and matching issues, not on the size of the store.
+    
+    Args:
+        keys (list): (timestamp, id) keys of the timestamp SortedIndex
+        positions (list): Store positions matching `keys`
+        months (set): Partition keys
+        
+    Returns:
+        list: Store positions
+    """
+    def after(month):
+        # Timestamps starting with the month sort between it and this key
+        return (month[:-1] + chr(ord(month[-1]) + 1),)
+    
+    selected = []
+    for month in months:
+        if month != partitions.UNDATED:
+            selected.extend(positions[bisect_left(keys, (month,)):bisect_left(keys, after(month))])
+    if partitions.UNDATED in months:
+        at = 0
+        while at < len(keys):
+            month = partitions.partition_key({'timestamp': keys[at][0]})
+            if month == partitions.UNDATED:
+                selected.append(positions[at])
+                at += 1
+            else:
+                at = bisect_left(keys, after(month), at)
+    return selected
+
+def _retire_log_segment(records):
+    """
+    Dispose of the folded compaction segment
+    
+    While an incremental backup chain is active the segment is moved into
+    the backup journal, so the next delta backup can pick up its records;
+    otherwise it is deleted.
+    """
+    seqs = [record['seq'] for record in records if 'seq' in record]
+    if seqs and backup_store.chain_active(backup_store.read_catalog()):
+        path = backup_store.journal_path(min(seqs), max(seqs))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(ISSUES_LOG_COMPACTING, path)
+    else:
+        os.remove(ISSUES_LOG_COMPACTING)
+
+def _break_backup_chain():
+    """
+    Require the next backup to be a base snapshot
+    
+    Called after bulk changes that bypass the change log, which deltas
+    cannot represent.
+    """
+    catalog = backup_store.read_catalog()
+    if backup_store.chain_active(catalog):
+        catalog['needs_base'] = True
+        backup_store.save_catalog(catalog)
+    backup_store.prune_journal()
+
+def _start_compaction():
+    """Start a background compaction unless one is already running"""
+    global _compactor
+    
+    if _compactor is not None and _compactor.is_alive():
+        return
+    _compactor = threading.Thread(target=compact_issues, name="issue-compactor", daemon=True)
+    _compactor.start()
+
+def save_issue(issue_data):
+    """
+    Save a single issue to the data store
+    
+    Args:
+        issue_data (dict): Issue information to save
+    """
+    try:
+        with _store_lock:
+            version_before = get_data_version()
+            backend = _sql_backend()
+            if backend:
+                backend.save_issue(issue_data)
+            else:
+                _append_log([{'op': 'put', 'id': issue_data.get('id'), 'issue': issue_data}])
             
+            issue = dict(issue_data)
+            _commit_to_store(version_before, lambda store: store.add(issue))
+        
         print(f"Issue saved successfully: {issue_data.get('id', 'unknown')}")
         
     except Exception as e:
         print(f"Error saving issue: {e}")
         raise
 
-def load_issues():
+def load_issues(start=None, end=None):
     """
     Load all issues from data store
     
+    Served from the shared issue store; a date range is selected with the
+    timestamp index instead of reading and filtering the snapshot.
+    
+    Args:
+        start (date, datetime or str): Earliest timestamp (optional)
+        end (date, datetime or str): Exclusive latest timestamp; a date
+            includes that whole day (optional)
+    
     Returns:
-        list: List of issue dictionaries
+        list: Issues as read-only records, in store order
     """
     try:
-        if os.path.exists('data/issues.json'):
-            with open('data/issues.json', 'r') as f:
-                return json.load(f)
-        return []
+        start = issue_query.timestamp_bound(start)
+        end = issue_query.timestamp_bound(end, end=True)
+        
+        backend = _sql_backend()
+        if backend:
+            return backend.load_issues(start, end)
+        
+        with _store_lock:
+            store = _get_store()
+            in_range = issue_query.range_mask(store.index('timestamp'), len(store), start, end)
+            if in_range is None:
+                return list(store.issues)
+            return [store.issues[position] for position in np.flatnonzero(in_range)]
     except Exception as e:
         print(f"Error loading issues: {e}")
         return []
 
+def get_issue(issue_id):
+    """
+    Get a single issue by ID
+    
+    Args:
+        issue_id (str): ID of the issue
+        
+    Returns:
+        dict: Copy of the issue data, or None if not found
+    """
+    try:
+        issue = _get_store().get(issue_id)
+        return issue.to_dict() if issue is not None else None
+    except LookupError:
+        # Removed (archived or deleted) while being read
+        return None
+    except Exception as e:
+        print(f"Error getting issue: {e}")
+        return None
+
+def find_issue(issue_id):
+    """
+    Get a single issue by its full ID or by the start of it
+    
+    Reporters are shown only the first characters of an ID, so an unknown
+    ID is looked up as a prefix in the sorted ID index.
+    
+    Args:
+        issue_id (str): ID, or the start of one
+        
+    Returns:
+        dict: Copy of the issue data (the one with the lowest matching ID
+            for an ambiguous prefix), or None if not found
+    """
+    try:
+        with _store_lock:
+            store = _get_store()
+            issue = store.get(issue_id)
+            if issue is None and issue_id:
+                ids = store.index('ids')
+                at = bisect_left(ids.keys, (issue_id,))
+                if at < len(ids.keys) and ids.keys[at][1].startswith(issue_id):
+                    issue = store.issues[ids.positions[at]]
+            return issue.to_dict() if issue is not None else None
+    except Exception as e:
+        print(f"Error finding issue: {e}")
+        return None
+
+def patch_issue(issue_id, fields, expected=None):
+    """
+    Update selected fields of a single issue
+    
+    Only the changed fields are persisted, so the cost does not depend on
+    the number of stored issues. With `expected` the check and the write
+    are one step under the store lock (and one transaction in the SQL
+    backend), so a change made in between is never overwritten.
+    
+    Args:
+        issue_id (str): ID of the issue to update
+        fields (dict): Field values to set
+        expected (dict): Field values the issue must still have; if one
+            differs nothing is written (optional)
+        
+    Returns:
+        bool: True if the issue was found and updated
+    """
+    try:
+        with _store_lock:
+            issue = _get_store().get(issue_id)
+            if issue is None:
+                return False
+            if expected and any(issue.get(field) != value for field, value in expected.items()):
+                return False
+            
+            version_before = get_data_version()
+            backend = _sql_backend()
+            if backend:
+                if not backend.patch_issue(issue_id, fields, expected):
+                    # Changed by another process; the store reloads on its next use
+                    return False
+            else:
+                _append_log([{'op': 'patch', 'id': issue_id, 'fields': fields}])
+            
+            _commit_to_store(version_before, lambda store: store.patch(issue_id, fields))
+            return True
+    except Exception as e:
+        print(f"Error patching issue: {e}")
+        return False
+
+def patch_issues(updates, expected=None):
+    """
+    Update selected fields of many issues in one write
+    
+    All changes are appended to the log with a single fsync (or written in
+    one transaction by the SQL backend) and applied to the shared store
+    together.
+    
+    Args:
+        updates (dict): Issue ID -> field values to set
+        expected (dict): Issue ID -> field values the issue must still
+            have, checked atomically as in patch_issue; issues where one
+            differs are not updated (optional)
+        
+    Returns:
+        int: Number of issues found and updated
+    """
+    expected = expected or {}
+    
+    def current(store, issue_id):
+        issue = store.get(issue_id)
+        return issue is not None and all(issue.get(field) == value
+                                         for field, value in expected.get(issue_id, {}).items())
+    
+    try:
+        with _store_lock:
+            store = _get_store()
+            updates = {issue_id: fields for issue_id, fields in updates.items() if current(store, issue_id)}
+            if not updates:
+                return 0
+            
+            version_before = get_data_version()
+            backend = _sql_backend()
+            if backend:
+                updated = set(backend.patch_issues(updates, expected))
+                updates = {issue_id: fields for issue_id, fields in updates.items() if issue_id in updated}
+            else:
+                _append_log([{'op': 'patch', 'id': issue_id, 'fields': fields}
+                             for issue_id, fields in updates.items()])
+            
+            def apply(store):
+                for issue_id, fields in updates.items():
+                    store.patch(issue_id, fields)
+            
+            _commit_to_store(version_before, apply)
+            return len(updates)
+    except Exception as e:
+        print(f"Error patching issues: {e}")
+        return 0
+
 def update_issue_status(issue_id, new_status, admin_notes=None):
     """
     Update the status of a specific issue
     
+    The first move out of 'Pending' stamps 'acknowledged_at' and the first
+    move to a resolved status stamps 'resolved_at', which feed the response
+    time sketches (see get_response_times).
+    
     Args:
         issue_id (str): ID of the issue to update
         new_status (str): New status value
         admin_notes (str): Optional admin notes
     """
     try:
-        issues = load_issues()
+        now = datetime.now().isoformat()
+        fields = {
+            'status': new_status,
+            'last_updated': now
+        }
         
-        for i, issue in enumerate(issues):
-            if issue.get('id') == issue_id:
-                issues[i]['status'] = new_status
-                issues[i]['last_updated'] = datetime.now().isoformat()
-                
-                if admin_notes:
-                    issues[i]['admin_notes'] = admin_notes
-                
-                # Save updated issues
-                with open('data/issues.json', 'w') as f:
-                    json.dump(issues, f, indent=2)
-                
-                print(f"Issue {issue_id} status updated to {new_status}")
-                return True
+        if admin_notes:
+            fields['admin_notes'] = admin_notes
+        
+        with _store_lock:
+            issue = _get_store().get(issue_id)
+            if issue is not None:
+                if new_status != 'Pending' and not issue.get('acknowledged_at'):
+                    fields['acknowledged_at'] = now
+                if new_status in RESOLVED_STATUSES and not issue.get('resolved_at'):
+                    fields['resolved_at'] = now
+            
+            updated = patch_issue(issue_id, fields)
+        
+        if updated:
+            print(f"Issue {issue_id} status updated to {new_status}")
+            return True
         
         print(f"Issue {issue_id} not found")
         return False
@@ -89,30 +1014,29 @@ def reassign_issue_department(issue_id, new_department):
         new_department (str): New department name
     """
     try:
-        issues = load_issues()
+        issue = get_issue(issue_id)
         
-        for i, issue in enumerate(issues):
-            if issue.get('id') == issue_id:
-                old_department = issue.get('department', 'Unknown')
-                issues[i]['department'] = new_department
-                issues[i]['last_updated'] = datetime.now().isoformat()
-                issues[i]['reassignment_history'] = issue.get('reassignment_history', [])
-                issues[i]['reassignment_history'].append({
-                    'from': old_department,
-                    'to': new_department,
-                    'timestamp': datetime.now().isoformat(),
-                    'reason': 'Admin reassignment'
-                })
-                
-                # Save updated issues
-                with open('data/issues.json', 'w') as f:
-                    json.dump(issues, f, indent=2)
-                
-                print(f"Issue {issue_id} reassigned from {old_department} to {new_department}")
-                return True
+        if issue is None:
+            print(f"Issue {issue_id} not found")
+            return False
         
-        print(f"Issue {issue_id} not found")
-        return False
+        old_department = issue.get('department', 'Unknown')
+        history = list(issue.get('reassignment_history', []))
+        history.append({
+            'from': old_department,
+            'to': new_department,
+            'timestamp': datetime.now().isoformat(),
+            'reason': 'Admin reassignment'
+        })
+        
+        patch_issue(issue_id, {
+            'department': new_department,
+            'last_updated': datetime.now().isoformat(),
+            'reassignment_history': history
+        })
+        
+        print(f"Issue {issue_id} reassigned from {old_department} to {new_department}")
+        return True
         
     except Exception as e:
         print(f"Error reassigning issue: {e}")
@@ -122,34 +1046,116 @@ def get_issues_by_phone(phone_number):
     """
     Get all issues reported by a specific phone number
     
+    Reads the reporter's issue ID list from the profile index instead of
+    filtering every issue.
+    
     Args:
         phone_number (str): Phone number to search for
         
     Returns:
-        list: List of issues by this user
+        list: List of issues by this user, newest first
     """
     try:
-        issues = load_issues()
-        user_issues = [issue for issue in issues if issue.get('phone') == phone_number]
-        return sorted(user_issues, key=lambda x: x.get('timestamp', ''), reverse=True)
+        backend = _sql_backend()
+        if backend:
+            return backend.get_issues_by_phone(phone_number)
+        
+        with _store_lock:
+            store = _get_store()
+            return [store.get(issue_id).to_dict() for issue_id in store.index('profiles').issue_ids(phone_number)]
     except Exception as e:
         print(f"Error getting issues by phone: {e}")
         return []
 
+def get_reporter_profile(phone_number):
+    """
+    Get the profile of one reporter
+    
+    Args:
+        phone_number (str): Reporter's phone number
+        
+    Returns:
+        dict: phone, name, email, total_issues, resolved_issues and
+            last_report, or None if the number has no issues
+    """
+    try:
+        with _store_lock:
+            return _get_store().index('profiles').profile(phone_number)
+    except Exception as e:
+        print(f"Error getting reporter profile: {e}")
+        return None
+
+def get_reporter_profiles(sort='issues', limit=20, cursor=None):
+    """
+    Get one page of reporter profiles
+    
+    Profiles are maintained on every write and kept sorted, so a page costs
+    the same whatever the number of citizens.
+    
+    Args:
+        sort (str): 'issues' (most issues first), 'recent' (latest report
+            first) or 'name'
+        limit (int): Maximum number of profiles to return
+        cursor (str): Opaque cursor from the previous page (optional)
+        
+    Returns:
+        tuple: (list of profiles, cursor for the next page or None); see
+            get_reporter_profile
+    """
+    try:
+        with _store_lock:
+            return _get_store().index('profiles').page(sort, limit, cursor)
+    except Exception as e:
+        print(f"Error getting reporter profiles: {e}")
+        return [], None
+
+def get_reporter_counts(active_days=30):
+    """
+    Count reporters from the maintained profiles
+    
+    Args:
+        active_days (int): Window for 'active_reporters'
+        
+    Returns:
+        dict: 'reporters', 'repeat_reporters' (more than one issue) and
+            'active_reporters' (reported within the window)
+    """
+    try:
+        with _store_lock:
+            profiles = _get_store().index('profiles')
+            since = (datetime.now() - timedelta(days=active_days)).isoformat()
+            return {
+                'reporters': len(profiles.profiles),
+                'repeat_reporters': profiles.repeat_reporters,
+                'active_reporters': profiles.active_reporters(since)
+            }
+    except Exception as e:
+        print(f"Error counting reporters: {e}")
+        return {'reporters': 0, 'repeat_reporters': 0, 'active_reporters': 0}
+
 def get_issues_by_department(department):
     """
     Get all issues assigned to a specific department
     
+    The department's bitmap selects the issues and the timestamp index
+    orders them, so no issue outside the department is read.
+    
     Args:
         department (str): Department name
         
     Returns:
-        list: List of issues for this department
+        list: List of issues for this department, newest first
     """
     try:
-        issues = load_issues()
-        dept_issues = [issue for issue in issues if issue.get('department') == department]
-        return sorted(dept_issues, key=lambda x: x.get('timestamp', ''), reverse=True)
+        backend = _sql_backend()
+        if backend:
+            return backend.get_issues_by_department(department)
+        
+        filters = {'department': [department]}
+        with _store_lock:
+            store = _get_store()
+            count = int(np.count_nonzero(store.index('facets').mask(filters)))
+            return issue_query.query(store, filters, 'newest', count)[0]
     except Exception as e:
         print(f"Error getting issues by department: {e}")
         return []
@@ -158,120 +1164,303 @@ def get_issue_statistics():
     """
     Get comprehensive statistics about all issues
     
+    Served from the counters maintained alongside the issue store, so the
+    cost does not depend on the number of issues.
+    
     Returns:
         dict: Statistics summary
     """
     try:
-        issues = load_issues()
+        with _store_lock:
+            return _get_store().index('stats').summary()
         
-        if not issues:
-            return {
-                'total_issues': 0,
-                'pending': 0,
-                'in_progress': 0,
-                'resolved': 0,
-                'resolution_rate': 0,
-                'departments': {},
-                'priorities': {}
-            }
+    except Exception as e:
+        print(f"Error getting statistics: {e}")
+        return {}
+
+def get_daily_rollup(start=None, end=None):
+    """
+    Get the daily rollup of issue counts
+    
+    One row per (day, department, status, priority, routing_method) with
+    the number of issues, maintained incrementally on every write. Charts
+    should aggregate these rows instead of scanning the issues.
+    
+    Args:
+        start (date, datetime or str): Earliest report day (optional)
+        end (date, datetime or str): Exclusive latest report day; a date
+            includes that whole day (optional)
         
-        stats = {
-            'total_issues': len(issues),
-            'pending': len([i for i in issues if i.get('status') == 'Pending']),
-            'in_progress': len([i for i in issues if i.get('status') == 'In Progress']),
-            'resolved': len([i for i in issues if i.get('status') == 'Resolved']),
-            'departments': {},
-            'priorities': {}
-        }
+    Returns:
+        pandas.DataFrame: Rollup rows (read-only), see
+            utils.daily_rollup.DailyRollup.frame
+    """
+    global _rollup_frame, _rollup_version
+    
+    try:
+        with _store_lock:
+            store = _get_store()
+            version = (id(store), _store_version)
+            if _rollup_frame is None or _rollup_version != version:
+                _rollup_frame = store.index('rollup').frame()
+                _rollup_version = version
+            frame = _rollup_frame
         
-        # Calculate resolution rate
-        stats['resolution_rate'] = (stats['resolved'] / stats['total_issues'] * 100) if stats['total_issues'] > 0 else 0
-        
-        # Department statistics
-        for issue in issues:
-            dept = issue.get('department', 'Unassigned')
-            if dept not in stats['departments']:
-                stats['departments'][dept] = {
-                    'total': 0,
-                    'pending': 0,
-                    'in_progress': 0,
-                    'resolved': 0
-                }
-            
-            stats['departments'][dept]['total'] += 1
-            status = issue.get('status', 'Pending').lower().replace(' ', '_')
-            if status in stats['departments'][dept]:
-                stats['departments'][dept][status] += 1
+        start = issue_query.timestamp_bound(start)
+        end = issue_query.timestamp_bound(end, end=True)
+        if start is not None:
+            frame = frame[frame['date'] >= pd.Timestamp(start[:10])]
+        if end is not None:
+            frame = frame[frame['date'] < pd.Timestamp(end)]
+        return frame
+    except Exception as e:
+        print(f"Error getting daily rollup: {e}")
+        return DailyRollup().frame()
+
+def rebuild_daily_rollup():
+    """
+    Back-fill the daily rollup from all stored issues
+    
+    Replaces the rollup of the shared store with one recounted from every
+    issue; the next compaction saves it with the snapshot.
+    
+    Returns:
+        int: Number of rollup rows
+    """
+    with _store_lock:
+        store = _get_store()
+        rollup = store.attach_index('rollup', DailyRollup())
+        _commit_to_store(get_data_version())
+        return len(rollup.counts)
+
+def get_response_times(stage='acknowledge'):
+    """
+    Summarize response times from the maintained quantile sketches
+    
+    The cost depends on the number of departments and priorities, not on
+    the number of issues.
+    
+    Args:
+        stage (str): 'acknowledge' (submission to first status change) or
+            'resolve' (submission to resolution)
         
-        # Priority statistics
-        for issue in issues:
-            priority = issue.get('priority', 'Medium')
-            stats['priorities'][priority] = stats['priorities'].get(priority, 0) + 1
+    Returns:
+        dict: 'overall' summary, 'departments' (department -> summary) and
+            'weekdays' (weekday name -> summary, by day of submission); see
+            utils.response_times.QuantileSketch.summary
+    """
+    try:
+        with _store_lock:
+            index = _get_store().index('response_times')
+            overall = index.sketch(stage).summary()
+            departments = {department: sketch.summary()
+                           for department, sketch in index.by_department(stage).items()}
+            weekdays = {day: sketch.summary() for day, sketch in zip(WEEKDAYS, index.by_weekday(stage))}
+        return {'overall': overall, 'departments': departments, 'weekdays': weekdays}
+    except Exception as e:
+        print(f"Error getting response times: {e}")
+        return {'overall': {'count': 0}, 'departments': {}, 'weekdays': {}}
+
+def get_resolution_estimate(department, priority):
+    """
+    Estimate how long resolving a new issue will take
+    
+    Uses the resolution times of the same department and priority, or of
+    the department as a whole when the pair has too few resolved issues.
+    
+    Args:
+        department (str): Department name
+        priority (str): Priority level
         
-        return stats
+    Returns:
+        tuple: (median hours, 90th percentile hours), or None if there are
+            not enough resolved issues to estimate from
+    """
+    try:
+        with _store_lock:
+            index = _get_store().index('response_times')
+            for sketch in (index.sketch('resolve', department, priority), index.sketch('resolve', department)):
+                if sketch.count >= MIN_SAMPLES:
+                    return sketch.quantile(0.5), sketch.quantile(0.9)
+        return None
+    except Exception as e:
+        print(f"Error estimating resolution time: {e}")
+        return None
+
+def get_reporter_statistics(active_days=30, top=20):
+    """
+    Get approximate reporter counts from the maintained sketches
+    
+    Distinct counts are HyperLogLog estimates (about 1.6% error) and the
+    frequent reporters come from a top-K sketch, so the cost does not
+    depend on the number of issues or citizens.
+    
+    Args:
+        active_days (int): Window for 'active_reporters' and
+            'daily_reporters'
+        top (int): Number of frequent reporters to return
         
+    Returns:
+        dict: 'unique_reporters', 'repeat_reporters', 'active_reporters',
+            'daily_reporters' (day -> count), 'departments' and 'areas'
+            (value -> distinct reporters) and 'top_reporters' (list of
+            dicts with phone, name, issues and error)
+    """
+    try:
+        with _store_lock:
+            sketches = _get_store().index('reporters')
+            return {
+                'unique_reporters': sketches.reporters.count(),
+                'repeat_reporters': sketches.repeat_reporters.count(),
+                'active_reporters': sketches.active_reporters(active_days),
+                'daily_reporters': sketches.daily_reporters(active_days),
+                'departments': {department: sketch.count() for department, sketch in sketches.departments.items()},
+                'areas': {area: sketch.count() for area, sketch in sketches.areas.items()},
+                'top_reporters': [{'phone': phone, 'name': name, 'issues': count, 'error': error}
+                                  for phone, count, error, name in sketches.top_reporters.top(top)]
+            }
     except Exception as e:
-        print(f"Error getting statistics: {e}")
+        print(f"Error getting reporter statistics: {e}")
         return {}
 
-def export_issues_to_csv(filename=None, filters=None):
+def get_hotspots(limit=10):
+    """
+    Get the areas with the most issues from the hotspot top-K sketch
+    
+    Args:
+        limit (int): Number of areas to return
+        
+    Returns:
+        list: (area, issue count) tuples, most issues first
+    """
+    try:
+        with _store_lock:
+            return [(area, count) for area, count, error, label in _get_store().index('reporters').hotspots.top(limit)]
+    except Exception as e:
+        print(f"Error getting hotspots: {e}")
+        return []
+
+def get_analytics_frame():
+    """
+    Get the columnar analytics frame of all issues
+    
+    The analytics index is attached to the shared store on first use and
+    maintained incrementally afterwards; the frame is rebuilt from its
+    arrays at most once per data version and shared by all sessions.
+    
+    Returns:
+        pandas.DataFrame: Analytics frame (read-only), see
+            utils.analytics.AnalyticsIndex.frame
+    """
+    global _analytics_frame, _analytics_version
+    
+    try:
+        with _store_lock:
+            store = _get_store()
+            if 'analytics' not in store.indexes:
+                store.attach_index('analytics', AnalyticsIndex())
+            version = (id(store), _store_version)
+            if _analytics_frame is None or _analytics_version != version:
+                _analytics_frame = store.index('analytics').frame()
+                _analytics_version = version
+            return _analytics_frame
+    except Exception as e:
+        print(f"Error building analytics frame: {e}")
+        return AnalyticsIndex().frame()
+
+def _export_filters(filters):
+    """Accept single values as well as lists in export filters"""
+    return {field: [value] if isinstance(value, str) else value
+            for field, value in (filters or {}).items()}
+
+def iter_issues(filters=None, chunk_size=csv_export.CHUNK_ROWS):
+    """
+    Iterate over issues matching facet filters without copying the data set
+    
+    Matching issues are looked up one chunk at a time, so the store lock is
+    never held for the whole iteration.
+    
+    Args:
+        filters (dict): Field -> value or list of values for status,
+            department and priority (optional)
+        chunk_size (int): Issues looked up per lock acquisition
+        
+    Yields:
+        dict: Matching issues (shared, read-only)
+    """
+    filters = _export_filters(filters)
+    backend = _sql_backend()
+    if backend:
+        yield from backend.iter_issues(filters, chunk_size)
+        return
+    
+    with _store_lock:
+        store = _get_store()
+        mask = store.index('facets').mask(filters)
+    
+    for start in range(0, len(mask), chunk_size):
+        with _store_lock:
+            chunk = [store.issues[position]
+                     for position in np.flatnonzero(mask[start:start + chunk_size]) + start
+                     if position < len(store.issues)]
+        yield from chunk
+
+def stream_issues_csv(filters=None, columns=None, chunk_size=csv_export.CHUNK_ROWS):
+    """
+    Stream matching issues as CSV text chunks
+    
+    Args:
+        filters (dict): Filter criteria, see iter_issues (optional)
+        columns (list): Columns to export (default csv_export.EXPORT_COLUMNS)
+        chunk_size (int): Rows per chunk
+        
+    Yields:
+        str: CSV text, header first
+    """
+    return csv_export.csv_chunks(iter_issues(filters, chunk_size), columns, chunk_size)
+
+def export_issues_to_csv(filename=None, filters=None, columns=None):
     """
     Export issues to CSV format
     
+    Rows are streamed in chunks, so writing to a file needs memory for one
+    chunk only. Without a filename the whole CSV text is returned; use
+    stream_issues_csv for large exports instead.
+    
     Args:
         filename (str): Output filename (optional)
         filters (dict): Filter criteria (optional)
+        columns (list): Columns to export (optional)
         
     Returns:
         str: CSV content or filename if saved
     """
     try:
-        issues = load_issues()
-        
-        if not issues:
-            return "No issues to export"
-        
-        # Apply filters if provided
-        if filters:
-            filtered_issues = []
-            for issue in issues:
-                include = True
-                
-                if 'status' in filters and issue.get('status') != filters['status']:
-                    include = False
-                if 'department' in filters and issue.get('department') != filters['department']:
-                    include = False
-                if 'priority' in filters and issue.get('priority') != filters['priority']:
-                    include = False
-                
-                if include:
-                    filtered_issues.append(issue)
-            
-            issues = filtered_issues
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(issues)
-        
-        # Remove sensitive/binary data
-        columns_to_remove = ['image_data', 'admin_notes']
-        for col in columns_to_remove:
-            if col in df.columns:
-                df = df.drop(columns=[col])
-        
-        # Generate CSV
+        chunks = stream_issues_csv(filters, columns)
         if filename:
-            df.to_csv(filename, index=False)
-            return filename
-        else:
-            return df.to_csv(index=False)
+            return csv_export.write_csv(chunks, filename)
+        return ''.join(chunks)
             
     except Exception as e:
         print(f"Error exporting to CSV: {e}")
         return None
 
+def _is_expired(issue, cutoff_date):
+    """Check whether a Resolved issue is older than the retention cutoff"""
+    try:
+        return (issue.get('status') == 'Resolved' and
+                datetime.fromisoformat(issue.get('timestamp', '')) <= cutoff_date)
+    except (TypeError, ValueError):
+        # Keep issues with invalid dates
+        return False
+
 def cleanup_old_data(days_threshold=90):
     """
-    Clean up resolved issues older than threshold
+    Archive resolved issues older than threshold
+    
+    Whole month partitions before the cutoff month have their resolved
+    segment moved to data/archive in one rename; only the cutoff month
+    itself is checked record by record.
     
     Args:
         days_threshold (int): Number of days to keep resolved issues
@@ -279,94 +1468,208 @@ def cleanup_old_data(days_threshold=90):
     Returns:
         int: Number of issues cleaned up
     """
+    global _generation, _store
+    
     try:
-        issues = load_issues()
-        
-        if not issues:
-            return 0
+        cutoff_date = datetime.now() - timedelta(days=days_threshold)
+        cutoff_month = cutoff_date.strftime('%Y-%m')
         
-        cutoff_date = datetime.now() - pd.Timedelta(days=days_threshold)
-        initial_count = len(issues)
+        with _store_lock:
+            backend = _sql_backend()
+            if backend:
+                cleaned_count = backend.delete_resolved_before(cutoff_date.isoformat())
+                _break_backup_chain()
+                _store = None
+                _commit_to_store(None)
+                print(f"Cleaned up {cleaned_count} old resolved issues")
+                return cleaned_count
+            
+            # Abandon any background compaction and fold the log here, so the
+            # segments reflect every status change made so far
+            _generation += 1
+            compact_issues()
+            if partitions.read_manifest() is None:
+                _write_snapshot(_read_snapshot())
+            manifest = partitions.read_manifest()
+            
+            # Counters for the remaining issues, when the live store is current
+            counters = None
+            if _store is not None and _store_version == get_data_version():
+                counters = {name: counter_class.from_dict(_store.index(name).to_dict())
+                            for name, counter_class in COUNTER_INDEXES.items()}
+                for issue in _expired_issues(_store, cutoff_date, cutoff_month):
+                    for counter in counters.values():
+                        counter.on_remove(None, issue, None)
+            
+            cleaned_count = 0
+            for key in list(manifest['segments']):
+                if key == partitions.UNDATED or key > cutoff_month:
+                    continue
+                if 'resolved' not in manifest['segments'][key]:
+                    continue
+                if key < cutoff_month:
+                    cleaned_count += partitions.archive_segment(manifest, key, 'resolved')
+                else:
+                    cleaned_count += partitions.archive_segment(
+                        manifest, key, 'resolved',
+                        keep=lambda issue: not _is_expired(issue, cutoff_date))
+            
+            if cleaned_count:
+                partitions.save_manifest(manifest)
+                _break_backup_chain()
+                if counters is not None:
+                    _write_counters(counters)
+                _store = None
+                _commit_to_store(None)
         
-        # Keep only recent issues or unresolved issues
-        filtered_issues = []
-        for issue in issues:
-            try:
-                issue_date = datetime.fromisoformat(issue.get('timestamp', ''))
-                
-                # Keep if not resolved or if recent
-                if (issue.get('status') != 'Resolved' or 
-                    issue_date > cutoff_date):
-                    filtered_issues.append(issue)
-                    
-            except:
-                # Keep issues with invalid dates
-                filtered_issues.append(issue)
-        
-        # Save cleaned data
-        with open('data/issues.json', 'w') as f:
-            json.dump(filtered_issues, f, indent=2)
-        
-        cleaned_count = initial_count - len(filtered_issues)
         print(f"Cleaned up {cleaned_count} old resolved issues")
-        
         return cleaned_count
         
     except Exception as e:
         print(f"Error cleaning up data: {e}")
         return 0
 
-def backup_data():
+def _expired_issues(store, cutoff_date, cutoff_month):
     """
-    Create a backup of current data
+    Find the issues cleanup_old_data archives, using the store indexes
+    
+    Only issues timestamped before the end of the cutoff month are visited.
+    """
+    order = store.index('timestamp')
+    resolved = store.index('facets').mask({'status': ['Resolved']})
+    end = bisect_left(order.keys, (f"{cutoff_month}\uffff",))
+    positions = np.array(order.positions[:end], dtype=np.int64)
+    for position in positions[resolved[positions]]:
+        issue = store.issues[position]
+        key = partitions.partition_key(issue)
+        if key == partitions.UNDATED or key > cutoff_month:
+            continue
+        if key < cutoff_month or _is_expired(issue, cutoff_date):
+            yield issue
+
+def _changes_since(seq):
+    """
+    Collect change records newer than a sequence number
+    
+    Reads the backup journal and both log segments; must be called with the
+    store lock held so compaction cannot move segments meanwhile.
     
+    Returns:
+        list: Change records in sequence order
+    """
+    paths = [path for first, last, path in backup_store.journal_segments() if last > seq]
+    paths.extend([ISSUES_LOG_COMPACTING, ISSUES_LOG])
+    
+    records = {}
+    for path in paths:
+        for record in _read_log(path):
+            if record.get('seq', 0) > seq:
+                records[record['seq']] = record
+    return [records[key] for key in sorted(records)]
+
+def backup_data(full=False):
+    """
+    Create an incremental backup of current data
+    
+    Writes a compressed delta of the changes made since the previous
+    backup, or a compressed base snapshot of all issues when there is no
+    usable previous backup, after BASE_INTERVAL deltas, or when `full` is
+    set. With the SQL backend every backup is a base snapshot.
+    
+    Args:
+        full (bool): Force a base snapshot
+        
     Returns:
         str: Backup filename
     """
     try:
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_filename = f"data/backup_issues_{timestamp}.json"
-        
-        # Load current data
-        issues = load_issues()
+        with _store_lock:
+            catalog = backup_store.read_catalog()
+            seq = _current_seq()
+            base = (full or _sql_backend() is not None or not backup_store.chain_active(catalog) or
+                    backup_store.deltas_since_base(catalog) >= backup_store.BASE_INTERVAL)
+            
+            if base:
+                issues = _get_store().issues
+                count = len(issues)
+                payload = json.dumps(list(issues), separators=(',', ':'), default=dict).encode()
+            else:
+                records = _changes_since(backup_store.last_seq(catalog))
+                if not records:
+                    print("No changes since the last backup")
+                    return catalog['backups'][-1]['file']
+                count = len(records)
+                payload = ''.join(json.dumps(record, separators=(',', ':')) + '\n'
+                                  for record in records).encode()
         
-        # Save backup
-        os.makedirs('data/backups', exist_ok=True)
-        backup_path = f"data/backups/issues_{timestamp}.json"
+        entry = backup_store.write_backup('base' if base else 'delta', payload, seq, count)
         
-        with open(backup_path, 'w') as f:
-            json.dump(issues, f, indent=2)
+        with _store_lock:
+            catalog = backup_store.read_catalog()
+            catalog['backups'].append(entry)
+            catalog['needs_base'] = False
+            backup_store.save_catalog(catalog)
+            backup_store.prune_journal(seq)
         
-        print(f"Data backed up to {backup_path}")
-        return backup_path
+        print(f"Data backed up to {entry['file']} ({entry['kind']}, {count} records)")
+        return entry['file']
         
     except Exception as e:
         print(f"Error creating backup: {e}")
         return None
 
-def restore_data(backup_filename):
+def list_backups():
+    """
+    List the incremental backups, oldest first
+    
+    Returns:
+        list: Catalog entries with kind, file, seq, created, records, bytes
+    """
+    try:
+        return backup_store.read_catalog()['backups']
+    except Exception as e:
+        print(f"Error listing backups: {e}")
+        return []
+
+def restore_data(backup_filename=None, until=None):
     """
     Restore data from backup
     
+    Incremental backups are rebuilt from their base snapshot plus the
+    deltas up to the requested point. A plain JSON backup file from
+    earlier versions is restored as is.
+    
     Args:
-        backup_filename (str): Backup file to restore from
+        backup_filename (str): Backup file to restore the state of
+            (optional, defaults to the latest backup)
+        until (datetime or str): Restore the state as of this time
+            instead (optional)
         
     Returns:
         bool: Success status
     """
     try:
-        if not os.path.exists(backup_filename):
-            print(f"Backup file not found: {backup_filename}")
-            return False
-        
-        with open(backup_filename, 'r') as f:
-            backup_data = json.load(f)
+        if backup_filename and backup_filename.endswith('.json'):
+            if not os.path.exists(backup_filename):
+                print(f"Backup file not found: {backup_filename}")
+                return False
+            
+            with open(backup_filename, 'r') as f:
+                backup_data = json.load(f)
+        else:
+            until = issue_query.timestamp_bound(until)
+            base, deltas = backup_store.resolve_chain(backup_store.read_catalog(), backup_filename, until)
+            store = IssueStore(backup_store.read_backup(base))
+            for delta in deltas:
+                for record in backup_store.read_backup(delta):
+                    if until is None or record.get('at', '') <= until:
+                        _apply_log_record(store, record)
+            backup_data = store.issues
         
         # Save as current data
-        with open('data/issues.json', 'w') as f:
-            json.dump(backup_data, f, indent=2)
+        _replace_all_issues(backup_data)
         
-        print(f"Data restored from {backup_filename}")
+        print(f"Data restored from {backup_filename or until or 'latest backup'}")
         return True
         
     except Exception as e:
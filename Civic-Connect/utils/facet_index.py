@@ -0,0 +1,148 @@
+import numpy as np
+
+# Low-cardinality fields indexed as bitmaps, with the value the pages show
+# when an issue has no value for the field
+FACET_FIELDS = {
+    'status': 'Pending',
+    'department': 'Unknown',
+    'priority': 'Medium',
+    # Background AI routing state; older issues without one count as routed
+    'routing_status': 'ready',
+}
+
+class FacetIndex:
+    """
+    Bitmap index over low-cardinality issue fields
+
+    Each (field, value) pair owns a boolean array with one slot per store
+    position. Multi-facet queries are answered with bitwise OR within a
+    field and AND across fields, and facet counts are popcounts of the
+    resulting masks. The index is kept up to date through the IssueStore
+    index hooks.
+    """
+
+    def __init__(self, fields=None, capacity=1024):
+        self.fields = dict(fields or FACET_FIELDS)
+        self.size = 0
+        self.capacity = capacity
+        self.bitmaps = {field: {} for field in self.fields}
+
+    def _value(self, field, value):
+        return value if value is not None else self.fields[field]
+
+    def _bitmap(self, field, value):
+        bitmaps = self.bitmaps[field]
+        if value not in bitmaps:
+            bitmaps[value] = np.zeros(self.capacity, dtype=bool)
+        return bitmaps[value]
+
+    def _grow(self, size):
+        if size <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < size:
+            capacity *= 2
+        for bitmaps in self.bitmaps.values():
+            for value, bitmap in bitmaps.items():
+                grown = np.zeros(capacity, dtype=bool)
+                grown[:self.capacity] = bitmap
+                bitmaps[value] = grown
+        self.capacity = capacity
+
+    def _set(self, position, issue, flag):
+        for field in self.fields:
+            self._bitmap(field, self._value(field, issue.get(field)))[position] = flag
+
+    def on_add(self, position, issue):
+        self._grow(position + 1)
+        self.size = max(self.size, position + 1)
+        self._set(position, issue, True)
+
+    def on_patch(self, position, issue, old_fields):
+        for field in self.fields:
+            if field not in old_fields:
+                continue
+            old_value = self._value(field, old_fields[field])
+            new_value = self._value(field, issue.get(field))
+            if old_value != new_value:
+                self._bitmap(field, old_value)[position] = False
+                self._bitmap(field, new_value)[position] = True
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        self._set(position, removed_issue, False)
+        if moved_issue is not None:
+            self._set(self.size - 1, moved_issue, False)
+            self._set(position, moved_issue, True)
+        self.size -= 1
+
+    def values(self, field):
+        """
+        Get the values of a field that occur in at least one issue
+
+        Args:
+            field (str): Facet field name
+
+        Returns:
+            list: Sorted field values
+        """
+        return sorted(value for value, bitmap in self.bitmaps[field].items()
+                      if bitmap[:self.size].any())
+
+    def mask(self, filters=None, exclude=None):
+        """
+        Build the selection mask for a set of facet filters
+
+        Args:
+            filters (dict): Field -> allowed values; a missing field or a
+                value of None means no restriction on that field
+            exclude (str): Field to leave out of the selection (optional)
+
+        Returns:
+            numpy.ndarray: Boolean mask of length `size`
+        """
+        selected = np.ones(self.size, dtype=bool)
+        for field, allowed in (filters or {}).items():
+            if allowed is None or field == exclude or field not in self.fields:
+                continue
+            field_mask = np.zeros(self.size, dtype=bool)
+            for value in allowed:
+                bitmap = self.bitmaps[field].get(value)
+                if bitmap is not None:
+                    field_mask |= bitmap[:self.size]
+            selected &= field_mask
+        return selected
+
+    def positions(self, filters=None):
+        """
+        Get the store positions of issues matching the filters
+
+        Args:
+            filters (dict): Field -> allowed values
+
+        Returns:
+            numpy.ndarray: Matching positions in ascending order
+        """
+        return np.flatnonzero(self.mask(filters))
+
+    def facet_counts(self, filters=None):
+        """
+        Count issues per value of every facet field
+
+        Counts for a field are taken under the filters of all *other*
+        fields, so a widget shows how many issues each option would add.
+
+        Args:
+            filters (dict): Field -> allowed values
+
+        Returns:
+            dict: Field -> {value: count}
+        """
+        counts = {}
+        for field in self.fields:
+            field_mask = self.mask(filters, exclude=field)
+            value_counts = {
+                value: int(np.count_nonzero(bitmap[:self.size] & field_mask))
+                for value, bitmap in self.bitmaps[field].items()
+            }
+            counts[field] = {value: count for value, count in value_counts.items() if count}
+        return counts
@@ -0,0 +1,69 @@
+import io
+import threading
+from collections import OrderedDict
+from PIL import Image
+from utils.blob_store import get_issue_image_bytes
+
+# Upper bound on the decoded pixel data kept in memory across all sessions
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+def _cache_key(issue, thumbnail):
+    """Key a decoded image by issue id and the content it was decoded from"""
+    if thumbnail and issue.get('thumbnail_ref'):
+        content = issue['thumbnail_ref']
+    elif issue.get('image_ref'):
+        content = issue['image_ref']
+    else:
+        content = 'inline'
+    return (issue.get('id'), content)
+
+def _image_size(image):
+    return image.width * image.height * len(image.getbands())
+
+def get_issue_image(issue, thumbnail=True):
+    """
+    Get the decoded image for an issue, using a shared LRU cache
+
+    Args:
+        issue (dict): Issue record
+        thumbnail (bool): Use the small thumbnail when one exists
+
+    Returns:
+        PIL.Image.Image: Decoded image, or None if the issue has no image
+    """
+    global _cache_bytes
+
+    key = _cache_key(issue, thumbnail)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    image_bytes = get_issue_image_bytes(issue, thumbnail=thumbnail)
+    if not image_bytes:
+        return None
+
+    image = Image.open(io.BytesIO(image_bytes))
+    image.load()
+    size = _image_size(image)
+
+    with _cache_lock:
+        if key not in _cache and size <= MAX_CACHE_BYTES:
+            _cache[key] = image
+            _cache_bytes += size
+            while _cache_bytes > MAX_CACHE_BYTES:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= _image_size(evicted)
+    return image
+
+def clear_image_cache():
+    """Drop all cached decoded images"""
+    global _cache_bytes
+
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
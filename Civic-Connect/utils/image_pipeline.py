@@ -0,0 +1,118 @@
+import base64
+import io
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+from utils.blob_store import blob_ref, put_blob
+
+# Longest side, in pixels, of the stored full image and of its thumbnail
+MAX_IMAGE_SIZE = 1600
+THUMBNAIL_SIZE = 320
+# Longest side of the copy sent to the AI for image analysis
+ANALYSIS_IMAGE_SIZE = 512
+
+JPEG_QUALITY = 82
+THUMBNAIL_QUALITY = 70
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-ingest")
+
+def _encode_jpeg(image, max_size, quality):
+    """Downscale a copy of an image and encode it as an optimized JPEG"""
+    resized = image.copy()
+    resized.thumbnail((max_size, max_size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    # No exif/icc arguments are passed, so camera metadata (GPS, device) is dropped
+    resized.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+def _open_image(image_bytes):
+    """Open uploaded bytes as an upright RGB image"""
+    image = Image.open(io.BytesIO(image_bytes))
+    image = ImageOps.exif_transpose(image)
+    return image.convert('RGB')
+
+def process_image(image_bytes):
+    """
+    Convert an uploaded photo into a stored full image and thumbnail
+
+    Args:
+        image_bytes (bytes): Uploaded file content
+
+    Returns:
+        dict: Issue fields image_ref, thumbnail_ref, image_width, image_height
+    """
+    image = _open_image(image_bytes)
+    full = _encode_jpeg(image, MAX_IMAGE_SIZE, JPEG_QUALITY)
+    thumbnail = _encode_jpeg(image, THUMBNAIL_SIZE, THUMBNAIL_QUALITY)
+
+    width, height = image.size
+    scale = min(1.0, MAX_IMAGE_SIZE / max(width, height))
+    return {
+        'image_ref': put_blob(full),
+        'thumbnail_ref': put_blob(thumbnail),
+        'image_width': round(width * scale),
+        'image_height': round(height * scale)
+    }
+
+def stored_full_image(image_bytes):
+    """
+    Encode an upload as the full image process_image stores for it
+
+    Args:
+        image_bytes (bytes): Uploaded file content
+
+    Returns:
+        tuple: (JPEG bytes, their blob reference, i.e. the issue's
+            image_ref once the upload is ingested)
+    """
+    full = _encode_jpeg(_open_image(image_bytes), MAX_IMAGE_SIZE, JPEG_QUALITY)
+    return full, blob_ref(full)
+
+def encode_for_analysis(image_bytes, stored=False):
+    """
+    Get a small base64 JPEG of an image for AI image analysis
+
+    The copy is always made from the stored full image, so an upload and
+    the image later read back from the blob store give the same bytes, and
+    with them the same categorization cache key.
+
+    Args:
+        image_bytes (bytes): Uploaded file content, or the stored full image
+        stored (bool): image_bytes is the stored full image (image_ref)
+
+    Returns:
+        str: Base64 encoded JPEG
+    """
+    if not stored:
+        image_bytes, _ = stored_full_image(image_bytes)
+    image = _open_image(image_bytes)
+    return base64.b64encode(_encode_jpeg(image, ANALYSIS_IMAGE_SIZE, JPEG_QUALITY)).decode()
+
+def _ingest(issue_id, image_bytes):
+    """Process an upload and attach the stored images to its issue"""
+    from utils.data_manager import patch_issue
+
+    try:
+        fields = process_image(image_bytes)
+        fields['image_status'] = 'ready'
+    except Exception as e:
+        print(f"Image ingest failed for issue {issue_id}: {e}")
+        fields = {'image_status': 'failed'}
+
+    patch_issue(issue_id, fields)
+    return fields
+
+def submit_image_ingest(issue_id, image_bytes):
+    """
+    Process an uploaded image in the background
+
+    The issue should already be saved; it is patched with the image
+    references once processing finishes.
+
+    Args:
+        issue_id (str): ID of the issue the image belongs to
+        image_bytes (bytes): Uploaded file content
+
+    Returns:
+        Future: Resolves to the fields written to the issue
+    """
+    return _executor.submit(_ingest, issue_id, image_bytes)
@@ -0,0 +1,201 @@
+import base64
+import json
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+import numpy as np
+
+PRIORITY_RANK = {"High": 3, "Medium": 2, "Low": 1}
+STATUS_URGENCY = {"Pending": 3, "In Progress": 2, "Resolved": 1, "Closed": 0}
+
+# Sort orders understood by query(). Each one is a sequence of groups
+# (built from facet bitmaps) scanned in timestamp order.
+SORT_ORDERS = ['newest', 'oldest', 'priority', 'department', 'urgency']
+
+# Number of index entries tested per step while filling a page
+SCAN_CHUNK = 1024
+
+def encode_cursor(sort, group, entry):
+    """Encode a resume point as an opaque URL-safe string"""
+    payload = json.dumps({'s': sort, 'g': group, 'k': list(entry)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor"""
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return payload['s'], payload['g'], tuple(payload['k'])
+
+def timestamp_bound(value, end=False):
+    """
+    Convert a date range bound to an ISO timestamp string
+
+    A plain date used as the end bound covers that whole day.
+
+    Args:
+        value (str, date or datetime): Bound, or None for unbounded
+        end (bool): Whether this is the (exclusive) upper bound
+
+    Returns:
+        str: ISO timestamp, or None
+    """
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        if end:
+            value += timedelta(days=1)
+        return datetime.combine(value, time.min).isoformat()
+    raise TypeError(f"Unsupported date range bound: {value!r}")
+
+def range_mask(order, size, start=None, end=None):
+    """
+    Build a selection mask of issues with start <= timestamp < end
+
+    Only the index entries inside the range are visited.
+
+    Args:
+        order (SortedIndex): Timestamp index
+        size (int): Mask length (number of stored issues)
+        start (str): Inclusive ISO lower bound (optional)
+        end (str): Exclusive ISO upper bound (optional)
+
+    Returns:
+        numpy.ndarray: Boolean mask over store positions, or None when
+            both bounds are None
+    """
+    if start is None and end is None:
+        return None
+    lo = bisect_left(order.keys, (start,)) if start is not None else 0
+    hi = bisect_left(order.keys, (end,)) if end is not None else len(order.keys)
+    mask = np.zeros(size, dtype=bool)
+    if hi > lo:
+        mask[np.array(order.positions[lo:hi], dtype=np.int64)] = True
+    return mask
+
+def _sort_groups(facets, sort, base_mask):
+    """
+    Split the filtered selection into ordered groups for a sort order
+
+    Returns:
+        list: (group_label, mask, newest_first) tuples in output order
+    """
+    if sort == 'oldest':
+        return [(None, base_mask, False)]
+    if sort == 'priority':
+        values = sorted(facets.values('priority'), key=lambda p: -PRIORITY_RANK.get(p, 0))
+        return [(p, base_mask & facets.mask({'priority': [p]}), True) for p in values]
+    if sort == 'department':
+        return [(d, base_mask & facets.mask({'department': [d]}), True)
+                for d in facets.values('department')]
+    if sort == 'urgency':
+        scores = {}
+        for priority in facets.values('priority'):
+            for status in facets.values('status'):
+                score = PRIORITY_RANK.get(priority, 2) + STATUS_URGENCY.get(status, 3)
+                combo = facets.mask({'priority': [priority], 'status': [status]})
+                scores[score] = scores[score] | combo if score in scores else combo
+        return [(score, base_mask & scores[score], True) for score in sorted(scores, reverse=True)]
+    return [(None, base_mask, True)]
+
+def _group_key(sort, label):
+    """Sort key of a group label, ascending in the output order of _sort_groups"""
+    if sort == 'priority':
+        return (-PRIORITY_RANK.get(label, 0), label)
+    if sort == 'urgency':
+        return -label
+    return label
+
+def _scan(order, mask, start, newest_first, limit):
+    """
+    Collect up to `limit` index offsets whose positions pass `mask`
+
+    Args:
+        order (SortedIndex): Timestamp index
+        mask (numpy.ndarray): Selection mask over store positions
+        start (int): Index offset to start scanning from (inclusive)
+        newest_first (bool): Scan towards lower offsets
+
+    Returns:
+        list: Matching offsets into the index, in scan order
+    """
+    found = []
+    step = max(SCAN_CHUNK, limit * 4)
+    i = start
+    while len(found) < limit:
+        if newest_first:
+            if i < 0:
+                break
+            lo = max(0, i - step + 1)
+            chunk = np.array(order.positions[lo:i + 1], dtype=np.int64)[::-1]
+            hits = np.flatnonzero(mask[chunk])
+            found.extend(int(i - h) for h in hits[:limit - len(found)])
+            i = lo - 1
+        else:
+            if i >= len(order.positions):
+                break
+            chunk = np.array(order.positions[i:i + step], dtype=np.int64)
+            hits = np.flatnonzero(mask[chunk])
+            found.extend(int(i + h) for h in hits[:limit - len(found)])
+            i += step
+    return found
+
+def query(store, filters=None, sort='newest', limit=20, cursor=None, start=None, end=None):
+    """
+    Read one page of issues in the requested order
+
+    Args:
+        store (IssueStore): Store with 'facets' and 'timestamp' indexes
+        filters (dict): Facet filters, see FacetIndex.mask
+        sort (str): One of SORT_ORDERS
+        limit (int): Page size
+        cursor (str): Cursor returned for the previous page (optional)
+        start (str): Inclusive ISO timestamp lower bound (optional)
+        end (str): Exclusive ISO timestamp upper bound (optional)
+
+    Returns:
+        tuple: (list of issues, next cursor or None)
+    """
+    if sort not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {sort}")
+
+    facets = store.index('facets')
+    order = store.index('timestamp')
+    base_mask = facets.mask(filters)
+    in_range = range_mask(order, len(base_mask), start, end)
+    if in_range is not None:
+        base_mask &= in_range
+    groups = _sort_groups(facets, sort, base_mask)
+
+    resume_group, resume_entry = None, None
+    if cursor:
+        cursor_sort, resume_group, resume_entry = decode_cursor(cursor)
+        if cursor_sort != sort:
+            raise ValueError("Cursor does not belong to this sort order")
+
+    page = []
+    last = None
+    skipping = cursor is not None
+    for label, mask, newest_first in groups:
+        if skipping and label == resume_group:
+            skipping = False
+            start = order.bisect(resume_entry, reverse=newest_first)
+        elif skipping:
+            # The cursor's group may have emptied since the previous page;
+            # resume with the first group after it
+            if _group_key(sort, label) < _group_key(sort, resume_group):
+                continue
+            skipping = False
+            start = len(order.keys) - 1 if newest_first else 0
+        else:
+            start = len(order.keys) - 1 if newest_first else 0
+
+        for offset in _scan(order, mask, start, newest_first, limit - len(page)):
+            page.append(store.issues[order.positions[offset]])
+            last = (label, order.keys[offset])
+
+        if len(page) >= limit:
+            break
+
+    if len(page) < limit or last is None:
+        return page, None
+    return page, encode_cursor(sort, last[0], last[1])
@@ -0,0 +1,450 @@
+import json
+import math
+import os
+import sys
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+import numpy as np
+from utils.categorization_cache import normalize_text
+
+# Local first-stage department router: hashed word unigrams and bigrams of
+# the title and description, TF-IDF weighted and L2 normalized, scored by a
+# softmax regression trained in NumPy. Confident predictions are used as is;
+# the rest are escalated to the AI.
+MODEL_FILE = os.path.join('data', 'models', 'issue_router.npz')
+MODEL_FORMAT = 1
+
+# Hashed feature space
+N_FEATURES = 2 ** 18
+
+# Training needs at least this many labelled issues
+MIN_TRAINING_ISSUES = 200
+
+# Training sample weight by label source; issues without a trusted label
+# (keyword fallback, earlier local routing) are left out unless resolved
+LABEL_WEIGHTS = {
+    'reassigned': 3.0,
+    'Manual': 2.0,
+    'AI': 1.0,
+    'resolved': 1.0
+}
+
+# The confidence threshold is the lowest candidate whose held-out accuracy
+# reaches TARGET_ACCURACY
+TARGET_ACCURACY = 0.95
+THRESHOLD_CANDIDATES = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 0.97, 0.99]
+
+# One issue in HOLDOUT_MODULUS (by a hash of its ID) is held out to choose
+# the threshold and report accuracy
+HOLDOUT_MODULUS = 5
+
+# Softmax regression training
+EPOCHS = 150
+LEARNING_RATE = 0.1
+L2_PENALTY = 1e-5
+
+_loaded = None
+_loaded_mtime = None
+
+def _features(issue_context):
+    """Hashed n-gram counts of an issue as {feature: count}"""
+    words = normalize_text(f"{issue_context.get('title', '')} {issue_context.get('description', '')}").split()
+    grams = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return Counter(zlib.crc32(gram.encode()) % N_FEATURES for gram in grams)
+
+def _label(issue, departments):
+    """Get (department, sample weight) of an issue usable for training, or None"""
+    department = issue.get('department')
+    if department not in departments:
+        return None
+    if issue.get('reassignment_history'):
+        return department, LABEL_WEIGHTS['reassigned']
+    if issue.get('routing_method') in LABEL_WEIGHTS:
+        return department, LABEL_WEIGHTS[issue['routing_method']]
+    if issue.get('status') in ('Resolved', 'Closed'):
+        return department, LABEL_WEIGHTS['resolved']
+    return None
+
+def _is_holdout(issue):
+    return zlib.crc32(str(issue.get('id')).encode()) % HOLDOUT_MODULUS == 0
+
+class IssueRouter:
+    """
+    Softmax regression over hashed TF-IDF n-grams
+
+    Attributes:
+        departments (list): Class labels
+        weights (np.ndarray): N_FEATURES x classes weight matrix
+        bias (np.ndarray): Per-class bias
+        idf (np.ndarray): Inverse document frequency per hashed feature
+        threshold (float): Confidence at or above which a prediction is
+            used without the AI
+        info (dict): Training metadata and held-out metrics
+    """
+
+    def __init__(self, departments, weights, bias, idf, threshold=1.0, info=None):
+        self.departments = list(departments)
+        self.weights = weights
+        self.bias = bias
+        self.idf = idf
+        self.threshold = threshold
+        self.info = info or {}
+
+    def _vector(self, issue_context):
+        """TF-IDF feature indices and L2-normalized values of an issue"""
+        counts = _features(issue_context)
+        indices = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        values = np.fromiter((1.0 + math.log(count) for count in counts.values()), dtype=np.float64,
+                             count=len(counts)) * self.idf[indices]
+        norm = np.sqrt(values @ values)
+        return indices, values / norm if norm else values
+
+    def probabilities(self, issue_context):
+        """
+        Get the probability of each department for an issue
+
+        Args:
+            issue_context (dict): Contains title and description
+
+        Returns:
+            np.ndarray: One probability per entry of self.departments
+        """
+        indices, values = self._vector(issue_context)
+        scores = values @ self.weights[indices] + self.bias
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def predict(self, issue_context):
+        """
+        Get the most likely department for an issue
+
+        Args:
+            issue_context (dict): Contains title and description
+
+        Returns:
+            tuple: (department, confidence)
+        """
+        probabilities = self.probabilities(issue_context)
+        best = int(probabilities.argmax())
+        return self.departments[best], float(probabilities[best])
+
+    @classmethod
+    def fit(cls, contexts, labels, sample_weights, departments):
+        """
+        Train a router
+
+        Args:
+            contexts (list): Issue contexts with title and description
+            labels (list): Department of each context
+            sample_weights (list): Training weight of each context
+            departments (list): Class labels
+
+        Returns:
+            IssueRouter: Trained router (threshold 1.0; see calibrate())
+        """
+        classes = {department: index for index, department in enumerate(departments)}
+        rows, columns, counts = [], [], []
+        for row, issue_context in enumerate(contexts):
+            for feature, count in _features(issue_context).items():
+                rows.append(row)
+                columns.append(feature)
+                counts.append(count)
+        rows = np.array(rows, dtype=np.int64)
+        columns = np.array(columns, dtype=np.int64)
+        values = 1.0 + np.log(np.array(counts, dtype=np.float64))
+
+        # Smoothed IDF; features never seen in training keep weight zero
+        document_counts = np.bincount(columns, minlength=N_FEATURES)
+        idf = np.log((1 + len(contexts)) / (1 + document_counts)) + 1.0
+        values *= idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(contexts)))
+        values /= np.where(norms > 0, norms, 1.0)[rows]
+
+        # Train on the features that occur, then scatter into the full space
+        used, local_columns = np.unique(columns, return_inverse=True)
+        targets = np.zeros((len(contexts), len(departments)))
+        targets[np.arange(len(contexts)), [classes[label] for label in labels]] = 1.0
+        sample_weights = np.asarray(sample_weights, dtype=np.float64)
+        sample_weights = sample_weights / sample_weights.sum()
+
+        weights = np.zeros((len(used), len(departments)))
+        bias = np.zeros(len(departments))
+        parameters = [weights, bias]
+        moments = [np.zeros_like(weights), np.zeros_like(bias)]
+        squares = [np.zeros_like(weights), np.zeros_like(bias)]
+        for epoch in range(1, EPOCHS + 1):
+            scores = np.zeros((len(contexts), len(departments)))
+            for k in range(len(departments)):
+                scores[:, k] = np.bincount(rows, weights=values * weights[local_columns, k],
+                                           minlength=len(contexts))
+            scores += bias
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+            scores /= scores.sum(axis=1, keepdims=True)
+            errors = (scores - targets) * sample_weights[:, None]
+
+            weight_gradient = np.empty_like(weights)
+            for k in range(len(departments)):
+                weight_gradient[:, k] = np.bincount(local_columns, weights=values * errors[rows, k],
+                                                    minlength=len(used))
+            weight_gradient += L2_PENALTY * weights
+            gradients = [weight_gradient, errors.sum(axis=0)]
+
+            # Adam update
+            for parameter, gradient, moment, square in zip(parameters, gradients, moments, squares):
+                moment *= 0.9
+                moment += 0.1 * gradient
+                square *= 0.999
+                square += 0.001 * gradient ** 2
+                parameter -= (LEARNING_RATE * (moment / (1 - 0.9 ** epoch))
+                              / (np.sqrt(square / (1 - 0.999 ** epoch)) + 1e-8))
+
+        full_weights = np.zeros((N_FEATURES, len(departments)), dtype=np.float32)
+        full_weights[used] = weights
+        return cls(departments, full_weights, bias.astype(np.float32), idf.astype(np.float32))
+
+    def evaluate(self, contexts, labels):
+        """
+        Measure held-out accuracy, escalation rate and prediction latency
+
+        Args:
+            contexts (list): Issue contexts with title and description
+            labels (list): True department of each context
+
+        Returns:
+            dict: samples, accuracy (all predictions), thresholds (list of dicts
+                with threshold, coverage, accuracy of the covered issues
+                and escalation_rate), latency_us (median and p99 per
+                prediction)
+        """
+        predictions = []
+        latencies = []
+        for issue_context in contexts:
+            start = time.perf_counter()
+            predictions.append(self.predict(issue_context))
+            latencies.append(time.perf_counter() - start)
+        correct = np.array([department == label for (department, confidence), label in zip(predictions, labels)])
+        confidences = np.array([confidence for department, confidence in predictions])
+
+        thresholds = []
+        for threshold in THRESHOLD_CANDIDATES:
+            covered = confidences >= threshold
+            thresholds.append({
+                'threshold': threshold,
+                'coverage': float(covered.mean()) if len(covered) else 0.0,
+                'accuracy': float(correct[covered].mean()) if covered.any() else None,
+                'escalation_rate': float(1 - covered.mean()) if len(covered) else 1.0
+            })
+
+        latencies_us = np.array(latencies) * 1e6
+        return {
+            'samples': len(contexts),
+            'accuracy': float(correct.mean()) if len(correct) else None,
+            'thresholds': thresholds,
+            'latency_us': {
+                'median': float(np.median(latencies_us)) if len(latencies_us) else None,
+                'p99': float(np.percentile(latencies_us, 99)) if len(latencies_us) else None
+            }
+        }
+
+    def calibrate(self, evaluation):
+        """
+        Choose the confidence threshold from an evaluate() result
+
+        Args:
+            evaluation (dict): Held-out evaluation
+
+        Returns:
+            float: The threshold, also set on the router (1.0 when no
+                candidate reaches TARGET_ACCURACY, i.e. always escalate)
+        """
+        self.threshold = 1.0
+        for candidate in evaluation['thresholds']:
+            if candidate['accuracy'] is not None and candidate['accuracy'] >= TARGET_ACCURACY:
+                self.threshold = candidate['threshold']
+                break
+        return self.threshold
+
+    def save(self, path=MODEL_FILE):
+        """Write the router to a compressed .npz file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            format=np.array(MODEL_FORMAT),
+            departments=np.array(self.departments),
+            weights=self.weights,
+            bias=self.bias,
+            idf=self.idf,
+            threshold=np.array(self.threshold),
+            info=np.array(json.dumps(self.info))
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        """Read a router written by save(), or None if missing or outdated"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                if int(arrays['format']) != MODEL_FORMAT or arrays['weights'].shape[0] != N_FEATURES:
+                    return None
+                return cls(arrays['departments'].tolist(), arrays['weights'], arrays['bias'], arrays['idf'],
+                           float(arrays['threshold']), json.loads(str(arrays['info'])))
+        except Exception as e:
+            print(f"Error loading issue router: {e}")
+            return None
+
+def get_router():
+    """
+    Get the trained router, reloading it when the model file changes
+
+    Returns:
+        IssueRouter: The router, or None if none has been trained
+    """
+    global _loaded, _loaded_mtime
+
+    try:
+        mtime = os.stat(MODEL_FILE).st_mtime
+    except OSError:
+        return None
+    if mtime != _loaded_mtime:
+        _loaded = IssueRouter.load()
+        _loaded_mtime = mtime
+    return _loaded
+
+def classify_locally(issue_context):
+    """
+    Route an issue with the local router if it is confident enough
+
+    Args:
+        issue_context (dict): Contains title and description
+
+    Returns:
+        tuple: (department, confidence), or None when there is no trained
+            router or the issue needs the AI
+    """
+    from utils.ai_categorizer import DEPARTMENT_MAPPING
+
+    router = get_router()
+    if router is None:
+        return None
+    try:
+        department, confidence = router.predict(issue_context)
+    except Exception as e:
+        print(f"Local routing error: {e}")
+        return None
+    if confidence < router.threshold or department not in DEPARTMENT_MAPPING:
+        return None
+    return department, confidence
+
+def training_data(issues):
+    """
+    Select labelled issues for training
+
+    Args:
+        issues (list): Issue records
+
+    Returns:
+        tuple: (train, holdout) lists of (context, department, weight)
+    """
+    from utils.ai_categorizer import DEPARTMENT_MAPPING
+
+    train, holdout = [], []
+    for issue in issues:
+        label = _label(issue, DEPARTMENT_MAPPING)
+        if label is None:
+            continue
+        context = {'title': issue.get('title', ''), 'description': issue.get('description', '')}
+        (holdout if _is_holdout(issue) else train).append((context, label[0], label[1]))
+    return train, holdout
+
+def train_router(issues, save=True):
+    """
+    Train a router on historical issues and calibrate it on a holdout
+
+    The threshold is chosen on the held-out issues; the saved router is then
+    refitted on all labelled issues with that threshold.
+
+    Args:
+        issues (list): Issue records
+        save (bool): Write the router to MODEL_FILE
+
+    Returns:
+        IssueRouter: The trained router, or None if there are fewer than
+            MIN_TRAINING_ISSUES labelled issues or fewer than two
+            departments
+    """
+    from utils.ai_categorizer import DEPARTMENT_MAPPING
+
+    train, holdout = training_data(issues)
+    samples = train + holdout
+    departments = sorted({department for context, department, weight in samples})
+    if len(samples) < MIN_TRAINING_ISSUES or len(departments) < 2 or not holdout:
+        print(f"Not enough labelled issues to train the router "
+              f"({len(samples)} issues in {len(departments)} departments)")
+        return None
+    departments = [department for department in DEPARTMENT_MAPPING if department in departments]
+
+    router = IssueRouter.fit(*zip(*train), departments)
+    evaluation = router.evaluate([context for context, department, weight in holdout],
+                                 [department for context, department, weight in holdout])
+    threshold = router.calibrate(evaluation)
+
+    router = IssueRouter.fit(*zip(*samples), departments)
+    router.threshold = threshold
+    router.info = {
+        'trained_at': datetime.now().isoformat(),
+        'training_issues': len(samples),
+        'departments': departments,
+        'holdout': evaluation
+    }
+    if save:
+        router.save()
+    return router
+
+def format_report(router):
+    """
+    Describe a router's held-out accuracy, escalation rate and latency
+
+    Args:
+        router (IssueRouter): Router trained by train_router()
+
+    Returns:
+        str: Multi-line report
+    """
+    evaluation = router.info['holdout']
+    lines = [
+        f"Trained {router.info['trained_at']} on {router.info['training_issues']} issues "
+        f"({', '.join(router.info['departments'])})",
+        f"Held-out issues: {evaluation['samples']}; accuracy {evaluation['accuracy']:.1%}",
+        f"Latency per issue: median {evaluation['latency_us']['median']:.0f}us, "
+        f"p99 {evaluation['latency_us']['p99']:.0f}us",
+        "",
+        "threshold  routed locally  local accuracy  escalated to AI"
+    ]
+    for row in evaluation['thresholds']:
+        accuracy = f"{row['accuracy']:.1%}" if row['accuracy'] is not None else '-'
+        marker = '  <- in use' if row['threshold'] == router.threshold else ''
+        lines.append(f"{row['threshold']:>9.2f}  {row['coverage']:>14.1%}  {accuracy:>14}  "
+                     f"{row['escalation_rate']:>15.1%}{marker}")
+    if router.threshold >= 1.0:
+        lines.append(f"No threshold reaches {TARGET_ACCURACY:.0%} accuracy; every issue goes to the AI")
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    # Usage: python -m utils.issue_router retrain | report
+    if sys.argv[1:2] == ['retrain']:
+        from utils.data_manager import get_issues_view
+
+        router = train_router(get_issues_view())
+        if router is not None:
+            print(format_report(router))
+            print(f"Saved to {MODEL_FILE}")
+    elif sys.argv[1:2] == ['report']:
+        router = IssueRouter.load()
+        print(format_report(router) if router is not None else "No trained router; run retrain first")
+    else:
+        print("Usage: python -m utils.issue_router retrain | report")
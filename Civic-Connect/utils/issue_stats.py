@@ -0,0 +1,127 @@
+from collections import Counter
+
+# Fields counted by IssueStats, with the value used when an issue has none
+STATS_FIELDS = {
+    'status': 'Pending',
+    'department': 'Unassigned',
+    'priority': 'Medium',
+    'routing_method': 'Unknown',
+}
+
+# Status values reported as top-level totals by summary()
+SUMMARY_STATUSES = ['Pending', 'In Progress', 'Resolved']
+
+def _status_key(status):
+    return status.lower().replace(' ', '_')
+
+class IssueStats:
+    """
+    Running issue counts by status, department x status, priority and
+    routing method
+
+    Every save, patch and removal adjusts a handful of counters, so the
+    totals are always current without rescanning the issues. The index is
+    kept up to date through the IssueStore index hooks and can be saved and
+    restored with to_dict() / from_dict().
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.statuses = Counter()
+        self.department_statuses = Counter()
+        self.priorities = Counter()
+        self.routing_methods = Counter()
+
+    def _values(self, issue):
+        values = {}
+        for field, default in STATS_FIELDS.items():
+            value = issue.get(field)
+            values[field] = value if value is not None else default
+        return values
+
+    def _count(self, issue, delta):
+        values = self._values(issue)
+        self.total += delta
+        self.statuses[values['status']] += delta
+        self.department_statuses[(values['department'], values['status'])] += delta
+        self.priorities[values['priority']] += delta
+        self.routing_methods[values['routing_method']] += delta
+
+    def on_add(self, position, issue):
+        self._count(issue, 1)
+
+    def on_patch(self, position, issue, old_fields):
+        if not any(field in old_fields for field in STATS_FIELDS):
+            return
+        old_issue = dict(issue)
+        old_issue.update(old_fields)
+        if self._values(old_issue) != self._values(issue):
+            self._count(old_issue, -1)
+            self._count(issue, 1)
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        self._count(removed_issue, -1)
+
+    def summary(self):
+        """
+        Get the statistics summary returned by data_manager.get_issue_statistics
+
+        Returns:
+            dict: Totals, resolution rate and per-department, per-priority,
+                per-status and per-routing-method counts
+        """
+        stats = {'total_issues': self.total}
+        for status in SUMMARY_STATUSES:
+            stats[_status_key(status)] = self.statuses[status]
+        stats['resolution_rate'] = (stats['resolved'] / self.total * 100) if self.total > 0 else 0
+
+        departments = {}
+        for (department, status), count in self.department_statuses.items():
+            if count <= 0:
+                continue
+            dept_stats = departments.setdefault(department, {
+                'total': 0,
+                'pending': 0,
+                'in_progress': 0,
+                'resolved': 0
+            })
+            dept_stats['total'] += count
+            if _status_key(status) in dept_stats:
+                dept_stats[_status_key(status)] += count
+
+        stats['departments'] = departments
+        stats['priorities'] = {key: count for key, count in self.priorities.items() if count > 0}
+        stats['statuses'] = {key: count for key, count in self.statuses.items() if count > 0}
+        stats['routing_methods'] = {key: count for key, count in self.routing_methods.items() if count > 0}
+        return stats
+
+    def to_dict(self):
+        """Get the counters as a JSON-serializable dictionary"""
+        return {
+            'total': self.total,
+            'statuses': dict(self.statuses),
+            'department_statuses': [[department, status, count]
+                                    for (department, status), count in self.department_statuses.items()],
+            'priorities': dict(self.priorities),
+            'routing_methods': dict(self.routing_methods)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore counters saved with to_dict()
+
+        Args:
+            data (dict): Saved counters
+
+        Returns:
+            IssueStats: Index holding the saved counts
+        """
+        stats = cls()
+        stats.total = data['total']
+        stats.statuses.update(data['statuses'])
+        stats.department_statuses.update({(department, status): count
+                                          for department, status, count in data['department_statuses']})
+        stats.priorities.update(data['priorities'])
+        stats.routing_methods.update(data['routing_methods'])
+        return stats
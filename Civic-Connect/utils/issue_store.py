@@ -0,0 +1,137 @@
+from utils.issue_table import IssueTable
+
+class IssueStore:
+    """
+    In-memory issue set with an id -> position index
+
+    Records are kept in insertion order in `issues`, a compact IssueTable
+    whose items are read-only IssueRecord views; `positions` (the table's
+    id index) maps each issue id to its slot so lookups and single-record
+    patches are O(1).
+
+    Derived structures (facet bitmaps, counters, ...) can be attached by
+    name with attach_index() and looked up with index(). They are notified of every change through:
+
+        on_add(position, issue)
+        on_patch(position, issue, old_fields)
+        on_remove(position, removed_issue, moved_issue)
+
+    where moved_issue is the record that now occupies `position` (or None).
+    """
+
+    def __init__(self, issues=None):
+        self.indexes = {}
+        adopted = isinstance(issues, IssueTable)
+        # An encoded table (e.g. from the snapshot cache) is adopted as is
+        self.issues = issues if adopted else IssueTable()
+        self.issues.index_ids()
+        self.positions = self.issues.positions
+        if not adopted:
+            for issue in issues or []:
+                self.add(issue)
+
+    def __len__(self):
+        return len(self.issues)
+
+    def __contains__(self, issue_id):
+        return issue_id in self.positions
+
+    def attach_index(self, name, index, build=True):
+        """
+        Attach a derived index and build it from the current issues
+
+        Args:
+            name (str): Name to look the index up by
+            index: Object implementing on_add / on_patch / on_remove
+            build (bool): Feed the current issues to the index; pass False
+                for an index restored from a saved state of these issues
+
+        Returns:
+            The attached index
+        """
+        if build:
+            for position, issue in enumerate(self.issues):
+                index.on_add(position, issue)
+        self.indexes[name] = index
+        return index
+
+    def index(self, name):
+        """Get an attached index by name"""
+        return self.indexes[name]
+
+    def get(self, issue_id):
+        """
+        Get an issue by id
+
+        Args:
+            issue_id (str): Issue ID
+
+        Returns:
+            IssueRecord: View of the stored issue, or None if unknown
+        """
+        return self.issues.find(issue_id)
+
+    def add(self, issue):
+        """
+        Add an issue, replacing any existing record with the same id
+
+        Args:
+            issue (Mapping): Issue to store; it is encoded into the table
+        """
+        issue_id = issue.get('id')
+        if issue_id in self.positions:
+            position = self.positions[issue_id]
+            old_issue = self.issues.row(position)
+            old_fields = {key: old_issue.get(key) for key in set(old_issue) | set(issue)}
+            self.issues[position] = issue
+            for index in self.indexes.values():
+                index.on_patch(position, issue, old_fields)
+        else:
+            position = len(self.issues)
+            self.issues.append(issue)
+            for index in self.indexes.values():
+                index.on_add(position, issue)
+
+    def patch(self, issue_id, fields):
+        """
+        Update selected fields of one issue in place
+
+        Args:
+            issue_id (str): Issue ID
+            fields (dict): Field values to set
+
+        Returns:
+            IssueRecord: View of the updated issue, or None if unknown
+        """
+        position = self.positions.get(issue_id)
+        if position is None:
+            return None
+
+        issue = self.issues[position]
+        old_fields = {key: issue.get(key) for key in fields}
+        self.issues.patch(position, fields)
+        for index in self.indexes.values():
+            index.on_patch(position, issue, old_fields)
+        return issue
+
+    def remove(self, issue_id):
+        """
+        Remove an issue
+
+        The last record is moved into the freed slot so removal stays O(1);
+        insertion order is therefore not preserved across removals.
+
+        Args:
+            issue_id (str): Issue ID
+
+        Returns:
+            dict: The removed issue, or None if unknown
+        """
+        position = self.positions.get(issue_id)
+        if position is None:
+            return None
+
+        removed, moved = self.issues.remove(position)
+        for index in self.indexes.values():
+            index.on_remove(position, removed, moved)
+        return removed
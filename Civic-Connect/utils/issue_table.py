@@ -0,0 +1,705 @@
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from array import array
+from collections.abc import Mapping
+
+# Low-cardinality text fields, stored as 2-byte codes into a per-field value
+# table instead of one string object per issue
+CATEGORY_FIELDS = (
+    'department', 'manual_department', 'status', 'priority',
+    'routing_method', 'preferred_contact', 'image_status', 'routing_status'
+)
+
+# Numeric fields, stored as float64 arrays
+NUMBER_FIELDS = ('latitude', 'longitude', 'ai_confidence')
+
+# How a field's value is stored, recorded per field in a row's layout:
+#   'c' category code    'f' float    'i' int held as a float
+#   't' text in the heap 'j' JSON text in the heap (lists, dicts, ...)
+#   'z' None             'x' Python object in the row's extras
+#   'd' a text 'id' field, always first in the row's heap text
+_MAX_CODES = 2 ** 16
+_MAX_EXACT_INT = 2 ** 53
+
+# Text of a row is one UTF-8 blob of its fields joined by NUL; its place in
+# the heap is packed into one 64-bit word as (start << _SPAN_BITS) | length
+_SEPARATOR = '\x00'
+_SPAN_BITS = 24
+_MAX_BLOB = 2 ** _SPAN_BITS - 1
+
+_MISSING = object()
+
+# Slots of an IdIndex that hold no row
+_EMPTY = -1
+_DELETED = -2
+
+def _json_round_trips(value):
+    """Check that JSON text reproduces a value exactly"""
+    try:
+        return json.loads(json.dumps(value)) == value
+    except (TypeError, ValueError):
+        return False
+
+def _column(typecode, data):
+    """Adopt a saved column: an array as it is, bytes as a new array"""
+    return data if isinstance(data, array) else array(typecode, data)
+
+class IssueRecord(Mapping):
+    """
+    Read-only dictionary view of one issue in an IssueTable
+
+    Supports everything pages do with an issue dictionary (get, [], in,
+    iteration, keys/items, dict(record), comparison with dicts). The view
+    holds no values; it reads its issue's row on every access. If a
+    removal moved the issue to another row the view follows it (in a
+    table with an id index, see IssueTable.index_ids()), and once the
+    issue itself is removed every access raises LookupError. Use
+    to_dict() rather than dict(record) for a copy consistent with
+    concurrent writes.
+    """
+
+    __slots__ = ('_table', '_position', '_id', '_moves')
+
+    def __init__(self, table, position):
+        self._table = table
+        self._position = position
+        self._id = table._row_id(position)
+        self._moves = table.moves
+
+    def _locate(self):
+        """Get the issue's current row; call with the table lock held"""
+        table = self._table
+        position = self._position
+        if self._moves == table.moves:
+            return position
+        self._moves = table.moves
+        if position < len(table) and table._row_id(position) == self._id:
+            return position
+        positions = table.positions
+        position = positions.get(self._id) if positions is not None else None
+        if position is None:
+            raise LookupError(f"Issue {self._id} was removed from the table")
+        self._position = position
+        return position
+
+    def __getitem__(self, field):
+        with self._table.lock:
+            value = self._table._value(self._locate(), field, _MISSING)
+        if value is _MISSING:
+            raise KeyError(field)
+        return value
+
+    def get(self, field, default=None):
+        with self._table.lock:
+            return self._table._value(self._locate(), field, default)
+
+    def __contains__(self, field):
+        with self._table.lock:
+            return field in self._table._layout(self._locate())
+
+    def __iter__(self):
+        with self._table.lock:
+            return iter(self._table._layout(self._locate()))
+
+    def __len__(self):
+        with self._table.lock:
+            return len(self._table._layout(self._locate()))
+
+    def to_dict(self):
+        """Copy the issue into a new dictionary, all fields read at once"""
+        with self._table.lock:
+            return self._table._row(self._locate())
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+class IdIndex(Mapping):
+    """
+    Id -> row index of an IssueTable
+
+    An open-addressing hash table holding only row numbers, in an int32
+    array kept at most two thirds full. The id of a slot is read back from
+    its row, so the index keeps no id string or dictionary entry per
+    issue. Maintained by the table; read it like a dict.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._build([table._row_id(position) for position in range(len(table))])
+
+    def _build(self, ids):
+        """Fill a new, at most half full slot array from the ids of rows 0..n-1"""
+        size = 8
+        while size < len(ids) * 2:
+            size *= 2
+        slots = array('i', [_EMPTY]) * size
+        mask = size - 1
+        count = 0
+        for position, issue_id in enumerate(ids):
+            slot = hash(issue_id) & mask
+            while slots[slot] != _EMPTY and ids[slots[slot]] != issue_id:
+                slot = (slot + 1) & mask
+            if slots[slot] == _EMPTY:
+                count += 1
+            # A later row with the same id wins, as in a dict
+            slots[slot] = position
+        self.slots = slots
+        self.count = self.used = count
+
+    def _slot(self, issue_id):
+        """Find (slot of issue_id or -1, first slot free for it)"""
+        slots = self.slots
+        mask = len(slots) - 1
+        slot = hash(issue_id) & mask
+        free = -1
+        while True:
+            position = slots[slot]
+            if position == _EMPTY:
+                return -1, free if free >= 0 else slot
+            if position == _DELETED:
+                if free < 0:
+                    free = slot
+            elif self.table._row_id(position) == issue_id:
+                return slot, free
+            slot = (slot + 1) & mask
+
+    def get(self, issue_id, default=None):
+        with self.table.lock:
+            slot, _ = self._slot(issue_id)
+            return self.slots[slot] if slot >= 0 else default
+
+    def __getitem__(self, issue_id):
+        position = self.get(issue_id)
+        if position is None:
+            raise KeyError(issue_id)
+        return position
+
+    def __contains__(self, issue_id):
+        return self.get(issue_id) is not None
+
+    def __iter__(self):
+        with self.table.lock:
+            return iter([self.table._row_id(position) for position in self.slots if position >= 0])
+
+    def __len__(self):
+        return self.count
+
+    def set(self, issue_id, position):
+        """Map an id to a row, replacing its previous row if any"""
+        slot, free = self._slot(issue_id)
+        if slot >= 0:
+            self.slots[slot] = position
+            return
+        if self.slots[free] == _EMPTY:
+            self.used += 1
+        self.slots[free] = position
+        self.count += 1
+        if self.used * 3 > len(self.slots) * 2:
+            self._resize()
+
+    def discard(self, issue_id, position):
+        """Unmap an id if it maps to `position`"""
+        slot, _ = self._slot(issue_id)
+        if slot >= 0 and self.slots[slot] == position:
+            self.slots[slot] = _DELETED
+            self.count -= 1
+
+    def _resize(self):
+        """Rehash the live rows into a new slot array"""
+        rows = sorted(position for position in self.slots if position >= 0)
+        ids = [self.table._row_id(position) for position in rows]
+        self._build(ids)
+        # _build numbers the rows 0..n-1; map them back
+        self.slots = array('i', [rows[slot] if slot >= 0 else slot for slot in self.slots])
+
+class IssueTable:
+    """
+    Compact struct-of-arrays storage for the in-memory issue set
+
+    Issues are stored column by column instead of as one dictionary each:
+    category fields as codes, numeric fields in float arrays and all other
+    text of a row in one shared UTF-8 heap. Each row has a layout id naming
+    its fields in order and how each value is stored, so rows round-trip
+    exactly, including key order, None values and unusual types.
+
+    The table behaves like a list of issues: indexing returns IssueRecord
+    views, and append / assignment / pop take and return plain dicts.
+    A text id is kept first in its row's heap text; index_ids() maps the
+    ids to their rows in `positions`, an IdIndex.
+
+    A row is spread over several columns, so every write and every read of
+    a row holds `lock`; readers never see a half-written row while
+    background workers patch issues.
+    """
+
+    def __init__(self, issues=None):
+        self.lock = threading.RLock()
+        self.positions = None
+        # Bumped whenever a row may start holding another issue
+        self.moves = 0
+        self.layouts = array('I')
+        self.layout_slots = []
+        self.layout_ids = {}
+        self.codes = {field: array('H') for field in CATEGORY_FIELDS}
+        self.categories = {field: [] for field in CATEGORY_FIELDS}
+        self.category_codes = {field: {} for field in CATEGORY_FIELDS}
+        self.numbers = {field: array('d') for field in NUMBER_FIELDS}
+        # (bytearray, spans) swapped as one object when the heap is compacted
+        self.heap = (bytearray(), array('Q'))
+        self.garbage = 0
+        self.extras = {}
+        for issue in issues or []:
+            self.append(issue)
+
+    @classmethod
+    def from_columns(cls, meta, arrays):
+        """
+        Restore a table saved with to_columns()
+
+        The columns are adopted as they are; no row is re-encoded.
+
+        Args:
+            meta (dict): The 'meta' part of to_columns()
+            arrays (dict): The 'arrays' part, or each array as bytes
+
+        Returns:
+            IssueTable: The restored table
+
+        Raises:
+            ValueError: If the columns were saved with other category or
+                number fields
+        """
+        if meta['category_fields'] != list(CATEGORY_FIELDS) or meta['number_fields'] != list(NUMBER_FIELDS):
+            raise ValueError('issue table columns were saved with different fields')
+
+        table = cls()
+        for fields, kinds in meta['layouts']:
+            table._layout_id(tuple(fields), kinds)
+        for field, values in meta['categories'].items():
+            for value in values:
+                table._code(field, value)
+        table.layouts = _column('I', arrays['layouts'])
+        for field in CATEGORY_FIELDS:
+            table.codes[field] = _column('H', arrays[f'codes.{field}'])
+        for field in NUMBER_FIELDS:
+            table.numbers[field] = _column('d', arrays[f'numbers.{field}'])
+        table.heap = (bytearray(arrays['heap']), _column('Q', arrays['spans']))
+        table.garbage = meta['garbage']
+        table.extras = {position: fields for position, fields in meta['extras']}
+        return table
+
+    def to_columns(self):
+        """
+        Export the table's storage, for restoring with from_columns()
+
+        Returns:
+            dict: 'meta' (JSON-serializable layouts, category values and
+                extras) and 'arrays' (name -> array or bytes)
+        """
+        with self.lock:
+            buffer, spans = self.heap
+            arrays = {'layouts': array('I', self.layouts), 'spans': array('Q', spans), 'heap': bytes(buffer)}
+            for field, column in self.codes.items():
+                arrays[f'codes.{field}'] = array('H', column)
+            for field, column in self.numbers.items():
+                arrays[f'numbers.{field}'] = array('d', column)
+            meta = {
+                'category_fields': list(CATEGORY_FIELDS),
+                'number_fields': list(NUMBER_FIELDS),
+                # layout_ids is in layout id order
+                'layouts': [[list(fields), kinds] for fields, kinds in self.layout_ids],
+                'categories': {field: list(values) for field, values in self.categories.items()},
+                'extras': [[position, fields] for position, fields in self.extras.items()],
+                'garbage': self.garbage
+            }
+            return {'meta': meta, 'arrays': arrays}
+
+    def index_ids(self):
+        """Map each issue id to its row in `positions` from now on"""
+        with self.lock:
+            if self.positions is None:
+                self.positions = IdIndex(self)
+
+    def __len__(self):
+        return len(self.layouts)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [IssueRecord(self, row) for row in range(*position.indices(len(self)))]
+        position = int(position)
+        with self.lock:
+            if position < 0:
+                position += len(self)
+            if not 0 <= position < len(self):
+                raise IndexError('issue table index out of range')
+            return IssueRecord(self, position)
+
+    def find(self, issue_id):
+        """
+        Get the view of an issue by id
+
+        Args:
+            issue_id (str): Issue ID
+
+        Returns:
+            IssueRecord: View of the issue, or None if it is not in the table
+        """
+        with self.lock:
+            if self.positions is None:
+                self.index_ids()
+            position = self.positions.get(issue_id)
+            return IssueRecord(self, position) if position is not None else None
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield IssueRecord(self, position)
+
+    def __setitem__(self, position, issue):
+        self._write(position, issue)
+
+    def append(self, issue):
+        """Add an issue (any mapping) as the last row"""
+        self._write(len(self), issue)
+
+    def pop(self):
+        """
+        Remove the last row
+
+        Returns:
+            dict: The removed issue
+        """
+        with self.lock:
+            position = len(self) - 1
+            issue = self.row(position)
+            self._unmap(position)
+            self.moves += 1
+            buffer, spans = self.heap
+            span = spans.pop()
+            start, length = span >> _SPAN_BITS, span & _MAX_BLOB
+            if start + length == len(buffer):
+                del buffer[start:]
+            else:
+                self.garbage += length
+            self.layouts.pop()
+            for codes in self.codes.values():
+                codes.pop()
+            for numbers in self.numbers.values():
+                numbers.pop()
+            self.extras.pop(position, None)
+            return issue
+
+    def remove(self, position):
+        """
+        Remove a row, moving the last row into its place
+
+        Args:
+            position (int): Row position
+
+        Returns:
+            tuple: (removed issue, moved issue or None) as dicts
+        """
+        with self.lock:
+            removed = self.row(position)
+            if position == len(self) - 1:
+                self.pop()
+                return removed, None
+            moved = self.pop()
+            self._write(position, moved)
+            return removed, moved
+
+    def patch(self, position, fields):
+        """
+        Update selected fields of one row
+
+        Args:
+            position (int): Row position
+            fields (dict): Field values to set
+        """
+        with self.lock:
+            issue = self.row(position)
+            issue.update(fields)
+            self._write(position, issue)
+
+    def layout(self, position):
+        """Get the {field: (kind, index)} layout of a row, in field order"""
+        with self.lock:
+            return self._layout(position)
+
+    def _layout(self, position):
+        return self.layout_slots[self.layouts[position]]
+
+    def value(self, position, field, default=None):
+        """
+        Read one field of a row
+
+        Args:
+            position (int): Row position
+            field (str): Field name
+            default: Returned when the row has no such field
+
+        Returns:
+            The field value
+        """
+        with self.lock:
+            return self._value(position, field, default)
+
+    def _value(self, position, field, default):
+        slot = self.layout_slots[self.layouts[position]].get(field)
+        if slot is None:
+            return default
+        kind, index = slot
+        if kind == 'c':
+            return self.categories[field][self.codes[field][position]]
+        if kind == 'f':
+            return self.numbers[field][position]
+        if kind == 'i':
+            return int(self.numbers[field][position])
+        if kind == 'z':
+            return None
+        if kind == 'x':
+            return self.extras[position][field]
+        text = self._blob(position).split(b'\x00', index + 1)[index].decode('utf-8')
+        return json.loads(text) if kind == 'j' else text
+
+    def row(self, position):
+        """
+        Materialize a row as a new dictionary
+
+        Args:
+            position (int): Row position
+
+        Returns:
+            dict: The issue, with the original key order
+        """
+        with self.lock:
+            return self._row(position)
+
+    def _row(self, position):
+        texts = None
+        issue = {}
+        for field, (kind, index) in self.layout_slots[self.layouts[position]].items():
+            if kind == 't' or kind == 'j' or kind == 'd':
+                if texts is None:
+                    texts = self._blob(position).decode('utf-8').split(_SEPARATOR)
+                issue[field] = json.loads(texts[index]) if kind == 'j' else texts[index]
+            elif kind == 'c':
+                issue[field] = self.categories[field][self.codes[field][position]]
+            elif kind == 'f':
+                issue[field] = self.numbers[field][position]
+            elif kind == 'z':
+                issue[field] = None
+            else:
+                issue[field] = self._value(position, field, None)
+        return issue
+
+    def _blob(self, position):
+        buffer, spans = self.heap
+        span = spans[position]
+        start = span >> _SPAN_BITS
+        return buffer[start:start + (span & _MAX_BLOB)]
+
+    def _row_id(self, position):
+        """Read the 'id' field of a row (None if it has none)"""
+        slot = self.layout_slots[self.layouts[position]].get('id')
+        if slot is None or slot[0] != 'd':
+            return self._value(position, 'id', None)
+        buffer, spans = self.heap
+        span = spans[position]
+        start = span >> _SPAN_BITS
+        end = buffer.find(b'\x00', start, start + (span & _MAX_BLOB))
+        return buffer[start:end if end >= 0 else start + (span & _MAX_BLOB)].decode('utf-8')
+
+    def _code(self, field, value):
+        codes = self.category_codes[field]
+        code = codes.get(value)
+        if code is None and len(codes) < _MAX_CODES:
+            code = codes[value] = len(codes)
+            self.categories[field].append(value)
+        return code
+
+    def _layout_id(self, fields, kinds):
+        key = (fields, kinds)
+        layout_id = self.layout_ids.get(key)
+        if layout_id is None:
+            layout_id = self.layout_ids[key] = len(self.layout_slots)
+            slots = {}
+            # A 'd' id is text 0
+            text_index = 1 if 'd' in kinds else 0
+            for field, kind in zip(fields, kinds):
+                if kind == 'd':
+                    slots[field] = (kind, 0)
+                elif kind == 't' or kind == 'j':
+                    slots[field] = (kind, text_index)
+                    text_index += 1
+                else:
+                    slots[field] = (kind, 0)
+            self.layout_slots.append(slots)
+        return layout_id
+
+    def _unmap(self, position):
+        """Drop the id -> position entry of a row that is being replaced"""
+        if self.positions is not None:
+            self.positions.discard(self._row_id(position), position)
+
+    def _write(self, position, issue):
+        """Encode an issue into row `position` (len(self) appends a row)"""
+        with self.lock:
+            self._write_row(position, issue)
+
+    def _write_row(self, position, issue):
+        fields = tuple(issue)
+        kinds = []
+        codes = {}
+        numbers = {}
+        texts = []
+        extras = {}
+        category_codes = self.category_codes
+        for field, value in issue.items():
+            value_type = type(value)
+            if value_type is str:
+                if field == 'id' and _SEPARATOR not in value:
+                    texts.insert(0, value)
+                    kinds.append('d')
+                    continue
+                field_codes = category_codes.get(field)
+                if field_codes is not None:
+                    code = field_codes.get(value)
+                    if code is None:
+                        code = self._code(field, value)
+                    if code is not None:
+                        codes[field] = code
+                        kinds.append('c')
+                        continue
+                if _SEPARATOR not in value:
+                    texts.append(value)
+                    kinds.append('t')
+                    continue
+            elif value is None:
+                kinds.append('z')
+                continue
+            elif value_type is float or value_type is int:
+                if field in self.numbers and (value_type is float or abs(value) <= _MAX_EXACT_INT):
+                    numbers[field] = value
+                    kinds.append('f' if value_type is float else 'i')
+                    continue
+            if value_type in (list, dict, int, float, bool) and _json_round_trips(value):
+                texts.append(json.dumps(value))
+                kinds.append('j')
+                continue
+            extras[field] = value
+            kinds.append('x')
+        kinds = ''.join(kinds)
+
+        try:
+            blob = _SEPARATOR.join(texts).encode('utf-8')
+        except UnicodeEncodeError:
+            blob = None
+        if blob is None or len(blob) > _MAX_BLOB:
+            # Not representable in the heap (lone surrogates, or too long);
+            # keep the row's text fields as objects
+            for field, kind in zip(fields, kinds):
+                if kind in 'tjd':
+                    extras[field] = issue[field]
+            kinds = kinds.replace('t', 'x').replace('j', 'x').replace('d', 'x')
+            blob = b''
+
+        appending = position == len(self)
+        buffer, spans = self.heap
+        span = (len(buffer) << _SPAN_BITS) | len(blob)
+        buffer.extend(blob)
+        if appending:
+            spans.append(span)
+            self.layouts.append(self._layout_id(fields, kinds))
+            for field, column in self.codes.items():
+                column.append(codes.get(field, 0))
+            for field, column in self.numbers.items():
+                column.append(numbers.get(field, 0.0))
+        else:
+            self._unmap(position)
+            self.moves += 1
+            self.garbage += spans[position] & _MAX_BLOB
+            spans[position] = span
+            self.layouts[position] = self._layout_id(fields, kinds)
+            for field, column in self.codes.items():
+                column[position] = codes.get(field, 0)
+            for field, column in self.numbers.items():
+                column[position] = numbers.get(field, 0.0)
+
+        if extras:
+            self.extras[position] = extras
+        else:
+            self.extras.pop(position, None)
+        if self.positions is not None:
+            self.positions.set(issue.get('id'), position)
+
+        if self.garbage > len(buffer) // 2 and self.garbage > 1 << 20:
+            self._compact_heap()
+
+    def _compact_heap(self):
+        """Rebuild the text heap without the blobs of overwritten rows"""
+        buffer, spans = self.heap
+        new_buffer = bytearray()
+        new_spans = array('Q')
+        for span in spans:
+            start, length = span >> _SPAN_BITS, span & _MAX_BLOB
+            new_spans.append((len(new_buffer) << _SPAN_BITS) | length)
+            new_buffer += buffer[start:start + length]
+        self.heap = (new_buffer, new_spans)
+        self.garbage = 0
+
+def benchmark(sizes):
+    """
+    Compare the memory held by plain issue dicts and by an IssueTable
+
+    Both sides include an id -> position index, as a store needs one, and
+    are measured after everything else is freed: the dicts with their
+    strings, the table with the id strings it keeps.
+
+    Args:
+        sizes (list): Issue counts to measure
+    """
+    from utils.snapshot_cache import _sample_issues
+
+    print(f"{'issues':>10} {'dicts MB':>9} {'table MB':>9} {'ratio':>6} {'build s':>8} {'scan s':>7}")
+    for size in sizes:
+        text = json.dumps(_sample_issues(size))
+
+        tracemalloc.start()
+        issues = json.loads(text)
+        positions = {issue['id']: position for position, issue in enumerate(issues)}
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        del issues, positions
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        table = IssueTable(json.loads(text))
+        table.index_ids()
+        table_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # Timed again without tracing, which slows allocations down
+        del table
+        issues = json.loads(text)
+        start = time.perf_counter()
+        table = IssueTable(issues)
+        table.index_ids()
+        build_seconds = time.perf_counter() - start
+        del issues
+
+        start = time.perf_counter()
+        for issue in table:
+            issue.get('status')
+            issue.get('title')
+        scan_seconds = time.perf_counter() - start
+        print(f"{size:>10} {dict_bytes / 1e6:>9.1f} {table_bytes / 1e6:>9.1f} {dict_bytes / table_bytes:>5.1f}x "
+              f"{build_seconds:>8.2f} {scan_seconds:>7.2f}")
+
+if __name__ == '__main__':
+    # Usage: python -m utils.issue_table benchmark [sizes...]
+    if sys.argv[1:2] == ['benchmark']:
+        benchmark([int(size) for size in sys.argv[2:]] or [10000, 100000, 1000000])
+    else:
+        print("Usage: python -m utils.issue_table benchmark [sizes...]")
@@ -0,0 +1,329 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
+
+# Keyword rules for department routing and priority. Admin edits are stored
+# in RULES_FILE as overrides of these defaults.
+RULES_FILE = os.path.join('data', 'keyword_rules.json')
+
+DEFAULT_RULES = {
+    'department': {
+        "Sanitation": ["garbage", "trash", "waste", "dirty", "clean", "toilet", "bin", "litter"],
+        "Public Works": ["road", "pothole", "construction", "building", "infrastructure", "repair", "sidewalk"],
+        "Traffic Police": ["traffic", "signal", "parking", "accident", "violation", "congestion", "vehicle"],
+        "Water Department": ["water", "leak", "pipe", "sewage", "drainage", "contamination", "supply"],
+        "Electricity Board": ["light", "streetlight", "power", "electrical", "outage", "transformer", "wire",
+                              "electricity"],
+        "Parks & Recreation": ["park", "garden", "tree", "playground", "recreation", "green"]
+    },
+    'priority': {
+        "High": ["emergency", "urgent", "danger", "hazard", "accident", "injury", "fire",
+                 "flood", "electrical shock", "gas leak", "collapse", "blocked", "overflow"],
+        "Medium": ["broken", "damaged", "not working", "problem", "issue", "complaint",
+                   "repair needed", "maintenance required"]
+    }
+}
+
+# Texts matched per regex run by KeywordRules.match_many()
+MATCH_CHUNK = 10000
+
+# Separates texts in a chunk; not a word character, so no keyword spans it
+_SEPARATOR = '\x00'
+
+_rules = None
+_rules_mtime = None
+_rules_lock = threading.Lock()
+
+def _trie_pattern(node):
+    """Regex source for a keyword trie; longer keywords are tried first"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # A keyword ends here; the longer ones continue below it
+        body = f'(?:{body})?' if len(branches) == 1 else body + '?'
+    return body
+
+def _compile_keywords(keywords):
+    """
+    Compile keywords into one regex matching any of them at a word start
+
+    The keywords are merged into a trie first, so the regex engine follows
+    shared prefixes once instead of trying every keyword at every position;
+    the cost stays nearly flat as keywords are added.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return re.compile(r'\b(?:' + _trie_pattern(trie) + ')')
+
+class KeywordRules:
+    """
+    Keyword rules compiled into one trie-shaped regex
+
+    Keywords match case-insensitively at the start of a word, so "leak"
+    matches "leaking" but "bin" no longer matches "cabinet". A scan counts
+    every keyword found, including keywords contained in a longer one that
+    matched (e.g. "leak" inside "gas leak").
+
+    Attributes:
+        rules (dict): Kind ('department' or 'priority') -> label -> keywords
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.labels = {}
+        for kind, labels in rules.items():
+            for label, keywords in labels.items():
+                for keyword in keywords:
+                    self.labels.setdefault(keyword.lower(), set()).add((kind, label))
+        self.pattern = _compile_keywords(self.labels) if self.labels else None
+
+        # A match of a longer keyword also counts the keywords inside it
+        self.implied = {}
+        for keyword in self.labels:
+            inner = {other for other in self.labels
+                     if other != keyword and re.search(r'\b' + re.escape(other), keyword)}
+            self.implied[keyword] = [keyword, *inner]
+        self._label_patterns = {}
+
+    def keywords_in(self, text):
+        """
+        Find the keywords in a text
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            set: Matched keywords
+        """
+        if self.pattern is None:
+            return set()
+        found = set()
+        for match in self.pattern.finditer(text.lower()):
+            found.update(self.implied[match.group()])
+        return found
+
+    def scan(self, text):
+        """
+        Count the keywords of each rule in a text
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            Counter: (kind, label) -> number of distinct keywords found
+        """
+        counts = Counter()
+        for keyword in self.keywords_in(text):
+            counts.update(self.labels[keyword])
+        return counts
+
+    def department(self, text):
+        """
+        Get the department with the most keywords in a text
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            tuple: (department, number of keywords), or (None, 0) if no
+                department keyword occurs; ties go to the first department
+        """
+        counts = self.scan(text)
+        best, best_score = None, 0
+        for department in self.rules.get('department', {}):
+            score = counts[('department', department)]
+            if score > best_score:
+                best, best_score = department, score
+        return best, best_score
+
+    def priority(self, text):
+        """
+        Get the priority a text's keywords call for
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            str: 'High' or 'Medium' if a keyword of that level occurs,
+                otherwise 'Low'
+        """
+        counts = self.scan(text)
+        for level in ('High', 'Medium'):
+            if counts[('priority', level)]:
+                return level
+        return 'Low'
+
+    def _label_pattern(self, kind, label):
+        key = (kind, label)
+        if key not in self._label_patterns:
+            keywords = [keyword.lower() for keyword in self.rules.get(kind, {}).get(label, [])]
+            self._label_patterns[key] = _compile_keywords(keywords) if keywords else None
+        return self._label_patterns[key]
+
+    def match_many(self, texts, kind, label):
+        """
+        Find the texts containing any keyword of one rule
+
+        Texts are joined into chunks of MATCH_CHUNK and each chunk is
+        scanned by one regex run that jumps to the next text after a hit,
+        so the whole batch is one linear pass.
+
+        Args:
+            texts (iterable): Texts to scan
+            kind (str): 'department' or 'priority'
+            label (str): Department or priority level
+
+        Returns:
+            list: Positions of the matching texts
+        """
+        pattern = self._label_pattern(kind, label)
+        matches = []
+        if pattern is None:
+            return matches
+
+        offset = 0
+        chunk = []
+        iterator = iter(texts)
+        while True:
+            chunk.clear()
+            for text in iterator:
+                chunk.append(text)
+                if len(chunk) == MATCH_CHUNK:
+                    break
+            if not chunk:
+                return matches
+
+            joined = _SEPARATOR.join(chunk).lower()
+            starts = [0, *accumulate(len(text) + 1 for text in chunk)]
+            position = 0
+            while True:
+                match = pattern.search(joined, position)
+                if match is None:
+                    break
+                index = bisect_right(starts, match.start()) - 1
+                matches.append(offset + index)
+                position = starts[index + 1]
+            offset += len(chunk)
+
+def load_rule_overrides():
+    """
+    Load the admin-edited keyword lists
+
+    Returns:
+        dict: Kind -> label -> keywords, for the lists that were edited
+    """
+    try:
+        if os.path.exists(RULES_FILE):
+            with open(RULES_FILE, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"Error loading keyword rules: {e}")
+    return {}
+
+def get_rules():
+    """
+    Get the compiled keyword rules, recompiling only when they change
+
+    Returns:
+        KeywordRules: Default rules with the admin overrides applied
+    """
+    global _rules, _rules_mtime
+
+    try:
+        mtime = os.stat(RULES_FILE).st_mtime
+    except OSError:
+        mtime = None
+    with _rules_lock:
+        if _rules is None or mtime != _rules_mtime:
+            rules = {kind: dict(labels) for kind, labels in DEFAULT_RULES.items()}
+            for kind, labels in load_rule_overrides().items():
+                rules.setdefault(kind, {}).update(labels)
+            _rules = KeywordRules(rules)
+            _rules_mtime = mtime
+        return _rules
+
+def get_keywords(kind, label):
+    """
+    Get the keywords of one rule
+
+    Args:
+        kind (str): 'department' or 'priority'
+        label (str): Department or priority level
+
+    Returns:
+        list: Keywords
+    """
+    return list(get_rules().rules.get(kind, {}).get(label, []))
+
+def set_keywords(kind, label, keywords):
+    """
+    Replace the keywords of one rule
+
+    Args:
+        kind (str): 'department' or 'priority'
+        label (str): Department or priority level
+        keywords (list): New keywords; blank entries are dropped
+
+    Returns:
+        list: The keywords saved
+    """
+    global _rules
+
+    keywords = list(dict.fromkeys(keyword.strip().lower() for keyword in keywords if keyword.strip()))
+    overrides = load_rule_overrides()
+    overrides.setdefault(kind, {})[label] = keywords
+    try:
+        os.makedirs(os.path.dirname(RULES_FILE), exist_ok=True)
+        with open(RULES_FILE, 'w') as f:
+            json.dump(overrides, f, indent=2)
+    except Exception as e:
+        print(f"Error saving keyword rules: {e}")
+    with _rules_lock:
+        _rules = None
+    return keywords
+
+def benchmark(count, extra_keywords=(0, 200)):
+    """
+    Time the bulk high-priority scan against per-keyword substring checks
+
+    Args:
+        count (int): Number of texts
+        extra_keywords (tuple): Numbers of admin keywords (that never match)
+            to add to the default high-priority list
+    """
+    words = "pothole road near market garbage bin water leaking streetlight not working since days".split()
+    texts = [f"Issue {i} " + ' '.join(words[(i * 7 + k) % len(words)] for k in range(12))
+             + (" urgent" if i % 50 == 0 else "") for i in range(count)]
+
+    for extra in extra_keywords:
+        keywords = DEFAULT_RULES['priority']['High'] + [f"zq{i:04d}x" for i in range(extra)]
+        rules = KeywordRules({'priority': {'High': keywords}})
+
+        start = time.perf_counter()
+        substring = [i for i, text in enumerate(texts) if any(keyword in text.lower() for keyword in keywords)]
+        substring_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matched = rules.match_many(texts, 'priority', 'High')
+        seconds = time.perf_counter() - start
+        print(f"{count} texts, {len(keywords)} keywords: substring scan {substring_seconds:.2f}s "
+              f"({len(substring)} matches), compiled matcher {seconds:.2f}s ({len(matched)} matches)")
+
+if __name__ == '__main__':
+    # Usage: python -m utils.keyword_rules benchmark [count]
+    if sys.argv[1:2] == ['benchmark']:
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    else:
+        print("Usage: python -m utils.keyword_rules benchmark [count]")
@@ -0,0 +1,276 @@
+import json
+import os
+import re
+
+# On disk, issues are partitioned by the month of their timestamp and, within
+# a month, split into 'resolved' and 'open' segments, because Resolved issues
+# are the only ones retention removes:
+#
+#     data/partitions/<YYYY-MM>.<open|resolved>.json
+#
+# The manifest lists the segments with their record counts and is replaced
+# last on every write, so it also serves as the snapshot's version stamp.
+# Archiving replaces it *before* segment files are moved or rewritten; the
+# file operations still to do are listed under 'pending' and are finished
+# by whoever reads the manifest next if the process stops in between.
+PARTITIONS_DIR = os.path.join('data', 'partitions')
+MANIFEST_FILE = os.path.join(PARTITIONS_DIR, 'manifest.json')
+ARCHIVE_DIR = os.path.join('data', 'archive')
+
+# Partition for issues whose timestamp does not start with a YYYY-MM month
+UNDATED = 'undated'
+SEGMENT_CLASSES = ('open', 'resolved')
+
+_MONTH = re.compile(r'\d{4}-\d{2}')
+
+def partition_key(issue):
+    """Get the month partition ('YYYY-MM' or UNDATED) of an issue"""
+    match = _MONTH.match(issue.get('timestamp') or '')
+    return match.group(0) if match else UNDATED
+
+def segment_of(issue):
+    """Get the (partition, class) segment an issue is stored in"""
+    segment_class = 'resolved' if issue.get('status') == 'Resolved' else 'open'
+    return (partition_key(issue), segment_class)
+
+class DirtySegments:
+    """
+    Segments changed in memory since the snapshot was written
+
+    Attached to the live IssueStore (with build=False, right after the
+    snapshot is loaded), it records the segment of every issue a change
+    record adds, patches or removes, both before and after the change, so
+    compaction only has to rewrite those segments.
+    """
+
+    def __init__(self):
+        self.segments = set()
+        self.folding = set()
+
+    def on_add(self, position, issue):
+        self.segments.add(segment_of(issue))
+
+    def on_patch(self, position, issue, old_fields):
+        old_issue = {field: old_fields[field] if field in old_fields else issue.get(field)
+                     for field in ('timestamp', 'status')}
+        self.segments.add(segment_of(old_issue))
+        self.segments.add(segment_of(issue))
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        self.segments.add(segment_of(removed_issue))
+
+    def take(self):
+        """
+        Hand the changed segments to a compaction
+
+        They stay pending until done(), so if that compaction fails or is
+        abandoned the next take() returns them again.
+
+        Returns:
+            set: (key, class) segments changed since the last done()
+        """
+        self.folding |= self.segments
+        self.segments = set()
+        return set(self.folding)
+
+    def done(self):
+        """Forget the segments handed out by take(), which are now written"""
+        self.folding = set()
+
+def segment_path(key, segment_class, directory=PARTITIONS_DIR):
+    """Get the file path of a segment"""
+    return os.path.join(directory, f"{key}.{segment_class}.json")
+
+def _write_json(path, data, **kwargs):
+    """Atomically replace a JSON file; issue records are written as objects"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, default=dict, **kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def read_manifest():
+    """
+    Read the partition manifest, finishing any interrupted archiving
+
+    Returns:
+        dict: {'segments': {key: {class: count}}}, or None if the store
+            has not been partitioned yet
+    """
+    if not os.path.exists(MANIFEST_FILE):
+        return None
+    manifest = _read_json(MANIFEST_FILE)
+    if manifest.get('pending'):
+        _finish_pending(manifest)
+    return manifest
+
+def months_in_range(keys, start=None, end=None):
+    """
+    Select the month partitions that can hold timestamps in [start, end)
+
+    Args:
+        keys (iterable): Partition keys
+        start (str): Inclusive ISO lower bound (optional)
+        end (str): Exclusive ISO upper bound (optional)
+
+    Returns:
+        list: Matching month keys in ascending order; UNDATED is excluded
+            whenever a bound is given
+    """
+    selected = []
+    for key in sorted(keys):
+        if key == UNDATED:
+            if start is None and end is None:
+                selected.append(key)
+            continue
+        if start is not None and key < start[:7]:
+            continue
+        if end is not None and key > end[:7]:
+            continue
+        selected.append(key)
+    return selected
+
+def read_segments(manifest, keys=None):
+    """
+    Read the issues of the given month partitions
+
+    Args:
+        manifest (dict): Partition manifest
+        keys (list): Partition keys to read (default: all)
+
+    Returns:
+        list: Issues, partition by partition
+    """
+    segments = manifest['segments']
+    issues = []
+    for key in sorted(segments) if keys is None else keys:
+        for segment_class in SEGMENT_CLASSES:
+            if segments.get(key, {}).get(segment_class):
+                issues.extend(_read_json(segment_path(key, segment_class)))
+    return issues
+
+def write_segments(issues, dirty=None, manifest=None):
+    """
+    Rewrite segments from the current issues
+
+    Segments not listed in `dirty` are left untouched, so the write cost
+    depends on which months changed, not on the size of the store.
+
+    Args:
+        issues (iterable): Current issues; with `dirty`, the issues of the
+            dirty segments are enough
+        dirty (set): (key, class) segments to rewrite (default: all)
+        manifest (dict): Current manifest (optional)
+
+    Returns:
+        dict: The new manifest
+    """
+    manifest = manifest or {'segments': {}}
+    segments = manifest['segments']
+
+    groups = {}
+    for issue in issues:
+        segment = segment_of(issue)
+        if dirty is None or segment in dirty:
+            groups.setdefault(segment, []).append(issue)
+    if dirty is None:
+        dirty = set(groups) | {(key, segment_class) for key, classes in segments.items()
+                               for segment_class in classes}
+
+    for key, segment_class in dirty:
+        records = groups.get((key, segment_class))
+        path = segment_path(key, segment_class)
+        if records:
+            _write_json(path, records, indent=2)
+            segments.setdefault(key, {})[segment_class] = len(records)
+        else:
+            if os.path.exists(path):
+                os.remove(path)
+            segments.get(key, {}).pop(segment_class, None)
+            if key in segments and not segments[key]:
+                del segments[key]
+
+    save_manifest(manifest)
+    return manifest
+
+def archive_segment(manifest, key, segment_class, keep=None):
+    """
+    Stage a segment, or the records of it not kept, for the archive
+
+    Without `keep` the segment file is moved as a whole (one rename); with
+    it the segment is split record by record. Archived records are added
+    to any earlier archive of the same segment. Live segment files are
+    only changed once the manifest is saved with save_manifest(), so a
+    crash never leaves the manifest listing files that are gone.
+
+    Args:
+        manifest (dict): Current manifest, updated in place (not saved)
+        key (str): Partition key
+        segment_class (str): 'open' or 'resolved'
+        keep (callable): Predicate for records that stay (optional)
+
+    Returns:
+        int: Number of archived issues
+    """
+    segments = manifest['segments']
+    path = segment_path(key, segment_class)
+    archive_path = segment_path(key, segment_class, ARCHIVE_DIR)
+    pending = manifest.setdefault('pending', [])
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+
+    if keep is None and not os.path.exists(archive_path):
+        pending.append([key, segment_class, 'move'])
+        archived_count = segments[key].pop(segment_class)
+    else:
+        kept, archived = [], []
+        for issue in _read_json(path):
+            (kept if keep is not None and keep(issue) else archived).append(issue)
+        if not archived:
+            return 0
+        archived_count = len(archived)
+        if os.path.exists(archive_path):
+            # Records already there from an interrupted run are not doubled
+            archived_ids = {issue.get('id') for issue in archived}
+            archived = [issue for issue in _read_json(archive_path)
+                        if issue.get('id') not in archived_ids] + archived
+        _write_json(archive_path, archived, indent=2)
+        if kept:
+            _write_json(f"{path}.kept", kept, indent=2)
+            pending.append([key, segment_class, 'replace'])
+            segments[key][segment_class] = len(kept)
+        else:
+            pending.append([key, segment_class, 'remove'])
+            segments[key].pop(segment_class)
+
+    if not segments[key]:
+        del segments[key]
+    return archived_count
+
+def _finish_pending(manifest):
+    """Carry out the staged segment file operations of a saved manifest"""
+    for key, segment_class, action in manifest['pending']:
+        path = segment_path(key, segment_class)
+        if action == 'move':
+            if os.path.exists(path):
+                os.replace(path, segment_path(key, segment_class, ARCHIVE_DIR))
+        elif action == 'replace':
+            if os.path.exists(f"{path}.kept"):
+                os.replace(f"{path}.kept", path)
+        elif os.path.exists(path):
+            os.remove(path)
+    del manifest['pending']
+    _write_json(MANIFEST_FILE, manifest)
+
+def save_manifest(manifest):
+    """Replace the manifest file, then carry out its staged archiving"""
+    if not manifest.get('pending'):
+        manifest.pop('pending', None)
+    _write_json(MANIFEST_FILE, manifest)
+    if manifest.get('pending'):
+        _finish_pending(manifest)
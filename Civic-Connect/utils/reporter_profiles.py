@@ -0,0 +1,180 @@
+from bisect import bisect_left, bisect_right, insort
+from utils.issue_query import decode_cursor, encode_cursor
+
+# Profile orders for ReporterProfiles.page(): sort -> (profile key,
+# descending). Keys end with the phone so every entry is unique.
+PROFILE_SORTS = {
+    'issues': (lambda profile: (profile['total_issues'], profile['phone']), True),
+    'recent': (lambda profile: (profile['last_report'], profile['phone']), True),
+    'name': (lambda profile: ((profile['name'] or '').lower(), profile['phone']), False),
+}
+
+# Issue fields a profile is derived from
+SOURCE_FIELDS = {'phone', 'status', 'timestamp', 'reporter_name', 'email'}
+
+class ReporterProfiles:
+    """
+    Per-citizen profiles keyed by phone number
+
+    Each profile holds the reporter's name and email (from their latest
+    report), total and resolved issue counts and last report time, next to
+    the reporter's (timestamp, issue id, name, email) list, from which the
+    latest report is found again when it is removed. Every order in PROFILE_SORTS
+    is kept as a sorted key list, so a page of profiles is a slice from a
+    bisect point. The index is kept up to date through the IssueStore index
+    hooks; pass the current issues to the constructor (and attach it with
+    build=False) to sort each order once instead of inserting one by one.
+    """
+
+    def __init__(self, issues=None):
+        self.profiles = {}
+        self.issues = {}
+        self.orders = {sort: [] for sort in PROFILE_SORTS}
+        self.repeat_reporters = 0
+        if issues:
+            for issue in issues:
+                self._add(issue, link=False)
+            for sort, (key_func, descending) in PROFILE_SORTS.items():
+                self.orders[sort] = sorted(map(key_func, self.profiles.values()))
+            self.repeat_reporters = sum(1 for profile in self.profiles.values() if profile['total_issues'] > 1)
+
+    def _unlink(self, profile):
+        for sort, (key_func, descending) in PROFILE_SORTS.items():
+            keys = self.orders[sort]
+            at = bisect_left(keys, key_func(profile))
+            del keys[at]
+        if profile['total_issues'] > 1:
+            self.repeat_reporters -= 1
+
+    def _link(self, profile):
+        for sort, (key_func, descending) in PROFILE_SORTS.items():
+            insort(self.orders[sort], key_func(profile))
+        if profile['total_issues'] > 1:
+            self.repeat_reporters += 1
+
+    def _add(self, issue, link=True):
+        phone = issue.get('phone')
+        if not phone:
+            return
+        profile = self.profiles.get(phone)
+        if profile is None:
+            profile = self.profiles[phone] = {
+                'phone': phone,
+                'name': None,
+                'email': None,
+                'total_issues': 0,
+                'resolved_issues': 0,
+                'last_report': ''
+            }
+            self.issues[phone] = []
+        elif link:
+            self._unlink(profile)
+
+        entry = (issue.get('timestamp') or '', issue.get('id'), issue.get('reporter_name'), issue.get('email'))
+        entries = self.issues[phone]
+        if not entries or entries[-1][:2] <= entry[:2]:
+            entries.append(entry)
+        else:
+            insort(entries, entry)
+        profile['total_issues'] += 1
+        if issue.get('status') == 'Resolved':
+            profile['resolved_issues'] += 1
+        if entries[-1] is entry:
+            profile['last_report'], _, profile['name'], profile['email'] = entry
+        if link:
+            self._link(profile)
+
+    def _remove(self, issue):
+        phone = issue.get('phone')
+        profile = self.profiles.get(phone) if phone else None
+        if profile is None:
+            return
+        self._unlink(profile)
+
+        entries = self.issues[phone]
+        at = bisect_left(entries, (issue.get('timestamp') or '', issue.get('id')))
+        if at < len(entries) and entries[at][1] == issue.get('id'):
+            del entries[at]
+        profile['total_issues'] -= 1
+        if issue.get('status') == 'Resolved':
+            profile['resolved_issues'] -= 1
+        if not entries:
+            del self.profiles[phone]
+            del self.issues[phone]
+            return
+        profile['last_report'], _, profile['name'], profile['email'] = entries[-1]
+        self._link(profile)
+
+    def on_add(self, position, issue):
+        self._add(issue)
+
+    def on_patch(self, position, issue, old_fields):
+        if not SOURCE_FIELDS.intersection(old_fields):
+            return
+        old_issue = dict(issue)
+        old_issue.update(old_fields)
+        self._remove(old_issue)
+        self._add(issue)
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        self._remove(removed_issue)
+
+    def profile(self, phone):
+        """Get a copy of one reporter's profile, or None"""
+        profile = self.profiles.get(phone)
+        return dict(profile) if profile is not None else None
+
+    def issue_ids(self, phone):
+        """Get the IDs of a reporter's issues, newest first"""
+        return [entry[1] for entry in reversed(self.issues.get(phone, []))]
+
+    def active_reporters(self, since):
+        """
+        Count reporters whose last report is at or after a timestamp
+
+        Args:
+            since (str): ISO timestamp
+
+        Returns:
+            int: Number of reporters
+        """
+        keys = self.orders['recent']
+        return len(keys) - bisect_left(keys, (since,))
+
+    def page(self, sort='issues', limit=20, cursor=None):
+        """
+        Get one page of profiles in a PROFILE_SORTS order
+
+        Args:
+            sort (str): Key of PROFILE_SORTS
+            limit (int): Maximum number of profiles to return
+            cursor (str): Cursor returned for the previous page (optional)
+
+        Returns:
+            tuple: (list of profile dicts, next cursor or None)
+        """
+        if sort not in PROFILE_SORTS:
+            raise ValueError(f"Unknown profile sort: {sort}")
+        descending = PROFILE_SORTS[sort][1]
+        keys = self.orders[sort]
+
+        if cursor:
+            cursor_sort, group, entry = decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValueError("Cursor belongs to a different sort order")
+            if descending:
+                end = bisect_left(keys, entry)
+            else:
+                start = bisect_right(keys, entry)
+        else:
+            end, start = len(keys), 0
+
+        if descending:
+            selected = keys[max(0, end - limit):end][::-1]
+        else:
+            selected = keys[start:start + limit]
+
+        profiles = [dict(self.profiles[key[-1]]) for key in selected]
+        more = (end - limit > 0) if descending else (start + limit < len(keys))
+        next_cursor = encode_cursor(sort, 0, selected[-1]) if selected and more else None
+        return profiles, next_cursor
@@ -0,0 +1,437 @@
+import base64
+import hashlib
+import zlib
+from datetime import date, timedelta
+import numpy as np
+from utils.analytics import CATEGORY_COLUMNS, location_area
+from utils.daily_rollup import report_day
+from utils.issue_stats import STATS_FIELDS
+
+# HyperLogLog registers are 2**PRECISION bytes; the standard error of a
+# distinct count is about 1.04 / sqrt(2**PRECISION), i.e. 1.6%
+PRECISION = 12
+# Per-day sketches are many and small, so they use 1 KB registers (3.2%)
+DAY_PRECISION = 10
+
+# A sketch holds its non-zero registers in a dict until it has this many,
+# then switches to a dense byte array (small per-day sketches stay small)
+SPARSE_LIMIT = 64
+
+# Size of the filter of reporters seen before, and the number of bits set
+# per reporter; about 2% false "repeat" matches at a million reporters
+SEEN_FILTER_BITS = 2 ** 23
+SEEN_FILTER_HASHES = 4
+
+# Keys monitored by each Space-Saving top-K sketch
+TOP_K_CAPACITY = 200
+
+def reporter_hash(phone):
+    """Get the 64-bit hash a reporter is counted by"""
+    return int.from_bytes(hashlib.blake2b(phone.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def _issue_area(issue):
+    location = issue.get('location')
+    if location is None:
+        return CATEGORY_COLUMNS['area'][1]
+    return location_area(location) if isinstance(location, str) else location
+
+class HyperLogLog:
+    """
+    Approximate distinct counter
+
+    Each value is hashed to 64 bits; the first PRECISION bits pick a
+    register, which keeps the longest run of leading zeros seen in the
+    rest. The count is estimated from the registers, whose size does not
+    depend on how many values were added. Sketches of the same precision
+    merge by taking the register-wise maximum.
+    """
+
+    def __init__(self, precision=PRECISION):
+        self.precision = precision
+        self.sparse = {}
+        self.registers = None
+
+    def add_hash(self, value_hash):
+        """Record a value by its 64-bit hash (see reporter_hash)"""
+        rest_bits = 64 - self.precision
+        register = value_hash >> rest_bits
+        rank = rest_bits - (value_hash & ((1 << rest_bits) - 1)).bit_length() + 1
+        if self.registers is not None:
+            if self.registers[register] < rank:
+                self.registers[register] = rank
+        elif self.sparse.get(register, 0) < rank:
+            self.sparse[register] = rank
+            if len(self.sparse) > SPARSE_LIMIT:
+                self._densify()
+
+    def _densify(self):
+        self.registers = bytearray(2 ** self.precision)
+        for register, rank in self.sparse.items():
+            self.registers[register] = rank
+        self.sparse = {}
+
+    def merge(self, other):
+        """Add the values counted by another sketch to this one"""
+        if other.registers is not None:
+            if self.registers is None:
+                self._densify()
+            merged = np.maximum(np.frombuffer(self.registers, dtype=np.uint8),
+                                np.frombuffer(other.registers, dtype=np.uint8))
+            self.registers = bytearray(merged.tobytes())
+        else:
+            for register, rank in other.sparse.items():
+                if self.registers is not None:
+                    if self.registers[register] < rank:
+                        self.registers[register] = rank
+                elif self.sparse.get(register, 0) < rank:
+                    self.sparse[register] = rank
+            if self.registers is None and len(self.sparse) > SPARSE_LIMIT:
+                self._densify()
+        return self
+
+    def count(self):
+        """
+        Estimate the number of distinct values
+
+        Returns:
+            int: Estimated count
+        """
+        size = 2 ** self.precision
+        if self.registers is None:
+            ranks = np.fromiter(self.sparse.values(), dtype=np.float64, count=len(self.sparse))
+            zeros = size - len(self.sparse)
+            harmonic = zeros + np.exp2(-ranks).sum()
+        else:
+            ranks = np.frombuffer(self.registers, dtype=np.uint8)
+            zeros = int(np.count_nonzero(ranks == 0))
+            harmonic = np.exp2(-ranks.astype(np.float64)).sum()
+        estimate = 0.7213 / (1 + 1.079 / size) * size * size / harmonic
+        if estimate <= 2.5 * size and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = size * np.log(size / zeros)
+        return int(round(estimate))
+
+    def to_dict(self):
+        """Get the sketch as a JSON-serializable dictionary"""
+        if self.registers is None:
+            return {'precision': self.precision, 'sparse': [[register, rank] for register, rank in self.sparse.items()]}
+        return {'precision': self.precision, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a sketch saved with to_dict()"""
+        sketch = cls(data['precision'])
+        if 'registers' in data:
+            sketch.registers = bytearray(base64.b64decode(data['registers']))
+        else:
+            sketch.sparse = {register: rank for register, rank in data['sparse']}
+        return sketch
+
+class SeenFilter:
+    """
+    Bloom filter answering whether a reporter was seen before
+
+    Never misses a reporter it has seen; may wrongly report an unseen one
+    as seen, with a rate that grows with the number of reporters.
+    """
+
+    def __init__(self, bits=SEEN_FILTER_BITS, hashes=SEEN_FILTER_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.filter = bytearray(bits // 8)
+
+    def check_and_add(self, value_hash):
+        """
+        Record a reporter
+
+        Args:
+            value_hash (int): 64-bit hash from reporter_hash
+
+        Returns:
+            bool: True if the reporter had (probably) been seen before
+        """
+        first, second = value_hash >> 32, value_hash & 0xFFFFFFFF
+        seen = True
+        for i in range(self.hashes):
+            bit = (first + i * second) % self.bits
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.filter[byte] & mask:
+                seen = False
+                self.filter[byte] |= mask
+        return seen
+
+    def to_dict(self):
+        """Get the filter as a JSON-serializable dictionary"""
+        return {
+            'bits': self.bits,
+            'hashes': self.hashes,
+            'filter': base64.b64encode(zlib.compress(bytes(self.filter))).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a filter saved with to_dict()"""
+        seen = cls(data['bits'], data['hashes'])
+        seen.filter = bytearray(zlib.decompress(base64.b64decode(data['filter'])))
+        return seen
+
+class SpaceSaving:
+    """
+    Space-Saving top-K sketch of the most frequent keys
+
+    Monitors at most `capacity` keys. A new key replaces one with the
+    lowest count and inherits that count as its possible overcount
+    ('error'), so every key whose true count exceeds total / capacity is
+    monitored. Keys are kept in buckets by count, so adding and removing
+    are constant time. Each monitored key can carry a display label.
+    """
+
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.labels = {}
+        self.buckets = {}
+        self.min_count = 0
+
+    def _move(self, key, old_count, new_count):
+        if old_count:
+            bucket = self.buckets[old_count]
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[old_count]
+        if new_count:
+            self.buckets.setdefault(new_count, set()).add(key)
+            self.counts[key] = new_count
+        if not self.buckets:
+            self.min_count = 0
+        elif new_count and new_count < self.min_count:
+            self.min_count = new_count
+        elif self.min_count not in self.buckets:
+            # The lowest bucket emptied; only a key dropping to zero needs a scan
+            self.min_count = new_count if new_count == old_count + 1 else min(self.buckets)
+
+    def add(self, key, label=None):
+        """Count one occurrence of a key"""
+        count = self.counts.get(key)
+        if count is None:
+            if len(self.counts) < self.capacity:
+                count = 0
+                self.errors[key] = 0
+            else:
+                # Take over the slot of a key with the lowest count
+                count = self.min_count
+                victim = next(iter(self.buckets[count]))
+                del self.counts[victim], self.errors[victim]
+                self.labels.pop(victim, None)
+                bucket = self.buckets[count]
+                bucket.remove(victim)
+                bucket.add(key)
+                self.counts[key] = count
+                self.errors[key] = count
+        self._move(key, count, count + 1)
+        if label is not None:
+            self.labels[key] = label
+
+    def remove(self, key):
+        """Take back one occurrence of a key, if it is monitored"""
+        count = self.counts.get(key)
+        if count is None:
+            return
+        if count == 1:
+            del self.counts[key]
+            self.errors.pop(key)
+            self.labels.pop(key, None)
+        else:
+            self.errors[key] = min(self.errors[key], count - 1)
+        self._move(key, count, count - 1)
+
+    def top(self, limit=10):
+        """
+        Get the most frequent keys
+
+        Args:
+            limit (int): Number of keys to return
+
+        Returns:
+            list: (key, count, error, label) tuples, highest count first;
+                the true count lies between count - error and count
+        """
+        keys = sorted(self.counts, key=lambda key: (-self.counts[key], self.errors[key]))[:limit]
+        return [(key, self.counts[key], self.errors[key], self.labels.get(key)) for key in keys]
+
+    def to_dict(self):
+        """Get the sketch as a JSON-serializable dictionary"""
+        return {
+            'capacity': self.capacity,
+            'entries': [[key, count, self.errors[key], self.labels.get(key)] for key, count in self.counts.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a sketch saved with to_dict()"""
+        sketch = cls(data['capacity'])
+        for key, count, error, label in data['entries']:
+            sketch.counts[key] = count
+            sketch.errors[key] = error
+            if label is not None:
+                sketch.labels[key] = label
+            sketch.buckets.setdefault(count, set()).add(key)
+        sketch.min_count = min(sketch.buckets) if sketch.buckets else 0
+        return sketch
+
+class ReporterSketches:
+    """
+    Approximate reporter and hotspot counts maintained on every write
+
+    Distinct reporters (by phone) are counted with HyperLogLog sketches in
+    total, per report day, per department and per area (ward); reporters
+    with more than one report are counted through a SeenFilter; frequent
+    reporters and hotspot areas are tracked with Space-Saving sketches.
+    Every structure has a fixed size, so the panels built on them cost the
+    same at any number of citizens.
+
+    Distinct counts only grow: removing or expiring an issue takes it out of
+    the top-K sketches but not out of the distinct counters. The index is
+    kept up to date through the IssueStore index hooks and can be saved and
+    restored with to_dict() / from_dict().
+    """
+
+    def __init__(self):
+        self.reporters = HyperLogLog()
+        self.repeat_reporters = HyperLogLog()
+        self.seen = SeenFilter()
+        self.days = {}
+        self.departments = {}
+        self.areas = {}
+        self.top_reporters = SpaceSaving()
+        self.hotspots = SpaceSaving()
+
+    def _distinct(self, sketches, key, value_hash, precision=PRECISION):
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = HyperLogLog(precision)
+        sketch.add_hash(value_hash)
+
+    def _department(self, issue):
+        department = issue.get('department')
+        return department if department is not None else STATS_FIELDS['department']
+
+    def _add_reporter(self, issue, phone):
+        value_hash = reporter_hash(phone)
+        self.reporters.add_hash(value_hash)
+        if self.seen.check_and_add(value_hash):
+            self.repeat_reporters.add_hash(value_hash)
+        day = report_day(issue.get('timestamp'))
+        if day is not None:
+            self._distinct(self.days, day, value_hash, DAY_PRECISION)
+        self._distinct(self.departments, self._department(issue), value_hash)
+        self._distinct(self.areas, _issue_area(issue), value_hash)
+        self.top_reporters.add(phone, issue.get('reporter_name'))
+
+    def on_add(self, position, issue):
+        self.hotspots.add(_issue_area(issue))
+        phone = issue.get('phone')
+        if phone:
+            self._add_reporter(issue, phone)
+
+    def on_patch(self, position, issue, old_fields):
+        old_issue = dict(issue)
+        old_issue.update(old_fields)
+        old_area = _issue_area(old_issue)
+        area = _issue_area(issue)
+        if old_area != area:
+            self.hotspots.remove(old_area)
+            self.hotspots.add(area)
+
+        old_phone = old_issue.get('phone')
+        phone = issue.get('phone')
+        if old_phone != phone:
+            if old_phone:
+                self.top_reporters.remove(old_phone)
+            if phone:
+                self._add_reporter(issue, phone)
+        elif phone:
+            value_hash = reporter_hash(phone)
+            if self._department(old_issue) != self._department(issue):
+                self._distinct(self.departments, self._department(issue), value_hash)
+            if old_area != area:
+                self._distinct(self.areas, area, value_hash)
+            day = report_day(issue.get('timestamp'))
+            if day is not None and day != report_day(old_issue.get('timestamp')):
+                self._distinct(self.days, day, value_hash, DAY_PRECISION)
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        self.hotspots.remove(_issue_area(removed_issue))
+        phone = removed_issue.get('phone')
+        if phone:
+            self.top_reporters.remove(phone)
+
+    def active_reporters(self, days=30, today=None):
+        """
+        Estimate the distinct reporters of the last `days` report days
+
+        Args:
+            days (int): Window length, including today
+            today (date): Last day of the window (default: today)
+
+        Returns:
+            int: Estimated count
+        """
+        today = today or date.today()
+        merged = HyperLogLog(DAY_PRECISION)
+        for offset in range(days):
+            sketch = self.days.get((today - timedelta(days=offset)).isoformat())
+            if sketch is not None:
+                merged.merge(sketch)
+        return merged.count()
+
+    def daily_reporters(self, days=30, today=None):
+        """
+        Estimate the distinct reporters of each of the last `days` days
+
+        Returns:
+            dict: 'YYYY-MM-DD' -> estimated count, oldest first
+        """
+        today = today or date.today()
+        counts = {}
+        for offset in range(days - 1, -1, -1):
+            day = (today - timedelta(days=offset)).isoformat()
+            sketch = self.days.get(day)
+            counts[day] = sketch.count() if sketch is not None else 0
+        return counts
+
+    def to_dict(self):
+        """Get the sketches as a JSON-serializable dictionary"""
+        return {
+            'reporters': self.reporters.to_dict(),
+            'repeat_reporters': self.repeat_reporters.to_dict(),
+            'seen': self.seen.to_dict(),
+            'days': {day: sketch.to_dict() for day, sketch in self.days.items()},
+            'departments': [[department, sketch.to_dict()] for department, sketch in self.departments.items()],
+            'areas': [[area, sketch.to_dict()] for area, sketch in self.areas.items()],
+            'top_reporters': self.top_reporters.to_dict(),
+            'hotspots': self.hotspots.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore sketches saved with to_dict()
+
+        Args:
+            data (dict): Saved sketches
+
+        Returns:
+            ReporterSketches: Index holding the saved sketches
+        """
+        index = cls()
+        index.reporters = HyperLogLog.from_dict(data['reporters'])
+        index.repeat_reporters = HyperLogLog.from_dict(data['repeat_reporters'])
+        index.seen = SeenFilter.from_dict(data['seen'])
+        index.days = {day: HyperLogLog.from_dict(sketch) for day, sketch in data['days'].items()}
+        index.departments = {department: HyperLogLog.from_dict(sketch) for department, sketch in data['departments']}
+        index.areas = {area: HyperLogLog.from_dict(sketch) for area, sketch in data['areas']}
+        index.top_reporters = SpaceSaving.from_dict(data['top_reporters'])
+        index.hotspots = SpaceSaving.from_dict(data['hotspots'])
+        return index
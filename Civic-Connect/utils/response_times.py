@@ -0,0 +1,286 @@
+import math
+from datetime import datetime
+from utils.issue_stats import STATS_FIELDS
+
+# Response stages: stage -> issue field holding the time the stage ended.
+# Every stage starts at the issue's 'timestamp' (submission).
+STAGES = {
+    'acknowledge': 'acknowledged_at',
+    'resolve': 'resolved_at',
+}
+
+# Statuses that end the resolve stage; any status other than 'Pending' ends
+# the acknowledge stage
+RESOLVED_STATUSES = ('Resolved', 'Closed')
+
+# Relative error of the quantiles reported by a QuantileSketch
+RELATIVE_ACCURACY = 0.02
+
+# Durations (hours) at or below this are counted as zero
+MIN_HOURS = 1 / 60
+
+# Fewer recorded durations than this are not used for estimates
+MIN_SAMPLES = 5
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+def _parse(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+
+def stage_hours(issue, stage):
+    """
+    Get how long an issue took to complete a response stage
+
+    Args:
+        issue (dict): Issue
+        stage (str): Key of STAGES
+
+    Returns:
+        float: Hours from submission to the end of the stage, or None if
+            the stage has not ended or a timestamp cannot be parsed
+    """
+    submitted = _parse(issue.get('timestamp'))
+    ended = _parse(issue.get(STAGES[stage]))
+    if submitted is None or ended is None:
+        return None
+    try:
+        return max((ended - submitted).total_seconds() / 3600, 0.0)
+    except TypeError:
+        # One timestamp has a time zone and the other does not
+        return None
+
+def format_hours(hours):
+    """
+    Format a duration for display
+
+    Args:
+        hours (float): Duration in hours
+
+    Returns:
+        str: e.g. '25 minutes', '3.5 hours' or '4 days'
+    """
+    if hours < 1:
+        return f"{max(1, round(hours * 60))} minutes"
+    if hours < 48:
+        return f"{hours:.1f} hours"
+    return f"{round(hours / 24)} days"
+
+class QuantileSketch:
+    """
+    Mergeable streaming sketch of a distribution of durations
+
+    Values are counted in logarithmic buckets whose width grows with the
+    value, so every quantile is reported within RELATIVE_ACCURACY of a true
+    sample value. The number of buckets depends only on the range of the
+    values (a few hundred between a minute and a year), never on how many
+    were added; sketches merge by adding bucket counts.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Record one value (hours)"""
+        if value <= MIN_HOURS:
+            self.zeros += 1
+        else:
+            bucket = math.ceil(math.log(value) / _LOG_GAMMA)
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """Add the values recorded by another sketch to this one"""
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def mean(self):
+        """Get the exact mean, or None if the sketch is empty"""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """
+        Get an approximate quantile
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float: Value in hours, or None if the sketch is empty
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return self.min
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if rank < seen:
+                value = 2 * _GAMMA ** bucket / (_GAMMA + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Summarize the distribution
+
+        Returns:
+            dict: count, mean, min, q1, median, q3, p90 and max (hours;
+                None when empty)
+        """
+        return {
+            'count': self.count,
+            'mean': self.mean(),
+            'min': self.min,
+            'q1': self.quantile(0.25),
+            'median': self.quantile(0.5),
+            'q3': self.quantile(0.75),
+            'p90': self.quantile(0.9),
+            'max': self.max
+        }
+
+    def to_dict(self):
+        """Get the sketch as a JSON-serializable dictionary"""
+        return {
+            'buckets': [[bucket, count] for bucket, count in self.buckets.items()],
+            'zeros': self.zeros,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a sketch saved with to_dict()"""
+        sketch = cls()
+        sketch.buckets = {bucket: count for bucket, count in data['buckets']}
+        sketch.zeros = data['zeros']
+        sketch.count = data['count']
+        sketch.total = data['total']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        return sketch
+
+class ResponseTimes:
+    """
+    Response time sketches per stage, department and priority, and per
+    stage and weekday of submission
+
+    A duration is recorded once, when an issue gets the end time of a stage
+    (see STAGES), under the issue's department and priority at that moment.
+    Sketches describe completed responses, so removing or expiring an issue
+    does not take its durations out again. The index is kept up to date
+    through the IssueStore index hooks and can be saved and restored with
+    to_dict() / from_dict().
+    """
+
+    def __init__(self):
+        self.sketches = {}
+        self.weekdays = {}
+
+    def _sketch(self, sketches, key):
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = QuantileSketch()
+        return sketch
+
+    def _record(self, issue, stage):
+        hours = stage_hours(issue, stage)
+        if hours is None:
+            return
+        department = issue.get('department') or STATS_FIELDS['department']
+        priority = issue.get('priority') or STATS_FIELDS['priority']
+        self._sketch(self.sketches, (stage, department, priority)).add(hours)
+        weekday = _parse(issue.get('timestamp')).weekday()
+        self._sketch(self.weekdays, (stage, weekday)).add(hours)
+
+    def on_add(self, position, issue):
+        for stage in STAGES:
+            self._record(issue, stage)
+
+    def on_patch(self, position, issue, old_fields):
+        for stage, field in STAGES.items():
+            if field in old_fields and old_fields[field] is None:
+                self._record(issue, stage)
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        pass
+
+    def sketch(self, stage, department=None, priority=None):
+        """
+        Merge the sketches of one stage
+
+        Args:
+            stage (str): Key of STAGES
+            department (str): Only this department (optional)
+            priority (str): Only this priority (optional)
+
+        Returns:
+            QuantileSketch: New sketch of the matching durations
+        """
+        merged = QuantileSketch()
+        for (key_stage, key_department, key_priority), sketch in self.sketches.items():
+            if (key_stage == stage and department in (None, key_department)
+                    and priority in (None, key_priority)):
+                merged.merge(sketch)
+        return merged
+
+    def by_department(self, stage):
+        """Get a new merged sketch per department for one stage"""
+        departments = {}
+        for (key_stage, department, priority), sketch in self.sketches.items():
+            if key_stage == stage:
+                self._sketch(departments, department).merge(sketch)
+        return departments
+
+    def by_weekday(self, stage):
+        """Get a new sketch per weekday of submission (Monday first) for one stage"""
+        return [QuantileSketch().merge(self.weekdays.get((stage, weekday), QuantileSketch()))
+                for weekday in range(7)]
+
+    def to_dict(self):
+        """Get the sketches as a JSON-serializable dictionary"""
+        return {
+            'sketches': [[*key, sketch.to_dict()] for key, sketch in self.sketches.items()],
+            'weekdays': [[*key, sketch.to_dict()] for key, sketch in self.weekdays.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Restore sketches saved with to_dict()
+
+        Args:
+            data (dict): Saved sketches
+
+        Returns:
+            ResponseTimes: Index holding the saved sketches
+        """
+        index = cls()
+        for *key, sketch in data['sketches']:
+            index.sketches[tuple(key)] = QuantileSketch.from_dict(sketch)
+        for *key, sketch in data['weekdays']:
+            index.weekdays[tuple(key)] = QuantileSketch.from_dict(sketch)
+        return index
@@ -0,0 +1,184 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from utils.issue_table import IssueTable
+
+# Binary copy of the in-memory issue table, so a cold start neither parses
+# the snapshot JSON nor encodes the issues again. The IssueTable's columns
+# (layout ids, category codes, numbers, text heap) are saved as they are;
+# layouts and category values go in a JSON header.
+CACHE_FILE = os.path.join('data', 'cache', 'issues.snapshot.npz')
+CACHE_FORMAT = 2
+
+def encode(issues):
+    """
+    Encode issues into the arrays of a snapshot cache file
+
+    Args:
+        issues (IssueTable or list): Issues; a table is saved as it is,
+            anything else is put into a new table first
+
+    Returns:
+        dict: Array name -> numpy array, see save()
+    """
+    table = issues if isinstance(issues, IssueTable) else IssueTable(issues)
+    columns = table.to_columns()
+    arrays = {}
+    for name, column in columns['arrays'].items():
+        dtype = np.uint8 if isinstance(column, bytes) else column.typecode
+        arrays[f'column.{name}'] = np.frombuffer(column, dtype=dtype)
+
+    meta = {
+        'format': CACHE_FORMAT,
+        'count': len(table),
+        'columns': list(columns['arrays']),
+        'table': columns['meta']
+    }
+    arrays['meta'] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+    return arrays
+
+def decode(arrays):
+    """
+    Rebuild the issue table from snapshot cache arrays
+
+    Args:
+        arrays (Mapping): Arrays produced by encode()
+
+    Returns:
+        IssueTable: The issues, in the original order and key order
+    """
+    meta = json.loads(arrays['meta'].tobytes())
+    columns = {name: arrays[f'column.{name}'].tobytes() for name in meta['columns']}
+    return IssueTable.from_columns(meta['table'], columns)
+
+def save(arrays, stamp, path=CACHE_FILE):
+    """
+    Write encoded arrays as the snapshot cache
+
+    Args:
+        arrays (dict): Arrays from encode()
+        stamp (list): Version stamp of the snapshot they were encoded from
+        path (str): Cache file path
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, stamp=np.array(stamp, dtype=np.int64), **arrays)
+    os.replace(tmp_path, path)
+
+def load(stamp, path=CACHE_FILE):
+    """
+    Load the cached issues if the cache matches the snapshot
+
+    Args:
+        stamp (list): Current version stamp of the snapshot
+        path (str): Cache file path
+
+    Returns:
+        IssueTable: The cached issues, or None if the cache is missing or
+            stale
+    """
+    if stamp is None or not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            if arrays['stamp'].tolist() != list(stamp):
+                return None
+            if json.loads(arrays['meta'].tobytes()).get('format') != CACHE_FORMAT:
+                return None
+            return decode(arrays)
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot cache: {e}")
+        return None
+
+def invalidate(path=CACHE_FILE):
+    """Remove the snapshot cache"""
+    if os.path.exists(path):
+        os.remove(path)
+
+def _sample_issues(count):
+    """Generate synthetic issues shaped like real reports"""
+    rng = np.random.default_rng(7)
+    departments = ['Roads & Transportation', 'Water Supply', 'Electricity', 'Sanitation', 'Public Safety']
+    statuses = ['Pending', 'In Progress', 'Resolved', 'Closed']
+    priorities = ['High', 'Medium', 'Low']
+    issues = []
+    for i in range(count):
+        issue = {
+            'id': f'{i:08x}-4c1e-4b7a-9f3e-{i:012x}',
+            'title': f'Issue report number {i}',
+            'description': f'Detailed description of civic issue {i} reported near the market road.',
+            'location': f'Ward {i % 120}, Sector {i % 17}',
+            'latitude': 28.6 + float(rng.random()) / 10,
+            'longitude': 77.2 + float(rng.random()) / 10,
+            'reporter_name': f'Citizen {i % 5000}',
+            'phone': f'98{i % 100000000:08d}',
+            'email': None,
+            'preferred_contact': 'SMS' if i % 3 else 'Email',
+            'priority': priorities[i % 3],
+            'status': statuses[i % 4],
+            'timestamp': f'2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}T10:{i % 60:02d}:00',
+            'image_status': None,
+            'manual_department': None,
+            'department': departments[i % 5],
+            'ai_confidence': round(float(rng.random()), 2),
+            'routing_method': 'AI' if i % 4 else 'Manual'
+        }
+        if i % 10 == 0:
+            issue['reassignment_history'] = [{'from': departments[0], 'to': departments[1],
+                                              'timestamp': issue['timestamp'], 'reason': 'Admin reassignment'}]
+        issues.append(issue)
+    return issues
+
+def benchmark(sizes):
+    """
+    Compare loading the issue table from JSON and from the snapshot cache
+
+    The JSON time includes encoding the parsed issues into an IssueTable,
+    as a cold start without the cache has to.
+
+    Args:
+        sizes (list): Issue counts to measure
+    """
+    work_dir = tempfile.mkdtemp(prefix='snapshot-bench-')
+    try:
+        print(f"{'issues':>10} {'json MB':>8} {'cache MB':>9} {'json load s':>12} {'cache load s':>13} {'speedup':>8}")
+        for size in sizes:
+            issues = _sample_issues(size)
+            json_path = os.path.join(work_dir, 'issues.json')
+            cache_path = os.path.join(work_dir, 'issues.snapshot.npz')
+            with open(json_path, 'w') as f:
+                json.dump(issues, f, indent=2)
+            save(encode(issues), [0, 0], cache_path)
+            del issues
+
+            # Only a sample of each result is kept for the comparison, so two
+            # full copies of the issue set are never in memory together
+            step = max(1, size // 1000)
+
+            start = time.perf_counter()
+            with open(json_path, 'r') as f:
+                from_json = IssueTable(json.load(f))
+            json_seconds = time.perf_counter() - start
+            sample = [record.to_dict() for record in from_json[::step]]
+            del from_json
+
+            start = time.perf_counter()
+            from_cache = load([0, 0], cache_path)
+            cache_seconds = time.perf_counter() - start
+            assert len(from_cache) == size and [record.to_dict() for record in from_cache[::step]] == sample
+            del from_cache
+            print(f"{size:>10} {os.path.getsize(json_path) / 1e6:>8.1f} {os.path.getsize(cache_path) / 1e6:>9.1f} "
+                  f"{json_seconds:>12.2f} {cache_seconds:>13.2f} {json_seconds / cache_seconds:>7.1f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    # Usage: python -m utils.snapshot_cache benchmark [sizes...]
+    if sys.argv[1:2] == ['benchmark']:
+        benchmark([int(size) for size in sys.argv[2:]] or [10000, 100000, 1000000])
+    else:
+        print("Usage: python -m utils.snapshot_cache benchmark [sizes...]")
@@ -0,0 +1,74 @@
+from bisect import bisect_left, bisect_right
+
+class SortedIndex:
+    """
+    Issues kept pre-sorted by a key, for paginated ordered scans
+
+    `keys` holds (sort_key, issue_id) tuples in ascending order and
+    `positions` holds the matching store positions, so a page can be read
+    by slicing from a bisect point instead of sorting the whole set. The
+    index is kept up to date through the IssueStore index hooks; pass the
+    current issues to the constructor (and attach it with build=False) to
+    sort them once instead of inserting them one by one.
+    """
+
+    def __init__(self, key_func, fields, issues=None):
+        self.key_func = key_func
+        self.fields = set(fields)
+        self.keys = []
+        self.positions = []
+        if issues:
+            entries = sorted((self._entry(issue), position) for position, issue in enumerate(issues))
+            self.keys = [entry for entry, position in entries]
+            self.positions = [position for entry, position in entries]
+
+    def _entry(self, issue):
+        return (self.key_func(issue), issue.get('id'))
+
+    def _insert(self, entry, position):
+        at = bisect_right(self.keys, entry)
+        self.keys.insert(at, entry)
+        self.positions.insert(at, position)
+
+    def _delete(self, entry):
+        at = bisect_left(self.keys, entry)
+        if at < len(self.keys) and self.keys[at] == entry:
+            del self.keys[at]
+            del self.positions[at]
+
+    def on_add(self, position, issue):
+        self._insert(self._entry(issue), position)
+
+    def on_patch(self, position, issue, old_fields):
+        if not self.fields.intersection(old_fields):
+            return
+        old_issue = dict(issue)
+        old_issue.update(old_fields)
+        old_entry = self._entry(old_issue)
+        new_entry = self._entry(issue)
+        if old_entry != new_entry:
+            self._delete(old_entry)
+            self._insert(new_entry, position)
+
+    def on_remove(self, position, removed_issue, moved_issue):
+        self._delete(self._entry(removed_issue))
+        if moved_issue is not None:
+            entry = self._entry(moved_issue)
+            at = bisect_left(self.keys, entry)
+            if at < len(self.keys) and self.keys[at] == entry:
+                self.positions[at] = position
+
+    def bisect(self, entry, reverse=False):
+        """
+        Find where a scan continuing after `entry` should start
+
+        Args:
+            entry (tuple): (sort_key, issue_id) of the last item returned
+            reverse (bool): True when scanning in descending order
+
+        Returns:
+            int: Index into keys/positions
+        """
+        if reverse:
+            return bisect_left(self.keys, entry) - 1
+        return bisect_right(self.keys, entry)
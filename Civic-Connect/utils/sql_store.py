@@ -0,0 +1,310 @@
+import json
+import os
+from sqlalchemy import (Column, Index, Integer, MetaData, String, Table, Text, create_engine,
+                        delete, event, insert, select, update)
+from sqlalchemy.exc import IntegrityError
+
+# Default to a local SQLite database next to the JSON data files
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///data/civicconnect.db")
+
+metadata = MetaData()
+
+# Frequently filtered fields get their own indexed columns; the full issue
+# record is kept as JSON in `data` so the schema does not need to track
+# every optional field.
+issues_table = Table(
+    "issues",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("phone", String(20)),
+    Column("department", String(64)),
+    Column("status", String(32)),
+    Column("priority", String(16)),
+    Column("timestamp", String(32)),
+    Column("data", Text, nullable=False),
+    Index("ix_issues_phone_timestamp", "phone", "timestamp"),
+    Index("ix_issues_department_timestamp", "department", "timestamp"),
+    Index("ix_issues_status", "status"),
+    Index("ix_issues_priority", "priority"),
+    Index("ix_issues_timestamp", "timestamp"),
+)
+
+# One row whose revision every write bumps in its own transaction, so each
+# process can tell that its in-memory copy of the issues is stale
+revision_table = Table(
+    "issues_revision",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("revision", Integer, nullable=False),
+)
+
+_engine = None
+
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    """Switch SQLite connections to WAL so readers don't block the writer"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def get_engine(url=None):
+    """
+    Get the shared, pooled SQLAlchemy engine
+
+    Args:
+        url (str): Database URL (optional, defaults to DATABASE_URL)
+
+    Returns:
+        Engine: SQLAlchemy engine with the issues table created
+    """
+    global _engine
+
+    if _engine is not None and url is None:
+        return _engine
+
+    url = url or DATABASE_URL
+    if url.startswith("sqlite"):
+        db_path = url.split("///", 1)[-1]
+        if db_path and db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        event.listen(engine, "connect", _enable_sqlite_wal)
+    else:
+        engine = create_engine(url, pool_size=5, max_overflow=10, pool_pre_ping=True)
+
+    metadata.create_all(engine)
+    try:
+        with engine.begin() as conn:
+            if conn.execute(select(revision_table.c.id)).first() is None:
+                conn.execute(insert(revision_table).values(id=1, revision=0))
+    except IntegrityError:
+        # Another process created the row first
+        pass
+    _engine = engine
+    return engine
+
+def _bump_revision(conn):
+    """Mark a write in the current transaction"""
+    conn.execute(update(revision_table).values(revision=revision_table.c.revision + 1))
+
+def get_revision():
+    """
+    Get the database's write revision
+
+    Returns:
+        int: Number of write transactions committed so far, by any process
+    """
+    with get_engine().connect() as conn:
+        return conn.execute(select(revision_table.c.revision)).scalar_one()
+
+def _to_row(issue_data):
+    """Split an issue dict into indexed columns plus the JSON body"""
+    return {
+        "id": issue_data.get("id"),
+        "phone": issue_data.get("phone"),
+        "department": issue_data.get("department"),
+        "status": issue_data.get("status"),
+        "priority": issue_data.get("priority"),
+        "timestamp": issue_data.get("timestamp"),
+        "data": json.dumps(issue_data, default=dict),
+    }
+
+def _select_issues(*conditions):
+    """Run a select on the issues table and decode the JSON bodies"""
+    query = select(issues_table.c.data).where(*conditions).order_by(issues_table.c.timestamp.desc())
+    with get_engine().connect() as conn:
+        return [json.loads(row.data) for row in conn.execute(query)]
+
+def _get_issue(conn, issue_id, for_update=False):
+    """Fetch a single issue by primary key, optionally locking its row until the transaction ends"""
+    query = select(issues_table.c.data).where(issues_table.c.id == issue_id)
+    if for_update:
+        query = query.with_for_update()
+    row = conn.execute(query).first()
+    return json.loads(row.data) if row else None
+
+def _write_issue(conn, issue_data):
+    """Rewrite the stored row for an existing issue"""
+    row = _to_row(issue_data)
+    conn.execute(update(issues_table).where(issues_table.c.id == row.pop("id")).values(**row))
+
+def save_issue(issue_data):
+    """
+    Save a single issue to the database
+
+    Args:
+        issue_data (dict): Issue information to save
+    """
+    with get_engine().begin() as conn:
+        conn.execute(insert(issues_table).values(**_to_row(issue_data)))
+        _bump_revision(conn)
+
+def load_issues(start=None, end=None):
+    """
+    Load issues from the database in insertion order
+
+    Args:
+        start (str): Inclusive ISO timestamp lower bound (optional)
+        end (str): Exclusive ISO timestamp upper bound (optional)
+
+    Returns:
+        list: List of issue dictionaries
+    """
+    conditions = []
+    if start is not None:
+        conditions.append(issues_table.c.timestamp >= start)
+    if end is not None:
+        conditions.append(issues_table.c.timestamp < end)
+
+    with get_engine().connect() as conn:
+        return [json.loads(row.data) for row in conn.execute(select(issues_table.c.data).where(*conditions))]
+
+def delete_resolved_before(cutoff):
+    """
+    Delete Resolved issues timestamped at or before a cutoff
+
+    Issues with a missing or non-ISO timestamp are kept.
+
+    Args:
+        cutoff (str): ISO timestamp
+
+    Returns:
+        int: Number of deleted issues
+    """
+    t = issues_table.c
+    with get_engine().begin() as conn:
+        result = conn.execute(delete(issues_table).where(
+            t.status == 'Resolved', t.timestamp >= '0', t.timestamp <= cutoff))
+        _bump_revision(conn)
+        return result.rowcount
+
+def replace_all_issues(issues):
+    """
+    Replace every stored issue with the given list
+
+    Args:
+        issues (list): Issue dictionaries
+    """
+    with get_engine().begin() as conn:
+        conn.execute(delete(issues_table))
+        if issues:
+            conn.execute(insert(issues_table), [_to_row(issue) for issue in issues])
+        _bump_revision(conn)
+
+def get_issue(issue_id):
+    """
+    Get a single issue by primary key
+
+    Args:
+        issue_id (str): Issue ID
+
+    Returns:
+        dict: Issue data, or None if not found
+    """
+    with get_engine().connect() as conn:
+        return _get_issue(conn, issue_id)
+
+def patch_issue(issue_id, fields, expected=None):
+    """
+    Update selected fields of a single issue
+
+    The row is read with SELECT ... FOR UPDATE, so no other writer can
+    change it between the read and the write (SQLite, which has no row
+    locks, fails the write instead).
+
+    Args:
+        issue_id (str): Issue ID
+        fields (dict): Field values to set
+        expected (dict): Field values the issue must still have; if one
+            differs nothing is written (optional)
+
+    Returns:
+        bool: True if the issue was found and updated
+    """
+    with get_engine().begin() as conn:
+        issue = _get_issue(conn, issue_id, for_update=True)
+        if issue is None:
+            return False
+        if expected and any(issue.get(field) != value for field, value in expected.items()):
+            return False
+
+        issue.update(fields)
+        _write_issue(conn, issue)
+        _bump_revision(conn)
+        return True
+
+def patch_issues(updates, expected=None):
+    """
+    Update selected fields of many issues in one transaction
+
+    Args:
+        updates (dict): Issue ID -> field values to set
+        expected (dict): Issue ID -> field values the issue must still
+            have, as in patch_issue (optional)
+
+    Returns:
+        list: IDs of the issues that were found and updated
+    """
+    expected = expected or {}
+    updated = []
+    with get_engine().begin() as conn:
+        for issue_id, fields in updates.items():
+            issue = _get_issue(conn, issue_id, for_update=True)
+            if issue is None:
+                continue
+            if any(issue.get(field) != value for field, value in expected.get(issue_id, {}).items()):
+                continue
+            issue.update(fields)
+            _write_issue(conn, issue)
+            updated.append(issue_id)
+        _bump_revision(conn)
+    return updated
+
+def get_issues_by_phone(phone_number):
+    """
+    Get all issues reported by a phone number, newest first
+
+    Args:
+        phone_number (str): Phone number to search for
+
+    Returns:
+        list: List of issues by this user
+    """
+    return _select_issues(issues_table.c.phone == phone_number)
+
+def get_issues_by_department(department):
+    """
+    Get all issues assigned to a department, newest first
+
+    Args:
+        department (str): Department name
+
+    Returns:
+        list: List of issues for this department
+    """
+    return _select_issues(issues_table.c.department == department)
+
+def iter_issues(filters=None, chunk_size=1000):
+    """
+    Stream issues matching filters from the database, newest first
+
+    Rows are fetched with a server-side cursor in batches of `chunk_size`.
+
+    Args:
+        filters (dict): Field -> list of allowed values for status,
+            department and priority (optional)
+        chunk_size (int): Rows fetched per batch
+
+    Yields:
+        dict: Matching issues
+    """
+    conditions = []
+    for field in ('status', 'department', 'priority'):
+        if filters and filters.get(field) is not None:
+            conditions.append(issues_table.c[field].in_(filters[field]))
+
+    query = select(issues_table.c.data).where(*conditions).order_by(issues_table.c.timestamp.desc())
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for row in result:
+            yield json.loads(row.data)